@@ -0,0 +1,67 @@
+import sys
+import os
+import asyncio
+import random
+import statistics
+import time
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.hedging import HedgeBudget, Hedger
+from src.core.upstream import Upstream
+
+REQUESTS = 2000
+CONCURRENCY = 8
+FAST = 0.010      # typical Kratos admin read, seconds
+SLOW = 0.150      # occasional stall (GC pause, slow replica)
+SLOW_RATE = 0.03  # fraction of responses that stall
+
+
+async def kratos_stand_in(request):
+    """Kratos-like identity read: usually fast, sometimes stalls."""
+    await asyncio.sleep(SLOW if random.random() < SLOW_RATE else FAST * random.uniform(0.8, 1.2))
+    return httpx.Response(200, json={"id": request.url.path.rsplit("/", 1)[-1], "traits": {}})
+
+
+async def run(hedged: bool):
+    random.seed(7)
+    hedger = Hedger("bench-kratos", HedgeBudget()) if hedged else None
+    upstream = Upstream("bench-kratos", hedger=hedger)
+    upstream.breaker = CircuitBreaker("bench-kratos")
+    upstream._client = httpx.AsyncClient(transport=httpx.MockTransport(kratos_stand_in))
+    upstream._client_loop = asyncio.get_running_loop()
+
+    slots = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def read(i):
+        async with slots:
+            start = time.perf_counter()
+            response = await upstream.request("GET", f"http://kratos.test/admin/identities/{i}", hedge=True)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200
+
+    await asyncio.gather(*[read(i) for i in range(REQUESTS)])
+    await upstream._client.aclose()
+    return latencies[200:], hedger  # drop warm-up while the hedger learns p95
+
+
+def report(label, latencies, hedger):
+    ordered = sorted(latencies)
+
+    def pct(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    extra = f"  hedged {hedger.hedged / hedger.requests:5.1%}, hedge won {hedger.hedge_wins}" if hedger else ""
+    print(f"  {label:<10} p50 {pct(0.50):6.1f} ms  p95 {pct(0.95):6.1f} ms  "
+          f"p99 {pct(0.99):6.1f} ms  mean {statistics.mean(ordered) * 1000:6.1f} ms{extra}")
+
+
+if __name__ == "__main__":
+    print(f"Kratos identity reads: {REQUESTS} requests, {CONCURRENCY} concurrent, "
+          f"{SLOW_RATE:.0%} stall for {SLOW * 1000:.0f} ms")
+    report("plain", *asyncio.run(run(hedged=False)))
+    report("hedged", *asyncio.run(run(hedged=True)))
@@ -0,0 +1,113 @@
+import sys
+import os
+import asyncio
+import socket
+import threading
+import time
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import settings
+from src.core.upstream import Upstream, h2_available
+
+REQUESTS = 500
+CONCURRENCY = 64
+LATENCY = 0.02  # stand-in server think time per request, seconds
+
+BLOCK = b'{"object":"list","results":[{"object":"block","type":"paragraph"}],"has_more":false}'
+
+
+class StandIn:
+    """Notion-like stand-in: every request waits LATENCY and returns a block list.
+
+    Remembers which client ports it saw, i.e. how many connections were opened.
+    """
+
+    def __init__(self):
+        self.ports = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        self.ports.add(scope["client"][1])
+        await asyncio.sleep(LATENCY)
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": BLOCK})
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_http1(app, port):
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+
+
+def serve_http2(app, port):
+    """Serve h2c with hypercorn; returns False if it is not installed."""
+    try:
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+    except ImportError:
+        return False
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.loglevel = "ERROR"
+    threading.Thread(target=lambda: asyncio.run(serve(app, config)), daemon=True).start()
+    time.sleep(0.5)
+    return True
+
+
+async def fan_out(upstream: Upstream, url: str) -> float:
+    slots = asyncio.Semaphore(CONCURRENCY)
+
+    async def fetch(i):
+        async with slots:
+            response = await upstream.request("GET", f"{url}/v1/blocks/{i}/children")
+            assert response.status_code == 200
+
+    await fetch(-1)  # open the connection before timing
+    start = time.perf_counter()
+    await asyncio.gather(*[fetch(i) for i in range(REQUESTS)])
+    elapsed = time.perf_counter() - start
+    await upstream.client.aclose()
+    return elapsed
+
+
+def report(label, elapsed, app, version):
+    print(f"  {label:<10} {REQUESTS / elapsed:8.0f} req/s  {elapsed * 1000:8.1f} ms  "
+          f"{len(app.ports):4d} connections  ({version})")
+
+
+def main():
+    print(f"Upstream fan-out: {REQUESTS} requests, {CONCURRENCY} concurrent, "
+          f"{LATENCY * 1000:.0f} ms server latency")
+
+    app, port = StandIn(), free_port()
+    serve_http1(app, port)
+    elapsed = asyncio.run(fan_out(Upstream("bench-http1", http2=False), f"http://127.0.0.1:{port}"))
+    report("HTTP/1.1", elapsed, app, "uvicorn")
+
+    if not h2_available():
+        print("  HTTP/2     skipped: pip install h2 hypercorn")
+        return
+    app, port = StandIn(), free_port()
+    if not serve_http2(app, port):
+        print("  HTTP/2     skipped: pip install hypercorn")
+        return
+    settings.http2_cleartext = True
+    upstream = Upstream("bench-http2", http2=True)
+    elapsed = asyncio.run(fan_out(upstream, f"http://127.0.0.1:{port}"))
+    report("HTTP/2", elapsed, app, upstream.http_version)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import sys
+import os
+import json
+import time
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from src.core import serialization
+
+ROUNDS = 20
+
+
+def make_query_payload(pages: int = 2000) -> dict:
+    """Build a Notion database-query response of roughly production size."""
+    results = []
+    for i in range(pages):
+        results.append({
+            "object": "page",
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "created_time": "2024-01-01T00:00:00.000Z",
+            "last_edited_time": "2024-01-02T00:00:00.000Z",
+            "archived": False,
+            "url": f"https://www.notion.so/page-{i}",
+            "properties": {
+                "Name": {
+                    "id": "title",
+                    "type": "title",
+                    "title": [{"type": "text", "plain_text": f"Row {i}", "text": {"content": f"Row {i}"}}]
+                },
+                "Status": {"id": "s", "type": "select", "select": {"name": "Done", "color": "green"}},
+                "Tags": {"id": "t", "type": "multi_select", "multi_select": [{"name": "a"}, {"name": "b"}]},
+                "Estimate": {"id": "e", "type": "number", "number": i * 0.5},
+                "Due": {"id": "d", "type": "date", "date": {"start": "2024-03-01", "end": None}},
+            }
+        })
+    return {"object": "list", "results": results, "has_more": False, "next_cursor": None}
+
+
+def timed(label: str, fn) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    elapsed = (time.perf_counter() - start) / ROUNDS * 1000
+    print(f"  {label:<40} {elapsed:8.2f} ms")
+    return elapsed
+
+
+def bench_encode(payload: dict):
+    print("Encoding a database-query response:")
+    baseline = timed(
+        "jsonable_encoder + json.dumps",
+        lambda: json.dumps(jsonable_encoder(payload)).encode("utf-8")
+    )
+    fast = timed("serialization.dumps", lambda: serialization.dumps(payload))
+    print(f"  speedup: {baseline / fast:.1f}x")
+
+
+def bench_decode(payload: dict):
+    body = json.dumps(payload).encode("utf-8")
+    print(f"Decoding a {len(body) / 1024:.0f} KiB upstream body:")
+    baseline = timed("json.loads(body.decode())", lambda: json.loads(body.decode("utf-8")))
+    fast = timed("serialization.loads(body)", lambda: serialization.loads(body))
+    print(f"  speedup: {baseline / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    backend = "orjson" if serialization.orjson is not None else "stdlib json"
+    print(f"Serialization benchmark (backend: {backend})")
+    payload = make_query_payload()
+    bench_encode(payload)
+    bench_decode(payload)
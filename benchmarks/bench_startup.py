@@ -0,0 +1,64 @@
+import sys
+import os
+import statistics
+import subprocess
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROUNDS = 5
+
+# Entry points paid on every process spawn
+TARGETS = [
+    "src.config",
+    "src.mcp.server",
+    "src.api.main",
+]
+
+
+def import_profile(module: str):
+    """Import ``module`` in a fresh interpreter; return (wall ms, {module: cumulative us})."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    wall = (time.perf_counter() - start) * 1000
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        depth = len(name) - len(name.lstrip())
+        cumulative[name.strip()] = (int(cum), depth)
+    return wall, cumulative
+
+
+def bench_module(module: str):
+    walls, totals, profile = [], [], {}
+    for _ in range(ROUNDS):
+        wall, profile = import_profile(module)
+        walls.append(wall)
+        totals.append(profile[module][0] / 1000)
+
+    print(f"{module}:")
+    print(f"  {'process spawn + import (median)':<40} {statistics.median(walls):8.1f} ms")
+    print(f"  {'-X importtime cumulative (median)':<40} {statistics.median(totals):8.1f} ms")
+
+    # Heaviest direct dependencies of the target in the last run
+    top_depth = profile[module][1]
+    children = [
+        (cum, name) for name, (cum, depth) in profile.items()
+        if depth == top_depth + 2 and name != module
+    ]
+    for cum, name in sorted(children, reverse=True)[:5]:
+        print(f"    {name:<38} {cum / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    print(f"Startup benchmark ({ROUNDS} fresh interpreters per target)")
+    for target in TARGETS:
+        bench_module(target)
@@ -0,0 +1,43 @@
+import subprocess
+import sys
+import os
+
+def run_benchmark(bench_file):
+    """Run a single benchmark file."""
+    print(f"\n{'='*60}")
+    print(f"Running: {bench_file}")
+    print('='*60)
+
+    result = subprocess.run([sys.executable, bench_file],
+                          capture_output=True,
+                          text=True)
+
+    print(result.stdout)
+    if result.stderr:
+        print(f"Errors:\n{result.stderr}")
+
+    return result.returncode == 0
+
+def main():
+    """Run all benchmark files."""
+    bench_files = [
+        "bench_serialization.py",
+        "bench_startup.py",
+        "bench_http2.py",
+        "bench_hedging.py",
+    ]
+
+    print("Running all benchmarks for Notion Ory Agent")
+    print("="*60)
+
+    failed = 0
+    for bench_file in bench_files:
+        bench_path = os.path.join(os.path.dirname(__file__), bench_file)
+        if not run_benchmark(bench_path):
+            failed += 1
+
+    return failed == 0
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,71 @@
+import argparse
+import glob
+import os
+import sys
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from src.config import settings
+from src.services.webhook_service import sign
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "tests", "fixtures", "notion_webhooks")
+
+def load_events(paths):
+    """Raw event bodies from .json files (one event each) and .ndjson files (one per line)."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.json")) + glob.glob(os.path.join(path, "*.ndjson"))))
+        else:
+            files.append(path)
+
+    for file in files:
+        with open(file, "rb") as f:
+            data = f.read()
+        if file.endswith(".ndjson"):
+            for i, line in enumerate(data.splitlines(), 1):
+                if line.strip():
+                    yield f"{os.path.basename(file)}:{i}", line
+        else:
+            yield os.path.basename(file), data
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded Notion webhook events against the receiver")
+    parser.add_argument("paths", nargs="*", default=[DEFAULT_FIXTURES], help="Fixture files or directories")
+    parser.add_argument("--url", default="http://localhost:8000/webhooks/notion")
+    parser.add_argument("--secret", default=None, help="Verification token (default: NOTION_WEBHOOK_SECRET)")
+    parser.add_argument("--in-process", action="store_true", help="Send to an in-process app instead of --url")
+    args = parser.parse_args()
+
+    secret = args.secret or (settings.notion_webhook_secret.get_secret_value() if settings.notion_webhook_secret else None)
+    if not secret:
+        parser.error("no secret: pass --secret or set NOTION_WEBHOOK_SECRET")
+
+    if args.in_process:
+        from pydantic import SecretStr
+        from fastapi.testclient import TestClient
+        from src.main import app
+        settings.notion_webhook_secret = SecretStr(secret)
+        client, url = TestClient(app), "/webhooks/notion"
+    else:
+        client, url = httpx.Client(timeout=10.0), args.url
+
+    failed = 0
+    for name, body in load_events(args.paths):
+        response = client.post(url, content=body, headers={
+            "Content-Type": "application/json",
+            "X-Notion-Signature": sign(body, secret)
+        })
+        status = response.json().get("status") if response.status_code == 200 else response.text
+        print(f"{name:<45} {response.status_code} {status}")
+        if response.status_code != 200:
+            failed += 1
+
+    return failed == 0
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
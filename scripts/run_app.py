@@ -1,13 +1,12 @@
-import uvicorn
-from src.config import settings
-from src.api.main import create_app
-
-app = create_app()
+import argparse
+from src.main import serve
 
 if __name__ == "__main__":
-    uvicorn.run(
-        app,
-        host="0.0.0.0",
-        port=8000,
-        reload=False
-    )
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the Notion Ory Agent API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (0 = one per CPU, default from WEB_WORKERS)")
+    args = parser.parse_args()
+
+    serve(workers=args.workers, host=args.host, port=args.port)
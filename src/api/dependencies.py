@@ -1,6 +1,9 @@
-from typing import Annotated, TYPE_CHECKING
-from fastapi import Depends
+import hmac
+from typing import Annotated, Any, Dict, Optional, Tuple, TYPE_CHECKING
+from fastapi import Depends, HTTPException, Request
 from src.config import settings
+from src.core.logs import bind
+from src.services.kratos_service import kratos_service
 
 if TYPE_CHECKING:
     from src.config.settings import Settings
@@ -9,5 +12,65 @@ def get_settings() -> "Settings":
     """Dependency to get application settings."""
     return settings
 
-# Type alias for dependency injection
-SettingsDep = Annotated["Settings", Depends(get_settings)]
\ No newline at end of file
+def session_credentials(request: Request) -> Tuple[Optional[str], Optional[str]]:
+    """Kratos session token (``X-Session-Token`` or bearer) and session cookie from a request."""
+    token = request.headers.get("x-session-token")
+    authorization = request.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+    return token or None, request.cookies.get(settings.kratos_session_cookie)
+
+async def get_optional_session(request: Request) -> Optional[Dict[str, Any]]:
+    """The caller's resolved Kratos session, or None if they sent no credentials.
+
+    Reuses the session admission control already resolved for the request.
+    """
+    result = getattr(request.state, "session", None)
+    if result is not None:
+        bind(user_id=result["session"]["identity_id"])
+        return result
+    session_token, session_cookie = session_credentials(request)
+    if not session_token and not session_cookie:
+        return None
+    result = await kratos_service.resolve_session(session_token, session_cookie)
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=result.get("status_code", 401),
+            detail=result.get("error", "Invalid session")
+        )
+    bind(user_id=result["session"]["identity_id"])
+    return result
+
+async def get_session(session: Optional[Dict[str, Any]] = Depends(get_optional_session)) -> Dict[str, Any]:
+    """Dependency requiring a valid Kratos session; yields the session, identity and Notion config."""
+    if session is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return session
+
+def is_admin_request(token: Optional[str]) -> bool:
+    """Whether ``token`` matches the configured admin token."""
+    expected = settings.admin_token
+    if expected is None or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), expected.get_secret_value().encode("utf-8"))
+
+def _check_admin_token(request: Request) -> None:
+    if not is_admin_request(request.headers.get("x-admin-token")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+async def require_admin(request: Request) -> None:
+    """Dependency for admin endpoints; they 404 unless ``admin_enabled`` and need ``X-Admin-Token``."""
+    if not settings.admin_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    _check_admin_token(request)
+
+async def require_diagnostics(request: Request) -> None:
+    """Dependency for diagnostics endpoints; they 404 unless ``profiling_enabled`` and need ``X-Admin-Token``."""
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    _check_admin_token(request)
+
+# Type aliases for dependency injection
+SettingsDep = Annotated["Settings", Depends(get_settings)]
+SessionDep = Annotated[Dict[str, Any], Depends(get_session)]
+OptionalSessionDep = Annotated[Optional[Dict[str, Any]], Depends(get_optional_session)]
@@ -1,8 +1,44 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from src.config import settings
-from .routers import health, auth, oauth, notion  # Add notion import
+from .responses import FastJSONResponse
+from .middleware.rate_limit import AdmissionControlMiddleware
+from .middleware.http_cache import HTTPCacheMiddleware
+from .middleware.tracing import TracingMiddleware
+from .middleware.request_context import RequestContextMiddleware
+from .middleware.deadline import DeadlineMiddleware
+from .middleware.profiling import ProfilingMiddleware
+from .routers import health, auth, oauth, notion, jobs, webhooks, admin  # Add notion import
 from src.mcp.api import router as mcp_router
+from src.services.job_service import job_service
+from src.services.webhook_service import webhook_service
+from src.core.upstream import close_upstreams
+from src.core.shared_cache import shared_cache
+from src.core.tracing import tracer
+from src.core.loop_monitor import loop_monitor
+from src.core.logs import log_pipeline
+from src.core.deadline import DeadlineExceeded
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers with the application."""
+    log_pipeline.configure()
+    loop_monitor.start()
+    if settings.jobs_enabled:
+        await job_service.start()
+    await webhook_service.start()
+    try:
+        yield
+    finally:
+        await webhook_service.stop()
+        if settings.jobs_enabled:
+            await job_service.stop()
+        await close_upstreams()
+        await loop_monitor.stop()
+        shared_cache.close()
+        tracer.shutdown()
+        log_pipeline.shutdown()
 
 def create_app() -> FastAPI:
     """Application factory function."""
@@ -12,8 +48,29 @@ def create_app() -> FastAPI:
         debug=settings.debug,
         docs_url="/docs" if settings.debug else None,
         redoc_url="/redoc" if settings.debug else None,
+        default_response_class=FastJSONResponse,
+        lifespan=lifespan,
     )
     
+    # Response caching runs inside admission control so cache hits still count against limits
+    app.add_middleware(HTTPCacheMiddleware)
+    
+    # Admission control runs inside CORS so 429s still carry CORS headers
+    app.add_middleware(AdmissionControlMiddleware)
+    
+    # Per-request profiling is only installed when diagnostics are enabled
+    if settings.profiling_enabled:
+        app.add_middleware(ProfilingMiddleware)
+    
+    # Request IDs are set inside tracing so access log lines carry the trace ID
+    app.add_middleware(RequestContextMiddleware)
+    
+    # Deadlines wrap the request context so requests cancelled on disconnect are still logged
+    app.add_middleware(DeadlineMiddleware)
+    
+    # Tracing wraps admission control so throttled requests are traced too
+    app.add_middleware(TracingMiddleware)
+    
     # Configure CORS
     app.add_middleware(
         CORSMiddleware,
@@ -23,12 +80,19 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    @app.exception_handler(DeadlineExceeded)
+    async def deadline_exceeded(request, exc: DeadlineExceeded):
+        return FastJSONResponse({"detail": str(exc)}, status_code=504)
+    
     # Include routers
     app.include_router(health.router)
     app.include_router(auth.router)
     app.include_router(oauth.router)
     app.include_router(notion.router)  # Add this line
+    app.include_router(jobs.router)
+    app.include_router(webhooks.router)
     app.include_router(mcp_router)
+    app.include_router(admin.router)
     
     # Root endpoint
     @app.get("/")
@@ -40,7 +104,9 @@ def create_app() -> FastAPI:
             "mcp_ws": "/mcp/ws",
             "auth_endpoints": "/auth/*",
             "oauth_endpoints": "/oauth/*",
-            "notion_endpoints": "/notion/*"
+            "notion_endpoints": "/notion/*",
+            "job_endpoints": "/jobs/*",
+            "webhook_endpoints": "/webhooks/*"
         }
     
     return app
\ No newline at end of file
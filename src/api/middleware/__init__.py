@@ -0,0 +1 @@
+# Makes middleware a package
\ No newline at end of file
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src.config import settings
+from src.core.deadline import deadline, parse_deadline
+from .rate_limit import _header
+
+logger = logging.getLogger(__name__)
+
+class DeadlineMiddleware:
+    """Bound a request's upstream calls by its deadline and cancel it if the client leaves.
+
+    The deadline comes from ``X-Request-Deadline`` or ``request_deadline_default``.
+    With ``cancel_on_disconnect``, the handler runs in its own task while
+    this middleware forwards the request body to it and watches for
+    ``http.disconnect``. A client that goes away before the response is
+    complete gets the handler cancelled, which also cancels its queued and
+    in-flight Kratos/Notion calls. Background tasks that run after the
+    response has been sent are left alone.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        seconds = parse_deadline(_header(scope, b"x-request-deadline"))
+        with deadline(seconds if seconds is not None else settings.request_deadline_default):
+            if settings.cancel_on_disconnect:
+                await self._run_until_disconnect(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+
+    async def _run_until_disconnect(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # One message at a time, so a streamed body still applies backpressure
+        messages: asyncio.Queue = asyncio.Queue(maxsize=1)
+        complete = False
+        disconnected = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal complete
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                complete = True
+
+        handler = asyncio.ensure_future(self.app(scope, messages.get, send_wrapper))
+
+        async def watch() -> None:
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    if not complete:
+                        disconnected = True
+                        handler.cancel()
+                    return
+                await messages.put(message)
+
+        watcher = asyncio.ensure_future(watch())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not disconnected:
+                raise
+            logger.info("Client disconnected; cancelled %s %s", scope["method"], scope["path"])
+        finally:
+            watcher.cancel()
@@ -0,0 +1,92 @@
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src.config import settings
+from src.core.http_cache import CachePolicy, etag_matches, response_cache, strong_etag
+from src.core.tracing import tracer
+from .rate_limit import _header, find_route
+
+class HTTPCacheMiddleware:
+    """ETags, 304s, Cache-Control and server-side caching for marked GET routes.
+
+    Only endpoints decorated with :func:`src.core.http_cache.cache_response`
+    are touched; everything else (including streaming exports) passes
+    straight through.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET" or not settings.http_cache_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        route, path_params = find_route(scope)
+        policy: Optional[CachePolicy] = getattr(getattr(route, "endpoint", None), "cache_policy", None)
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        ttl = settings.http_cache_ttls.get(route.path, policy.ttl)
+        if_none_match = _header(scope, b"if-none-match")
+        key = scope["path"] + ("?" + scope["query_string"].decode("latin-1") if scope["query_string"] else "")
+
+        tags = policy.tags_for({**dict(parse_qsl(scope["query_string"].decode("latin-1"))), **path_params})
+        if tags is None:
+            ttl = 0.0
+
+        versions: Dict[str, str] = {}
+        if ttl > 0:
+            versions = await response_cache.tag_versions(tags)
+            entry = await response_cache.get(key, versions)
+            tracer.set_attribute("http.cache", "hit" if entry is not None else "miss")
+            if entry is not None:
+                await self._send_cached(send, policy, entry, if_none_match)
+                return
+
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+
+        async def capture(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+        headers = [(k, v) for k, v in start.get("headers", []) if k != b"content-length"]
+        if start.get("status") != 200:
+            await send({**start, "headers": headers + [(b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        etag = strong_etag(body)
+        if ttl > 0:
+            media_type = next((v.decode("latin-1") for k, v in headers if k == b"content-type"), None)
+            await response_cache.store(key, versions, body, media_type, etag, ttl)
+        headers += [(b"etag", etag.encode()), (b"cache-control", policy.cache_control.encode())]
+        if ttl > 0:
+            headers.append((b"x-cache", b"MISS"))
+        await self._send(send, headers, body, etag_matches(if_none_match, etag))
+
+    async def _send_cached(self, send: Send, policy: CachePolicy, entry: Dict[str, Any], if_none_match: Optional[str]) -> None:
+        headers = [
+            (b"etag", entry["etag"].encode()),
+            (b"cache-control", policy.cache_control.encode()),
+            (b"x-cache", b"HIT"),
+        ]
+        if entry["media_type"]:
+            headers.append((b"content-type", entry["media_type"].encode("latin-1")))
+        await self._send(send, headers, entry["body"].encode("utf-8"), etag_matches(if_none_match, entry["etag"]))
+
+    async def _send(self, send: Send, headers: List, body: bytes, not_modified: bool) -> None:
+        if not_modified:
+            headers = [(k, v) for k, v in headers if k != b"content-type"]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers = headers + [(b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,56 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src.api.dependencies import is_admin_request
+from src.config import settings
+from src.core.profiling import SamplingProfiler, profile_store
+from .rate_limit import _header
+
+# Paths whose requests may be profiled individually
+PROFILED_PREFIXES = ("/notion/",)
+
+class ProfilingMiddleware:
+    """Profile a single request sent with ``X-Profile: 1`` and a valid ``X-Admin-Token``.
+
+    The response carries ``X-Profile-Id``; fetch the stacks from
+    ``/admin/profiles/{id}``. Sampling runs until the response body starts
+    and covers the whole event loop, so profile on a quiet worker. Only installed when
+    ``profiling_enabled`` is set, and only one request is profiled at a time.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not settings.profiling_enabled
+            or not scope["path"].startswith(PROFILED_PREFIXES)
+            or _header(scope, b"x-profile") not in ("1", "true")
+            or profile_store.active
+            or not is_admin_request(_header(scope, b"x-admin-token"))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profile_store.active += 1
+        profiler = SamplingProfiler().start()
+        started: dict = {}
+
+        async def buffer_start(message: Message) -> None:
+            # Hold the response start until the profile ID is known
+            if message["type"] == "http.response.start":
+                started.update(message)
+                return
+            if started:
+                profiler.stop()
+                profile_id = profile_store.save_profile(f"{scope['method']} {scope['path']}", profiler)
+                headers = list(started.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+                await send({**started, "headers": headers})
+                started.clear()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, buffer_start)
+        finally:
+            if profiler.running:
+                profiler.stop()
+            profile_store.active -= 1
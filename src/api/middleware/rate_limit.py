@@ -0,0 +1,143 @@
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from starlette.requests import Request
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+from src.api.dependencies import session_credentials
+from src.api.responses import FastJSONResponse
+from src.config import settings
+from src.core.deadline import DeadlineExceeded
+from src.core.loop_monitor import is_low_priority, loop_monitor
+from src.core.rate_limit import admission_controller, retry_after_header
+from src.services.kratos_service import kratos_service
+
+EXEMPT_PREFIXES = ("/health", "/docs", "/redoc", "/openapi.json")
+
+def _leaf_routes(routes: Iterable[BaseRoute]) -> Iterator[BaseRoute]:
+    for route in routes:
+        # Newer FastAPI keeps included routers as nested entries rather than copying their routes
+        nested = getattr(route, "original_router", None)
+        if nested is not None:
+            yield from _leaf_routes(nested.routes)
+        else:
+            yield route
+
+def find_route(scope: Scope) -> Tuple[Optional[BaseRoute], Dict[str, Any]]:
+    """Find the route and path params a request will be dispatched to.
+
+    The result is memoized on the scope so stacked middleware match once.
+    """
+    if "matched_route" not in scope:
+        app = scope.get("app")
+        routes = getattr(getattr(app, "router", None), "routes", [])
+        scope["matched_route"] = (None, {})
+        for route in _leaf_routes(routes):
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                scope["matched_route"] = (route, child_scope.get("path_params", {}))
+                break
+    return scope["matched_route"]
+
+def match_route(scope: Scope) -> Tuple[str, Dict[str, Any]]:
+    """Find the route template and path params a request will be dispatched to."""
+    route, path_params = find_route(scope)
+    if route is None:
+        return "unmatched", {}
+    return getattr(route, "path", scope["path"]), path_params
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+def client_address(scope: Scope) -> Optional[str]:
+    """The caller's address: the peer, or the hop a trusted proxy saw.
+
+    ``X-Forwarded-For`` is only read when the peer is one of
+    ``rate_limit_trusted_proxies``, and then from the right, skipping further
+    trusted proxies, since anything left of them was written by the client.
+    """
+    client = scope.get("client")
+    address = client[0] if client else None
+    trusted = settings.rate_limit_trusted_proxies
+    if address is None or address not in trusted:
+        return address
+    forwarded = _header(scope, b"x-forwarded-for")
+    if forwarded:
+        for hop in reversed([hop.strip() for hop in forwarded.split(",")]):
+            if hop and hop not in trusted:
+                return hop
+    return address
+
+async def _resolve_session(scope: Scope) -> Optional[Dict[str, Any]]:
+    session_token, session_cookie = session_credentials(Request(scope))
+    if not session_token and not session_cookie:
+        return None
+    try:
+        result = await kratos_service.resolve_session(session_token, session_cookie)
+    except DeadlineExceeded:
+        # Let the route's own session dependency report it
+        return None
+    return result if result.get("success") else None
+
+class AdmissionControlMiddleware:
+    """Reject over-limit callers with a fast 429 instead of queueing them.
+
+    Clients are keyed on :func:`client_address` and users on their
+    authenticated Kratos identity, never on headers the caller chooses. The
+    user bucket is only charged once the route and client buckets admit the
+    request, so floods are turned away before they cost a session lookup; the
+    resolved session is left on ``request.state`` for the route to reuse.
+
+    While the event loop is lagging, routes marked
+    :func:`~src.core.loop_monitor.low_priority` get a fast 503 instead.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        if loop_monitor.overloaded and is_low_priority(getattr(find_route(scope)[0], "endpoint", None)):
+            loop_monitor.shed += 1
+            await self._reject(scope, receive, send, "Server is overloaded", 1.0, status_code=503)
+            return
+
+        template, _ = match_route(scope)
+        route = f"{scope['method']} {template}"
+        retry_after = await admission_controller.admit(route, client_id=client_address(scope))
+        if retry_after is None and settings.rate_limit_enabled:
+            session = await _resolve_session(scope)
+            if session is not None:
+                scope.setdefault("state", {})["session"] = session
+                retry_after = await admission_controller.admit_user(session["session"]["identity_id"])
+        if retry_after is not None:
+            await self._reject(scope, receive, send, "Rate limit exceeded", retry_after)
+            return
+
+        if not admission_controller.try_enter():
+            await self._reject(scope, receive, send, "Server is at its concurrency limit", 1.0)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_controller.leave()
+
+    async def _reject(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        detail: str,
+        retry_after: float,
+        status_code: int = 429
+    ) -> None:
+        response = FastJSONResponse(
+            {"detail": detail, "retry_after": round(retry_after, 3)},
+            status_code=status_code,
+            headers={"Retry-After": retry_after_header(retry_after)}
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src.config import settings
+from src.core.logs import log_context, new_request_id
+from .rate_limit import _header, find_route
+
+logger = logging.getLogger("src.api.access")
+
+class RequestContextMiddleware:
+    """Give every request a correlation ID and log one line when it completes.
+
+    The ID comes from an incoming ``X-Request-Id`` (so IDs from a proxy carry
+    through) or is generated, and is echoed on the response. Every record
+    logged while the request runs carries it, plus the ``user_id`` path
+    parameter or the caller's identity once their session is resolved.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = (_header(scope, b"x-request-id") or "")[:64] or new_request_id()
+        if scope["type"] == "websocket":
+            with log_context(request_id=request_id):
+                await self.app(scope, receive, send)
+            return
+
+        route, path_params = find_route(scope)
+        status = 500
+        start = time.perf_counter()
+        with log_context(request_id=request_id, user_id=path_params.get("user_id")):
+            async def send_wrapper(message: Message) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    message = {**message, "headers": list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            except asyncio.CancelledError:
+                # Client disconnected (or shutdown); logged as nginx's 499 Client Closed Request
+                status = 499
+                raise
+            finally:
+                if settings.log_requests:
+                    logger.info(
+                        "%s %s %d %.1f ms", scope["method"], scope["path"], status,
+                        (time.perf_counter() - start) * 1000,
+                        extra={"route": getattr(route, "path", None), "status": status}
+                    )
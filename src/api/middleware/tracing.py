@@ -0,0 +1,38 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src.core.tracing import tracer
+from .rate_limit import _header, find_route
+
+class TracingMiddleware:
+    """Server span per HTTP request, named after the matched route template.
+
+    Continues an incoming W3C ``traceparent`` and returns the trace ID in
+    ``X-Trace-Id`` so a slow call can be looked up in the exported spans.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        route, _ = find_route(scope)
+        template = getattr(route, "path", None)
+        name = f"{scope['method']} {template or scope['path']}"
+        with tracer.span(name, kind="server", traceparent=_header(scope, b"traceparent"), attributes={
+            "http.request.method": scope["method"],
+            "http.route": template,
+            "url.path": scope["path"]
+        }) as span:
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    span.set_attribute("http.response.status_code", status)
+                    if status >= 500:
+                        span.set_error()
+                    if span.recording:
+                        message = {**message, "headers": list(message.get("headers", [])) + [(b"x-trace-id", span.trace_id.encode())]}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,13 @@
+from typing import Any
+from fastapi.responses import JSONResponse
+from src.core import serialization
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with the shared fast encoder.
+
+    Routes that return this class directly also skip FastAPI's
+    ``jsonable_encoder`` pass over the payload.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return serialization.dumps(content)
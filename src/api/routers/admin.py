@@ -0,0 +1,143 @@
+import tracemalloc
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import Optional
+from src.api.dependencies import require_admin, require_diagnostics
+from src.api.responses import FastJSONResponse
+from src.config import settings
+from src.core.loop_monitor import low_priority
+from src.core.profiling import (
+    diff_allocations,
+    profile_for,
+    profile_store,
+    take_snapshot,
+    top_allocations,
+)
+from src.core.serialization import dumps
+from src.services.audit_service import notion_audit_service
+from src.services.job_service import job_service
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+# Profiling and tracemalloc are gated by profiling_enabled, the rest by admin_enabled
+diagnostics = APIRouter(dependencies=[Depends(require_diagnostics)])
+
+def _profile_response(profile: dict, format: str):
+    if format == "collapsed":
+        return PlainTextResponse(profile["collapsed"])
+    return {key: value for key, value in profile.items() if key != "collapsed"}
+
+@diagnostics.get("/profile")
+async def run_profile(
+    seconds: float = Query(5.0, gt=0, description="How long to sample"),
+    interval: Optional[float] = Query(None, ge=0.001, le=1.0, description="Seconds between samples"),
+    format: str = Query("collapsed", pattern="^(collapsed|json)$", description="collapsed (flamegraph) or json summary")
+):
+    """Sample this worker's event loop for a while and return its stacks."""
+    if seconds > settings.profiling_max_seconds:
+        raise HTTPException(status_code=400, detail=f"seconds must be at most {settings.profiling_max_seconds}")
+
+    profiler = await profile_for(seconds, interval)
+    profile_id = profile_store.save_profile(f"loop {seconds}s", profiler)
+    return _profile_response(profile_store.profiles[profile_id], format)
+
+@diagnostics.get("/profiles")
+async def list_profiles():
+    """List recent profiles, including per-request ones."""
+    return {
+        "profiles": [
+            {key: profile[key] for key in ("id", "label", "created_at", "samples", "duration")}
+            for profile in reversed(profile_store.profiles.values())
+        ]
+    }
+
+@diagnostics.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("collapsed", pattern="^(collapsed|json)$")
+):
+    """Get a stored profile."""
+    profile = profile_store.profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return _profile_response(profile, format)
+
+@diagnostics.post("/tracemalloc/start")
+async def start_tracemalloc(frames: int = Query(1, ge=1, le=100, description="Frames kept per allocation")):
+    """Start tracing allocations (this slows allocation down until stopped)."""
+    if tracemalloc.is_tracing():
+        return {"tracing": True, "frames": tracemalloc.get_traceback_limit(), "message": "Already tracing"}
+    tracemalloc.start(frames)
+    return {"tracing": True, "frames": frames}
+
+@diagnostics.post("/tracemalloc/stop")
+async def stop_tracemalloc():
+    """Stop tracing allocations and drop stored snapshots."""
+    tracemalloc.stop()
+    profile_store.snapshots.clear()
+    return {"tracing": False}
+
+@diagnostics.post("/tracemalloc/snapshot")
+async def snapshot_tracemalloc(
+    limit: int = Query(20, ge=1, le=200),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")
+):
+    """Take a snapshot and list the top allocation sites."""
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=409, detail="tracemalloc is not running; POST /admin/tracemalloc/start first")
+
+    snapshot = take_snapshot()
+    snapshot_id = profile_store.save_snapshot(snapshot)
+    return {"snapshot_id": snapshot_id, **top_allocations(snapshot, limit, group_by)}
+
+@diagnostics.get("/tracemalloc/diff")
+async def diff_tracemalloc(
+    base: str = Query(..., description="Earlier snapshot ID"),
+    current: Optional[str] = Query(None, description="Later snapshot ID (default: take one now)"),
+    limit: int = Query(20, ge=1, le=200),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")
+):
+    """Compare two snapshots and list the allocation sites that grew the most."""
+    if base not in profile_store.snapshots:
+        raise HTTPException(status_code=404, detail="Base snapshot not found")
+
+    if current is None:
+        if not tracemalloc.is_tracing():
+            raise HTTPException(status_code=409, detail="tracemalloc is not running")
+        current = profile_store.save_snapshot(take_snapshot())
+    elif current not in profile_store.snapshots:
+        raise HTTPException(status_code=404, detail="Current snapshot not found")
+
+    old, new = profile_store.snapshots[base][1], profile_store.snapshots[current][1]
+    return {"base": base, "current": current, **diff_allocations(old, new, limit, group_by)}
+
+router.include_router(diagnostics)
+
+@router.post("/notion/audit", dependencies=[Depends(require_admin)])
+@low_priority
+async def audit_notion_connections(
+    disable_broken: bool = Query(False, description="Disable configs whose API key Notion rejects"),
+    background: bool = Query(False, description="Queue a notion_audit job instead of streaming the report")
+):
+    """Check every user's Notion connection, one call per distinct API key.
+
+    Streams NDJSON: one row per configured identity (connected, broken,
+    unverified or disabled), then a summary row. With ``background`` the
+    report is written by a job instead; fetch it from ``/jobs/{job_id}``.
+    """
+    if background:
+        if not settings.jobs_enabled:
+            raise HTTPException(status_code=503, detail="Background jobs are disabled on this server")
+        result = await job_service.submit("admin", "notion_audit", {"disable_broken": disable_broken}, admin=True)
+        if not result.get("success"):
+            raise HTTPException(
+                status_code=result.get("status_code", 400),
+                detail=result.get("error", "Failed to submit job")
+            )
+        return FastJSONResponse({"message": result["message"], "job": result["job"]}, status_code=202)
+
+    async def report():
+        async for row in notion_audit_service.audit(disable_broken=disable_broken):
+            yield dumps(row) + b"\n"
+
+    return StreamingResponse(report(), media_type="application/x-ndjson")
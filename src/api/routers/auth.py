@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from typing import Optional
+from src.api.dependencies import SessionDep, session_credentials
 from src.services.kratos_service import kratos_service
 from src.models.user_notion import UserNotionConfig
 from src.services.user_notion_service import user_notion_service
+from src.api.responses import FastJSONResponse
+from src.core.http_cache import cache_response
+from src.core.loop_monitor import low_priority
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -42,6 +46,8 @@ async def create_identity(
     }
 
 @router.get("/identities")
+@cache_response(ttl=30.0, tags=("identities",))
+@low_priority
 async def list_identities():
     """List all identities in Kratos."""
     result = await kratos_service.list_identities()
@@ -52,12 +58,13 @@ async def list_identities():
             detail=result.get("error", "Failed to list identities")
         )
     
-    return {
+    return FastJSONResponse({
         "count": result.get("count", 0),
         "identities": result.get("identities", [])
-    }
+    })
 
 @router.get("/identities/{identity_id}")
+@cache_response(ttl=30.0, tags=("identity:{identity_id}",))
 async def get_identity(identity_id: str):
     """Get a specific identity by ID."""
     result = await kratos_service.get_identity(identity_id)
@@ -68,7 +75,7 @@ async def get_identity(identity_id: str):
             detail=result.get("error", "Identity not found")
         )
     
-    return result["identity"]
+    return FastJSONResponse(result["identity"])
 
 @router.get("/login/{flow_id}")
 async def get_login_flow(flow_id: str):
@@ -81,7 +88,33 @@ async def get_login_flow(flow_id: str):
             detail=result.get("error", "Login flow not found")
         )
     
-    return result["flow"]
+    return FastJSONResponse(result["flow"])
+
+@router.get("/session")
+async def get_current_session(session: SessionDep):
+    """Get the caller's session and identity (from a session cookie or token)."""
+    return FastJSONResponse({
+        "session": session["session"],
+        "identity": session["identity"],
+        "notion_configured": session.get("notion_config") is not None
+    })
+
+@router.post("/logout")
+async def logout(request: Request):
+    """End the caller's session and drop it from the session cache."""
+    session_token, session_cookie = session_credentials(request)
+    if not session_token and not session_cookie:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    result = await kratos_service.logout(session_token, session_cookie)
+    
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=result.get("status_code", 400),
+            detail=result.get("error", "Failed to log out")
+        )
+    
+    return result
 
 @router.post("/{identity_id}/notion/config")
 async def configure_user_notion(
@@ -119,16 +152,16 @@ async def configure_user_notion(
             detail=update_result.get("error", "Failed to update user configuration")
         )
     
-    return {
+    return FastJSONResponse({
         "message": "Notion configuration updated successfully",
         "user_id": identity_id,
-        "connection_test": test_result.dict(),
+        "connection_test": test_result,
         "notion_user": {
             "id": test_result.user_id,
             "name": test_result.user_name,
             "workspace": test_result.workspace_name
         }
-    }
+    })
 
 @router.get("/{identity_id}/notion/status")
 async def get_user_notion_status(identity_id: str):
@@ -153,11 +186,11 @@ async def get_user_notion_status(identity_id: str):
     # Test current connection
     test_result = await user_notion_service.test_user_connection(notion_config)
     
-    return {
+    return FastJSONResponse({
         "user_id": identity_id,
         "notion_configured": True,
         "enabled": notion_config.enabled,
         "connected_at": notion_config.connected_at,
-        "connection_test": test_result.dict(),
+        "connection_test": test_result,
         "has_default_database": notion_config.notion_database_id is not None
-    }
\ No newline at end of file
+    })
\ No newline at end of file
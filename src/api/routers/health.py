@@ -1,5 +1,8 @@
 from fastapi import APIRouter, Depends
 from src.api.dependencies import SettingsDep
+from src.core.circuit_breaker import breaker_registry
+from src.core.metrics import metrics
+from src.core.http_cache import cache_response
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -8,13 +11,19 @@ if TYPE_CHECKING:
 router = APIRouter(prefix="/health", tags=["health"])
 
 @router.get("/")
+@cache_response(ttl=1.0, cache_control="no-cache")
 async def health_check(settings: SettingsDep):
     """Basic health check endpoint."""
     return {
         "status": "healthy",
         "app_name": settings.app_name,
         "environment": settings.environment,
-        "debug": settings.debug
+        "debug": settings.debug,
+        "circuit_breakers": {
+            name: breaker["state"]
+            for name, breaker in breaker_registry.snapshot().items()
+            if ":token:" not in name
+        }
     }
 
 @router.get("/ready")
@@ -26,4 +35,9 @@ async def readiness_check():
 @router.get("/live")
 async def liveness_check():
     """Liveness check for Kubernetes/Docker health probes."""
-    return {"status": "alive"}
\ No newline at end of file
+    return {"status": "alive"}
+
+@router.get("/metrics")
+async def metrics_snapshot():
+    """Runtime metrics: circuit breaker state and other registered components."""
+    return metrics.snapshot()
\ No newline at end of file
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, HTTPException, Query, Body
+from typing import Optional, Dict, Any
+from src.core.loop_monitor import low_priority
+from src.services.job_service import job_service
+from src.api.responses import FastJSONResponse
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.post("")
+@low_priority
+async def submit_job(
+    user_id: str = Query(..., description="User ID from Kratos"),
+    job_type: str = Query(..., description="Job type, e.g. database_export"),
+    params: Dict[str, Any] = Body(default_factory=dict, description="Job parameters")
+):
+    """Submit a long-running job to the background queue."""
+    result = await job_service.submit(user_id, job_type, params)
+
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=result.get("status_code", 400),
+            detail=result.get("error", "Failed to submit job")
+        )
+
+    return FastJSONResponse({
+        "message": result["message"],
+        "job": result["job"]
+    }, status_code=202)
+
+@router.get("")
+async def list_jobs(
+    user_id: Optional[str] = Query(None, description="Only list this user's jobs"),
+    limit: int = Query(50, description="Maximum number of jobs to return")
+):
+    """List recent jobs."""
+    result = await job_service.list_jobs(user_id=user_id, limit=limit)
+    return FastJSONResponse({
+        "count": result["count"],
+        "jobs": result["jobs"]
+    })
+
+@router.get("/{job_id}")
+async def get_job_status(job_id: str):
+    """Get a job's status and progress."""
+    result = await job_service.get_job(job_id)
+
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=result.get("status_code", 404),
+            detail=result.get("error", "Job not found")
+        )
+
+    return FastJSONResponse(result["job"])
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job."""
+    result = await job_service.cancel_job(job_id)
+
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=result.get("status_code", 400),
+            detail=result.get("error", "Failed to cancel job")
+        )
+
+    return FastJSONResponse({
+        "message": result["message"],
+        "job": result["job"]
+    })
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Get the result of a finished job."""
+    result = await job_service.get_result(job_id)
+
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=result.get("status_code", 400),
+            detail=result.get("error", "Job result not available")
+        )
+
+    return FastJSONResponse({
+        "job": result["job"],
+        "result": result["result"]
+    })
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Header
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Request
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
 # from src.services.notion_service import notion_service  # Removed
 from src.services.user_notion_service import user_notion_service
 from src.services.kratos_service import kratos_service
+from src.services.export_service import export_service, ExportError
+from src.services.upsert_service import upsert_service
+from src.core.http_cache import cache_response
+from src.core.loop_monitor import low_priority
+from src.core.serialization import loads
 from src.models.user_notion import UserNotionConfig
+from src.api.responses import FastJSONResponse
 
 router = APIRouter(prefix="/notion", tags=["notion"])
 
@@ -26,10 +33,10 @@ async def check_notion_connection(
             )
         
         test_result = await user_notion_service.test_user_connection(notion_config)
-        return {
+        return FastJSONResponse({
             "user_id": x_user_id,
-            "connection": test_result.dict()
-        }
+            "connection": test_result
+        })
     else:
         # No app-level check available anymore - require user ID
         raise HTTPException(
@@ -73,18 +80,46 @@ async def configure_user_notion(
             detail=update_result.get("error", "Failed to update user configuration")
         )
     
-    return {
+    return FastJSONResponse({
         "message": "Notion configuration updated successfully",
         "user_id": user_id,
-        "connection_test": test_result.dict(),
+        "connection_test": test_result,
         "notion_user": {
             "id": test_result.user_id,
             "name": test_result.user_name,
             "workspace": test_result.workspace_name
         }
-    }
+    })
+
+@router.get("/users/{user_id}/databases/schema")
+@cache_response(ttl=30.0, tags=("database:{database_id}",))
+async def get_user_database_schema(
+    user_id: str,
+    database_id: Optional[str] = Query(None, description="Database ID (uses user's default if not provided)")
+):
+    """Get the property schema of a user's Notion database."""
+    user_result = await kratos_service.get_identity(user_id)
+    if not user_result.get("success"):
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    notion_config = user_result.get("notion_config")
+    if not notion_config or not notion_config.enabled:
+        raise HTTPException(
+            status_code=400, 
+            detail="User has no Notion configuration or it's disabled"
+        )
+    
+    result = await user_notion_service.get_database_schema(notion_config, database_id=database_id)
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=result.get("status_code", 400),
+            detail=result.get("error", "Failed to get database schema")
+        )
+    
+    return FastJSONResponse({"user_id": user_id, **result})
 
 @router.get("/users/{user_id}/databases/query")
+@cache_response(ttl=30.0, tags=("database:{database_id}",))
 async def query_user_database(
     user_id: str,
     database_id: Optional[str] = Query(None, description="Database ID (uses user's default if not provided)"),
@@ -125,12 +160,105 @@ async def query_user_database(
         "database_id": database_id or notion_config.notion_database_id
     }
 
+@router.get("/users/{user_id}/databases/export")
+@low_priority
+async def export_user_database(
+    user_id: str,
+    database_id: Optional[str] = Query(None, description="Database ID (uses user's default if not provided)"),
+    export_format: str = Query("ndjson", alias="format", description="ndjson, csv or parquet")
+):
+    """Stream a whole Notion database as NDJSON, CSV or Parquet.
+
+    The body is sent with chunked transfer encoding as query pages arrive.
+    If a page fails mid-stream the connection is closed without the final
+    chunk, so clients see a truncated transfer rather than a short file.
+    """
+    user_result = await kratos_service.get_identity(user_id)
+    if not user_result.get("success"):
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    notion_config = user_result.get("notion_config")
+    if not notion_config or not notion_config.enabled:
+        raise HTTPException(
+            status_code=400, 
+            detail="User has no Notion configuration or it's disabled"
+        )
+    
+    try:
+        db_id, writer = await export_service.open_export(notion_config, database_id, export_format)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(
+        export_service.stream(notion_config, db_id, writer),
+        media_type=writer.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{db_id}.{export_format}"'}
+    )
+
+async def _ndjson_records(request: Request):
+    """Parse an NDJSON request body line by line as it arrives."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield loads(line)
+    if buffer.strip():
+        yield loads(buffer)
+
+@router.post("/users/{user_id}/databases/upsert")
+@low_priority
+async def upsert_user_database_rows(
+    user_id: str,
+    request: Request,
+    key: str = Query(..., description="Property that uniquely identifies a row"),
+    database_id: Optional[str] = Query(None, description="Database ID (uses user's default if not provided)"),
+    dry_run: bool = Query(False, description="Report the plan without writing")
+):
+    """Create or update rows keyed by a unique property.
+
+    The body is a JSON array of records, or NDJSON (one record per line)
+    with ``Content-Type: application/x-ndjson``. Records map property names
+    to plain values; only changed properties are written.
+    """
+    user_result = await kratos_service.get_identity(user_id)
+    if not user_result.get("success"):
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    notion_config = user_result.get("notion_config")
+    if not notion_config or not notion_config.enabled:
+        raise HTTPException(
+            status_code=400, 
+            detail="User has no Notion configuration or it's disabled"
+        )
+    
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            records = _ndjson_records(request)
+        else:
+            records = loads(await request.body())
+            if not isinstance(records, list):
+                raise ValueError("Expected a JSON array of records")
+        result = await upsert_service.upsert(notion_config, records, key, database_id=database_id, dry_run=dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid records: {e}")
+    
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=result.get("status_code", 400),
+            detail=result.get("error", "Failed to upsert rows")
+        )
+    
+    return FastJSONResponse({"user_id": user_id, **result})
+
 @router.post("/users/{user_id}/pages")
 async def create_user_page(
     user_id: str,
     title: str = Query("New Page", description="Page title"),
     content: Optional[str] = Query(None, description="Page content"),
-    database_id: Optional[str] = Query(None, description="Database ID (uses user's default if not provided)")
+    database_id: Optional[str] = Query(None, description="Database ID (uses user's default if not provided)"),
+    idempotency_key: Optional[str] = Header(None, description="Repeats with the same key return the page already created instead of a duplicate")
 ):
     """Create a new page in user's Notion database."""
     # Get user's Notion config
@@ -150,12 +278,13 @@ async def create_user_page(
         notion_config,
         database_id=database_id,
         title=title,
-        content=content
+        content=content,
+        idempotency_key=idempotency_key
     )
     
     if not result.get("success"):
         raise HTTPException(
-            status_code=400,
+            status_code=409 if result.get("status_code") == 409 else 400,
             detail=result.get("error", "Failed to create page")
         )
     
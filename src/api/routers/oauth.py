@@ -1,6 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import RedirectResponse
 from typing import List, Optional
+from src.api.dependencies import OptionalSessionDep, SessionDep
+from src.services.consent_service import consent_service
 from src.services.hydra_service import hydra_service
+from src.core.http_cache import cache_response
 
 router = APIRouter(prefix="/oauth", tags=["oauth"])
 
@@ -43,9 +47,13 @@ async def create_oauth_client(
     return response_data
 
 @router.get("/clients")
-async def list_oauth_clients():
-    """List all OAuth clients."""
-    result = await hydra_service.list_oauth_clients()
+@cache_response(ttl=30.0, tags=("oauth_clients",))
+async def list_oauth_clients(
+    page_size: Optional[int] = Query(None, ge=1, le=500),
+    page_token: Optional[str] = None
+):
+    """List OAuth clients: all of them, or one page when paging params are given."""
+    result = await hydra_service.list_oauth_clients(page_size=page_size, page_token=page_token)
     
     if not result.get("success"):
         raise HTTPException(
@@ -53,12 +61,16 @@ async def list_oauth_clients():
             detail=result.get("error", "Failed to list OAuth clients")
         )
     
-    return {
+    response_data = {
         "count": result.get("count", 0),
         "clients": result.get("clients", [])
     }
+    if page_size is not None or page_token is not None:
+        response_data["next_page_token"] = result.get("next_page_token")
+    return response_data
 
 @router.get("/clients/{client_id}")
+@cache_response(ttl=30.0, tags=("oauth_client:{client_id}",))
 async def get_oauth_client(client_id: str):
     """Get a specific OAuth client by ID."""
     result = await hydra_service.get_oauth_client(client_id)
@@ -69,12 +81,8 @@ async def get_oauth_client(client_id: str):
             detail=result.get("error", "OAuth client not found")
         )
     
-    # Remove sensitive information
-    client_data = result["client"].copy()
-    if "client_secret" in client_data:
-        del client_data["client_secret"]
-    
-    return client_data
+    # Secrets are stripped by the service before clients are cached
+    return result["client"]
 
 @router.delete("/clients/{client_id}")
 async def delete_oauth_client(client_id: str):
@@ -100,4 +108,90 @@ async def get_consent_request(consent_challenge: str):
             detail=result.get("error", "Consent request not found")
         )
     
-    return result["consent_request"]
\ No newline at end of file
+    return result["consent_request"]
+
+
+@router.get("/login")
+async def handle_login(
+    session: OptionalSessionDep,
+    login_challenge: str = Query(..., description="Hydra login challenge")
+):
+    """Login endpoint Hydra redirects to.
+
+    Remembered logins, and callers with a valid Kratos session, are accepted immediately.
+    """
+    subject = session["session"]["identity_id"] if session else None
+    result = await consent_service.login(login_challenge, subject=subject)
+    
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=result.get("status_code", 400),
+            detail=result.get("error", "Failed to handle login request")
+        )
+    
+    if result["status"] == "accepted":
+        return RedirectResponse(result["redirect_to"], status_code=302)
+    return result
+
+@router.post("/login/{login_challenge}/accept")
+async def accept_login(
+    login_challenge: str,
+    session: SessionDep,
+    remember: bool = Query(True, description="Remember this login")
+):
+    """Accept an OAuth login request as the caller's own Kratos identity."""
+    result = await consent_service.login(
+        login_challenge,
+        subject=session["session"]["identity_id"],
+        remember=remember
+    )
+    
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=result.get("status_code", 400),
+            detail=result.get("error", "Failed to accept login request")
+        )
+    
+    return {"redirect_to": result["redirect_to"], "skipped": result["skipped"]}
+
+@router.get("/consent")
+async def handle_consent(
+    session: OptionalSessionDep,
+    consent_challenge: str = Query(..., description="Hydra consent challenge")
+):
+    """Consent endpoint Hydra redirects to: remembered grants are accepted immediately."""
+    subject = session["session"]["identity_id"] if session else None
+    result = await consent_service.consent(consent_challenge, subject=subject)
+    
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=result.get("status_code", 400),
+            detail=result.get("error", "Failed to handle consent request")
+        )
+    
+    if result["status"] == "accepted":
+        return RedirectResponse(result["redirect_to"], status_code=302)
+    return result
+
+@router.post("/consent/{consent_challenge}/accept")
+async def accept_consent(
+    consent_challenge: str,
+    session: SessionDep,
+    grant_scope: List[str] = Query(..., description="Scopes the user approved"),
+    remember: bool = Query(True, description="Remember this grant")
+):
+    """Accept an OAuth consent request with the approved scopes; only its own subject may."""
+    result = await consent_service.consent(
+        consent_challenge,
+        grant_scope=grant_scope,
+        remember=remember,
+        subject=session["session"]["identity_id"]
+    )
+    
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=result.get("status_code", 400),
+            detail=result.get("error", "Failed to accept consent request")
+        )
+    
+    return {"redirect_to": result["redirect_to"], "grant_scope": result["grant_scope"]}
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Header, HTTPException, Request
+from typing import Optional
+from src.services.webhook_service import webhook_service
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+
+@router.post("/notion")
+async def receive_notion_webhook(
+    request: Request,
+    x_notion_signature: Optional[str] = Header(None, description="HMAC-SHA256 of the body, 'sha256=<hex>'")
+):
+    """Receive a Notion webhook event.
+
+    The signature is checked against the raw body, duplicates are
+    acknowledged without reprocessing, and accepted events are queued for
+    cache invalidation.
+    """
+    result = await webhook_service.receive(await request.body(), x_notion_signature)
+    if not result.get("success"):
+        raise HTTPException(status_code=result.get("status_code", 400), detail=result.get("error"))
+    return result
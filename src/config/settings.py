@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
-from pydantic import Field
+from typing import Optional, Dict, List
+from pydantic import Field, SecretStr
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
@@ -23,15 +23,168 @@ class Settings(BaseSettings):
     # Ory Kratos
     ory_kratos_url: str = Field(default="http://localhost:4433")
     ory_kratos_admin_url: Optional[str] = None
+    kratos_session_cookie: str = "ory_kratos_session"
+    session_cache_max_ttl: float = 300.0  # sessions are cached until expires_at, at most this long
     
     # Ory Hydra
     ory_hydra_url: str = Field(default="http://localhost:4444")
     ory_hydra_admin_url: Optional[str] = None
+    hydra_page_size: int = 250
+    oauth_client_cache_ttl: float = 300.0
+    oauth_remember_for: int = 3600
     
     # Notion - App-level defaults (for admin/fallback)
     notion_api_key: Optional[str] = None
     notion_database_id: Optional[str] = None
     
+    # Background jobs
+    jobs_enabled: bool = True
+    jobs_db_path: str = "data/jobs.db"
+    jobs_data_dir: str = "data/jobs"
+    jobs_max_workers: int = 4
+    jobs_per_user_concurrency: int = 2
+    jobs_poll_interval: float = 1.0
+    jobs_stale_after: float = 30.0
+    
+    # Fleet Notion audit (distinct keys checked at once; identities listed per Kratos page)
+    notion_audit_concurrency: int = 8
+    notion_audit_page_size: int = 250
+    
+    # Admission control (requests per second; burst = rate * burst factor)
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"  # "memory" or "sqlite" for multi-worker hosts
+    rate_limit_sqlite_path: str = "data/rate_limit.db"
+    rate_limit_user_rate: float = 10.0
+    rate_limit_client_rate: float = 20.0
+    rate_limit_route_rate: float = 100.0
+    rate_limit_route_limits: Dict[str, float] = Field(default_factory=dict)
+    rate_limit_burst_factor: float = 2.0
+    rate_limit_max_concurrency: int = 256
+    # Peers whose X-Forwarded-For is believed when keying client buckets (e.g. the load balancer)
+    rate_limit_trusted_proxies: List[str] = Field(default_factory=list)
+    
+    # Circuit breakers (per upstream, plus per Notion token for auth failures)
+    breaker_failure_rate: float = 0.5
+    breaker_slow_call_seconds: float = 5.0
+    breaker_slow_call_rate: float = 0.8
+    breaker_minimum_calls: int = 10
+    breaker_window_seconds: float = 30.0
+    breaker_open_seconds: float = 15.0
+    breaker_auth_failures: int = 3
+    breaker_auth_open_seconds: float = 60.0
+    
+    # Retries (idempotent requests, or requests carrying an idempotency key)
+    retry_max_attempts: int = 3
+    retry_base_delay: float = 0.1
+    retry_max_delay: float = 2.0
+    retry_deadline_seconds: float = 30.0
+
+    # Idempotency keys on Notion page creates (Notion has none; replays are answered from the shared cache)
+    idempotency_key_ttl: float = 86400.0
+
+    # Caller deadlines: X-Request-Deadline (seconds, or a Unix timestamp) and MCP tool calls
+    # (a "_timeout" argument, else mcp_tool_timeout) bound every upstream call they make;
+    # HTTP handlers are cancelled when the client disconnects
+    request_deadline_default: Optional[float] = None
+    request_deadline_max: float = 300.0
+    mcp_tool_timeout: Optional[float] = 120.0
+    cancel_on_disconnect: bool = True
+
+    # Hedged Kratos reads: a second copy of a read still running after the observed
+    # hedge_percentile latency, within a process-wide budget of hedge_budget_ratio extra
+    # requests per request
+    kratos_hedging: bool = False
+    hedge_percentile: float = 0.95
+    hedge_window: int = 1000
+    hedge_min_samples: int = 50
+    hedge_min_delay: float = 0.005
+    hedge_budget_ratio: float = 0.05
+    hedge_budget_burst: float = 10.0
+
+    # HTTP/2 for upstream clients, opt-in by name ("notion", "kratos", "hydra"; needs the h2
+    # package). TLS upstreams negotiate it and fall back to HTTP/1.1; http2_cleartext sends
+    # h2c with prior knowledge to http:// upstreams, falling back if the server rejects it.
+    http2_upstreams: List[str] = []
+    http2_cleartext: bool = False
+    http2_max_concurrent_streams: int = 100
+
+    # Web workers (0 = one per CPU); with more than one, use the sqlite rate limit backend
+    web_workers: int = 1
+
+    # Shared cache (one SQLite file read by every worker on the host; TTLs in seconds)
+    shared_cache_enabled: bool = True
+    shared_cache_path: str = "data/shared_cache.db"
+    shared_cache_local_entries: int = 1024
+    shared_cache_sync_interval: float = 0.5
+    identity_cache_ttl: float = 60.0
+    schema_cache_ttl: float = 300.0
+    health_cache_ttl: float = 5.0
+
+    # Identity lookup batching: concurrent cache misses share one Kratos list call (1 disables)
+    identity_batch_size: int = 100
+    identity_batch_window: float = 0.002
+
+    # Database exports
+    export_row_group_size: int = 1000
+
+    # Bulk upserts (writes queued at once; the adaptive Notion limit decides how many run)
+    upsert_concurrency: int = 32
+
+    # Adaptive Notion limits per token (Notion allows about three requests per second per
+    # integration on average): AIMD on 429/503 and latency; rates in requests per second
+    notion_adaptive_limits: bool = True
+    notion_initial_concurrency: float = 3.0
+    notion_max_concurrency: int = 32
+    notion_initial_rate: float = 3.0
+    notion_min_rate: float = 0.5
+    notion_max_rate: float = 30.0
+    notion_aimd_backoff: float = 0.5
+    notion_aimd_latency_factor: float = 3.0
+    # Interactive calls granted per batch call while both wait on the same token
+    notion_interactive_weight: int = 4
+
+    # Notion webhooks (secret = the subscription's verification token)
+    notion_webhook_secret: Optional[SecretStr] = None
+    notion_webhook_dedupe_seconds: float = 86400.0
+    notion_webhook_queue_size: int = 1000
+
+    # HTTP response caching (per-route TTL overrides keyed by path template)
+    http_cache_enabled: bool = True
+    http_cache_ttls: Dict[str, float] = {}
+
+    # Tracing (OTLP/JSON spans, written from a background thread; exporter is "none", "stdout" or "file")
+    tracing_exporter: str = "none"
+    tracing_file: str = "data/traces.jsonl"
+    tracing_sample_rate: float = 1.0
+    tracing_service_name: str = "notion-ory-agent"
+    tracing_queue_size: int = 10000
+
+    # Admin endpoints under /admin (Notion connection audit); every /admin call needs ADMIN_TOKEN
+    admin_enabled: bool = False
+    admin_token: Optional[SecretStr] = None
+
+    # Diagnostics (sampling profiler and tracemalloc endpoints under /admin, and the MCP
+    # "_profile" tool argument; both need ADMIN_TOKEN)
+    profiling_enabled: bool = False
+    profiling_interval: float = 0.005
+    profiling_max_seconds: float = 60.0
+
+    # Event loop monitor (seconds); low-priority routes and job dispatch are shed while lag
+    # exceeds load_shed_lag (0 disables shedding)
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval: float = 0.1
+    loop_lag_window: int = 600
+    slow_callback_seconds: float = 0.1
+    load_shed_lag: float = 0.25
+
+    # Logging (written from a background thread; format is "json" or "text", file None = stderr)
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_file: Optional[str] = None
+    log_queue_size: int = 10000
+    log_debug_sample_rate: float = 0.1
+    log_requests: bool = True
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         # Set admin URLs if not provided
@@ -0,0 +1,225 @@
+import asyncio
+import functools
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, Optional
+from src.config import settings
+from src.core.metrics import metrics
+
+# Status codes meaning "slow down" rather than "this request was wrong"
+BACKOFF_STATUS_CODES = frozenset({429, 503})
+
+# Weight of each new response in the smoothed latency
+LATENCY_SMOOTHING = 0.2
+
+# Priority lanes: live MCP tools and REST routes, versus jobs, sync and bulk exports/imports
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+_lane: ContextVar[str] = ContextVar("notion_lane", default=INTERACTIVE)
+
+@contextmanager
+def priority(lane: str) -> Iterator[None]:
+    """Send Notion calls made inside the block in ``lane``."""
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+def batch(fn: Callable) -> Callable:
+    """Run a coroutine function's Notion calls (and tasks it spawns) in the batch lane."""
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with priority(BATCH):
+            return await fn(*args, **kwargs)
+    return wrapper
+
+class AdaptiveLimit:
+    """AIMD concurrency and rate limit for one credential.
+
+    Every healthy response raises the limit callers are waiting on by
+    ``1 / limit``, so it grows by about one per round trip's worth of
+    responses. A 429/503, or smoothed latency rising past
+    ``notion_aimd_latency_factor`` times the baseline, multiplies both by
+    ``notion_aimd_backoff``; responses to requests sent before the last
+    decrease don't count again, so one burst of 429s is one decrease. A
+    ``Retry-After`` also pauses new requests.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.concurrency = settings.notion_initial_concurrency
+        self.rate = settings.notion_initial_rate
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.decreases = 0
+        self.rate_limited = False
+        self._next_send = 0.0
+        self._decreased_at = 0.0
+        self._lanes: Dict[str, Deque[asyncio.Future]] = {INTERACTIVE: deque(), BATCH: deque()}
+        self._interactive_streak = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _has_slot(self) -> bool:
+        return self.in_flight < max(1, int(self.concurrency))
+
+    def _grant(self, now: float) -> float:
+        self.in_flight += 1
+        send_at = max(now, self._next_send)
+        self._next_send = send_at + 1.0 / self.rate
+        return send_at
+
+    async def acquire(self, lane: str = INTERACTIVE) -> float:
+        """Wait for a concurrency slot and a send time in ``lane``; returns the send time."""
+        now = time.monotonic()
+        if not any(self._lanes.values()) and self._has_slot() and now >= self._next_send:
+            self.rate_limited = False
+            return self._grant(now)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._lanes[lane].append(waiter)
+        self._wake()
+        try:
+            return await waiter
+        except BaseException:
+            if waiter in self._lanes[lane]:
+                self._lanes[lane].remove(waiter)
+            elif not waiter.cancelled():
+                # Granted a slot but cancelled before using it
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _next_lane(self) -> Optional[str]:
+        interactive, batch = self._lanes[INTERACTIVE], self._lanes[BATCH]
+        if interactive and (not batch or self._interactive_streak < settings.notion_interactive_weight):
+            return INTERACTIVE
+        return BATCH if batch else None
+
+    def _wake(self) -> None:
+        """Grant free slots to waiters, interactive first, as the rate allows.
+
+        Waiters are only granted when they may send right away, so queued
+        batch work never holds a slot or a send time an interactive call
+        arriving later could have used. While both lanes wait, every
+        ``notion_interactive_weight`` interactive grants are followed by a
+        batch one, so batch work slows down but never starves.
+        """
+        while self._has_slot():
+            lane = self._next_lane()
+            if lane is None:
+                return
+            waiter = self._lanes[lane][0]
+            if waiter.done():
+                self._lanes[lane].popleft()
+                continue
+            now = time.monotonic()
+            if now < self._next_send:
+                self.rate_limited = True
+                self._schedule(waiter.get_loop(), self._next_send - now)
+                return
+            self._lanes[lane].popleft()
+            self._interactive_streak = self._interactive_streak + 1 if lane == INTERACTIVE else 0
+            waiter.set_result(self._grant(now))
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop, delay: float) -> None:
+        if self._timer is not None and self._timer_loop is loop and not self._timer.cancelled():
+            return
+        self._timer_loop = loop
+        self._timer = loop.call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._wake()
+
+    def record(self, sent_at: float, status_code: Optional[int], elapsed: float, retry_after: float = 0.0) -> None:
+        """Feed back one response (``status_code`` None for a transport error)."""
+        if status_code in BACKOFF_STATUS_CODES:
+            if retry_after > 0:
+                self._next_send = max(self._next_send, time.monotonic() + retry_after)
+            self._decrease(sent_at)
+            return
+        if status_code is None or status_code >= 500:
+            return
+
+        self.latency = elapsed if self.latency is None else self.latency + (elapsed - self.latency) * LATENCY_SMOOTHING
+        # The baseline follows improvements immediately and regressions slowly
+        self.baseline = elapsed if self.baseline is None else min(elapsed, self.baseline + (elapsed - self.baseline) * 0.01)
+        if self.latency > self.baseline * settings.notion_aimd_latency_factor:
+            self._decrease(sent_at)
+            return
+
+        # Only the limit callers are actually waiting on grows, so an unused one can't balloon
+        if self.in_flight >= int(self.concurrency):
+            self.concurrency = min(settings.notion_max_concurrency, self.concurrency + 1.0 / self.concurrency)
+        elif self.rate_limited:
+            self.rate = min(settings.notion_max_rate, self.rate + 1.0 / self.rate)
+        self._wake()
+
+    def _decrease(self, sent_at: float) -> None:
+        if sent_at < self._decreased_at:
+            return
+        self._decreased_at = time.monotonic()
+        self.decreases += 1
+        self.concurrency = max(1.0, self.concurrency * settings.notion_aimd_backoff)
+        self.rate = max(settings.notion_min_rate, self.rate * settings.notion_aimd_backoff)
+        # Smoothed latency starts over so the same slow period isn't punished twice
+        self.latency = self.baseline
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "concurrency": round(self.concurrency, 2),
+            "rate": round(self.rate, 2),
+            "in_flight": self.in_flight,
+            "waiting": {lane: len(waiters) for lane, waiters in self._lanes.items()},
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "baseline_ms": round(self.baseline * 1000, 1) if self.baseline is not None else None,
+            "decreases": self.decreases
+        }
+
+class AdaptiveLimiter:
+    """Adaptive limits keyed by credential fingerprint, created on first use."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.limits: Dict[str, AdaptiveLimit] = {}
+
+    def get(self, key: str) -> AdaptiveLimit:
+        limit = self.limits.get(key)
+        if limit is None:
+            limit = self.limits[key] = AdaptiveLimit(key)
+        return limit
+
+    @asynccontextmanager
+    async def slot(self, key: str) -> AsyncIterator["_Slot"]:
+        """Hold a slot for one request in the current lane; call ``slot.record(...)`` with the outcome."""
+        limit = self.get(key)
+        sent_at = await limit.acquire(_lane.get())
+        slot = _Slot(limit, sent_at)
+        try:
+            yield slot
+        finally:
+            limit.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {key: limit.snapshot() for key, limit in sorted(self.limits.items())}
+
+class _Slot:
+    def __init__(self, limit: AdaptiveLimit, sent_at: float):
+        self.limit = limit
+        self.sent_at = sent_at
+
+    def record(self, status_code: Optional[int], elapsed: float, retry_after: float = 0.0) -> None:
+        self.limit.record(self.sent_at, status_code, elapsed, retry_after)
+
+# Singleton instance
+notion_limits = AdaptiveLimiter("notion")
+metrics.register("notion_limits", notion_limits.snapshot)
@@ -0,0 +1,115 @@
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+from src.core.deadline import within_deadline
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+class _Batch:
+    def __init__(self):
+        self.futures: Dict[Hashable, asyncio.Future] = {}
+        self.waiters = 0
+        self.task: Optional[asyncio.Task] = None
+
+class BatchLoader(Generic[K, V]):
+    """Coalesce concurrent single-key lookups into batched calls (the DataLoader pattern).
+
+    ``load(key)`` queues the key and returns once the batch holding it is
+    fetched. A batch is sent ``window`` seconds after its first key (0 =
+    at the end of the current event loop tick) or as soon as it holds
+    ``max_batch`` keys. Concurrent loads of the same key share one slot.
+    ``batch_fn`` receives the distinct keys and returns a value for each;
+    keys it leaves out resolve to ``None``.
+
+    A caller that is cancelled doesn't cancel the batch for the others;
+    once every caller waiting on a batch is gone it is dropped, or
+    cancelled if already sent.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[K]], Awaitable[Dict[K, V]]],
+        max_batch: int = 100,
+        window: float = 0.0
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.window = window
+        self.loads = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self._pending = _Batch()
+        self._timer: Optional[asyncio.Handle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def load(self, key: K) -> Optional[V]:
+        self.loads += 1
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Whatever was queued on another (finished) loop will never be sent
+            self._pending, self._timer, self._loop = _Batch(), None, loop
+        batch = self._pending
+        future = batch.futures.get(key)
+        if future is None:
+            future = batch.futures[key] = loop.create_future()
+            if len(batch.futures) >= self.max_batch:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._dispatch) if self.window > 0 else loop.call_soon(self._dispatch)
+        batch.waiters += 1
+        try:
+            # One caller giving up (or running out of time) must not cancel the lookup for everyone else
+            async with within_deadline("batched load"):
+                return await asyncio.shield(future)
+        finally:
+            batch.waiters -= 1
+            if batch.waiters == 0 and not future.done():
+                self._abandon(batch)
+
+    def _abandon(self, batch: _Batch) -> None:
+        if batch.task is not None:
+            batch.task.cancel()
+            return
+        if batch is self._pending:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending = _Batch()
+        for future in batch.futures.values():
+            future.cancel()
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, _Batch()
+        if batch.futures:
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch.futures))
+            # The batch serves several callers, so it runs outside the first one's deadline and log fields
+            batch.task = asyncio.get_running_loop().create_task(self._run(batch.futures), context=contextvars.Context())
+
+    async def _run(self, futures: Dict[K, asyncio.Future]) -> None:
+        try:
+            values = await self.batch_fn(list(futures))
+        except Exception as e:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except BaseException:
+            for future in futures.values():
+                future.cancel()
+            raise
+        for key, future in futures.items():
+            if not future.done():
+                future.set_result(values.get(key))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "loads": self.loads,
+            "batches": self.batches,
+            "largest_batch": self.largest_batch,
+            "pending": len(self._pending.futures)
+        }
@@ -0,0 +1,155 @@
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Deque, Dict, Optional, Tuple
+from src.core.metrics import metrics
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, breaker: str, retry_after: float):
+        self.breaker = breaker
+        self.retry_after = retry_after
+        super().__init__(f"{breaker} is unavailable (circuit open, retry in {retry_after:.1f}s)")
+
+    def to_result(self) -> Dict[str, Any]:
+        """Structured failure in the services' result-dict format."""
+        return {
+            "success": False,
+            "error": str(self),
+            "status_code": 503,
+            "circuit_open": True,
+            "breaker": self.breaker,
+            "retry_after": round(self.retry_after, 3)
+        }
+
+class CircuitBreaker:
+    """Sliding-window circuit breaker tripping on error rate or slow-call rate.
+
+    While closed, outcomes from the last ``window`` seconds are kept. Once at
+    least ``minimum_calls`` were seen and the failure or slow-call rate
+    crosses its threshold the breaker opens and fails calls fast for
+    ``open_duration`` seconds. It then lets ``half_open_max_calls`` probes
+    through: a successful probe closes it, a failed one re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_threshold: float = 5.0,
+        slow_call_rate_threshold: float = 0.8,
+        minimum_calls: int = 10,
+        window: float = 30.0,
+        open_duration: float = 15.0,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.window = window
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = BreakerState.CLOSED
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._outcomes: Deque[Tuple[float, bool, bool]] = deque()
+        self._probes_in_flight = 0
+
+    def _prune(self, now: float) -> None:
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+    def _rates(self) -> Tuple[int, float, float]:
+        calls = len(self._outcomes)
+        if not calls:
+            return 0, 0.0, 0.0
+        failures = sum(1 for _, failed, _ in self._outcomes if failed)
+        slow = sum(1 for _, _, is_slow in self._outcomes if is_slow)
+        return calls, failures / calls, slow / calls
+
+    def _open(self, now: float) -> None:
+        self.state = BreakerState.OPEN
+        self.opened_at = now
+        self.times_opened += 1
+        self._outcomes.clear()
+        self._probes_in_flight = 0
+
+    def before_call(self) -> None:
+        """Admit a call or raise :class:`CircuitOpenError`."""
+        now = time.monotonic()
+        if self.state == BreakerState.OPEN:
+            remaining = self.opened_at + self.open_duration - now
+            if remaining > 0:
+                raise CircuitOpenError(self.name, remaining)
+            self.state = BreakerState.HALF_OPEN
+            self._probes_in_flight = 0
+
+        if self.state == BreakerState.HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_max_calls:
+                raise CircuitOpenError(self.name, self.open_duration / 2)
+            self._probes_in_flight += 1
+
+    def record(self, success: Optional[bool], duration: float = 0.0) -> None:
+        """Record a call outcome; ``None`` releases the slot without counting it."""
+        now = time.monotonic()
+        if self.state == BreakerState.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if success is None:
+                return
+            if success and duration < self.slow_call_threshold:
+                self.state = BreakerState.CLOSED
+                self.opened_at = None
+                self._outcomes.clear()
+            else:
+                self._open(now)
+            return
+
+        if success is None or self.state != BreakerState.CLOSED:
+            return
+        self._outcomes.append((now, not success, duration >= self.slow_call_threshold))
+        self._prune(now)
+        calls, failure_rate, slow_rate = self._rates()
+        if calls >= self.minimum_calls and (
+            failure_rate >= self.failure_rate_threshold
+            or slow_rate >= self.slow_call_rate_threshold
+        ):
+            self._open(now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._prune(time.monotonic())
+        calls, failure_rate, slow_rate = self._rates()
+        return {
+            "state": self.state.value,
+            "calls_in_window": calls,
+            "failure_rate": round(failure_rate, 3),
+            "slow_call_rate": round(slow_rate, 3),
+            "times_opened": self.times_opened
+        }
+
+class BreakerRegistry:
+    """Named breakers, created on first use."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str, **config: Any) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = self._breakers[name] = CircuitBreaker(name, **config)
+        return breaker
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: breaker.snapshot() for name, breaker in sorted(self._breakers.items())}
+
+# Singleton instance
+breaker_registry = BreakerRegistry()
+metrics.register("circuit_breakers", breaker_registry.snapshot)
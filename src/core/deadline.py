@@ -0,0 +1,69 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator, Optional
+from src.config import settings
+
+# Header values above this are Unix timestamps rather than seconds from now
+_ABSOLUTE_AFTER = 1e9
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the caller's deadline passes before upstream work finished."""
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None when there is none."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Give calls made inside the block at most ``seconds``; an enclosing, earlier deadline wins."""
+    if seconds is None:
+        yield
+        return
+    current = _deadline.get()
+    at = time.monotonic() + seconds
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def parse_deadline(value: Optional[str]) -> Optional[float]:
+    """Seconds allowed by an ``X-Request-Deadline`` header, capped at ``request_deadline_max``.
+
+    The header is either the seconds the client will wait (``2.5``) or a
+    Unix timestamp; malformed values are ignored.
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        return None
+    if not math.isfinite(seconds):
+        return None
+    if seconds > _ABSOLUTE_AFTER:
+        seconds -= time.time()
+    return min(max(seconds, 0.0), settings.request_deadline_max)
+
+@asynccontextmanager
+async def within_deadline(what: str) -> AsyncIterator[None]:
+    """Cancel the block when the current deadline passes, raising :class:`DeadlineExceeded`."""
+    left = remaining()
+    if left is None:
+        yield
+        return
+    if left <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded before {what}")
+    try:
+        async with asyncio.timeout(left) as scope:
+            yield
+    except TimeoutError as e:
+        if scope.expired():
+            raise DeadlineExceeded(f"Deadline exceeded during {what}") from e
+        raise
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+from src.config import settings
+from src.core.metrics import metrics
+
+T = TypeVar("T")
+
+class HedgeBudget:
+    """Process-wide allowance for hedge requests.
+
+    Every primary request earns ``hedge_budget_ratio`` of a token and every
+    hedge spends one, up to ``hedge_budget_burst`` saved; so across all
+    upstreams hedging adds at most that fraction of extra load even when an
+    upstream slows down across the board.
+    """
+
+    def __init__(self):
+        self.tokens = float(settings.hedge_budget_burst)
+
+    def earn(self) -> None:
+        self.tokens = min(settings.hedge_budget_burst, self.tokens + settings.hedge_budget_ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+class Hedger:
+    """Send a second copy of a slow idempotent request and take the first answer.
+
+    The hedge goes out once the first attempt has run longer than the
+    observed ``hedge_percentile`` latency (so roughly one request in twenty
+    at p95), and only if the shared budget allows. The slower copy is
+    cancelled. Until ``hedge_min_samples`` latencies are seen nothing is
+    hedged.
+
+    Latency samples are always the primary's: when a hedge wins, the time the
+    primary had run when it was cancelled is recorded as a lower bound, so
+    the slow tail that triggers hedging stays in the window.
+    """
+
+    def __init__(self, name: str, budget: Optional[HedgeBudget] = None):
+        self.name = name
+        self.budget = budget or hedge_budget
+        self.latencies: Deque[float] = deque(maxlen=settings.hedge_window)
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.denied = 0
+        self._delay: Optional[float] = None
+        self._delay_samples = 0
+        _hedgers.append(self)
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little history."""
+        if len(self.latencies) < settings.hedge_min_samples:
+            return None
+        # Sorting the window on every call would cost more than it saves; refresh every few samples
+        if self._delay is None or self.requests - self._delay_samples >= 16:
+            ordered = sorted(self.latencies)
+            index = min(len(ordered) - 1, int(settings.hedge_percentile * len(ordered)))
+            self._delay = max(settings.hedge_min_delay, ordered[index])
+            self._delay_samples = self.requests
+        return self._delay
+
+    async def run(self, send: Callable[[], Awaitable[T]]) -> T:
+        self.requests += 1
+        self.budget.earn()
+        delay = self.delay()
+        primary = asyncio.ensure_future(send())
+        started = {primary: time.monotonic()}
+        primary_latency: Optional[float] = None
+        try:
+            if delay is not None:
+                await asyncio.wait({primary}, timeout=delay)
+                if not primary.done():
+                    if self.budget.try_spend():
+                        self.hedged += 1
+                        started[asyncio.ensure_future(send())] = time.monotonic()
+                    else:
+                        self.denied += 1
+            pending = set(started)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if primary in done:
+                    primary_latency = time.monotonic() - started[primary]
+                # Prefer a successful answer; surface a failure only once both copies failed
+                winner = next((task for task in done if not task.cancelled() and task.exception() is None), None)
+                if winner is not None or not pending:
+                    winner = winner or next(iter(done))
+                    break
+            if primary_latency is None:
+                primary_latency = time.monotonic() - started[primary]
+        finally:
+            for task in started:
+                if not task.done():
+                    task.cancel()
+
+        if winner is not primary:
+            self.hedge_wins += 1
+        result = winner.result()
+        # Never the caller's wait: a hedge's quick answer, or leaving cancelled primaries
+        # out, would pull the threshold down and make hedging ever more frequent
+        self.latencies.append(primary_latency)
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        delay = self.delay()
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "denied": self.denied,
+            "hedge_after_ms": round(delay * 1000, 1) if delay is not None else None
+        }
+
+_hedgers: List[Hedger] = []
+
+def hedging_snapshot() -> Dict[str, Any]:
+    return {
+        "budget_tokens": round(hedge_budget.tokens, 2),
+        **{hedger.name: hedger.snapshot() for hedger in _hedgers}
+    }
+
+# Singleton instance
+hedge_budget = HedgeBudget()
+metrics.register("hedging", hedging_snapshot)
@@ -0,0 +1,109 @@
+import hashlib
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.config import settings
+from src.core.shared_cache import shared_cache
+
+# Tag versions must outlive every response recorded against them
+TAG_VERSION_TTL = 86400.0
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How a GET route's responses are validated and cached.
+
+    ``ttl`` is the server-side cache lifetime (0 = ETag/304 only).
+    ``tags`` are templates filled from path and query params, e.g. ``"identity:{identity_id}"``;
+    invalidating a tag drops every cached response recorded under it.
+    A response whose tags can't all be filled is not cached server-side.
+    """
+    ttl: float = 0.0
+    tags: Tuple[str, ...] = ()
+    cache_control: str = "private, no-cache"
+
+    def tags_for(self, params: Dict[str, Any]) -> Optional[List[str]]:
+        try:
+            return [tag.format(**params) for tag in self.tags]
+        except KeyError:
+            return None
+
+def cache_response(ttl: float = 0.0, tags: Tuple[str, ...] = (), cache_control: str = "private, no-cache") -> Callable:
+    """Mark a route endpoint for conditional requests and response caching.
+
+    Apply below ``@router.get(...)`` so the router registers the marked function.
+    """
+    policy = CachePolicy(ttl=ttl, tags=tuple(tags), cache_control=cache_control)
+
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.cache_policy = policy
+        return endpoint
+    return decorator
+
+def strong_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 weak comparison, as required for ``If-None-Match``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+class ResponseCache:
+    """Server-side cache of GET responses, shared by all workers.
+
+    Each tag has a random version stored in the shared cache. A response
+    records the versions of its tags when the handler starts; invalidating a
+    tag deletes its version (broadcast to every worker), so any response
+    recorded under the old version stops matching. Versions are read before
+    the handler runs, so a write racing with the request can never be
+    cached as fresh.
+    """
+
+    async def tag_versions(self, tags: List[str]) -> Dict[str, str]:
+        versions = {}
+        for tag in tags:
+            version = await shared_cache.get("http_tags", tag)
+            if version is None:
+                version = uuid.uuid4().hex
+                await shared_cache.set("http_tags", tag, version, TAG_VERSION_TTL)
+            versions[tag] = version
+        return versions
+
+    async def get(self, key: str, versions: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        entry = await shared_cache.get("http_responses", key)
+        if entry is None or entry["tags"] != versions:
+            return None
+        return entry
+
+    async def store(
+        self,
+        key: str,
+        versions: Dict[str, str],
+        body: bytes,
+        media_type: Optional[str],
+        etag: str,
+        ttl: float
+    ) -> None:
+        try:
+            text = body.decode("utf-8")
+        except UnicodeDecodeError:
+            return
+        await shared_cache.set("http_responses", key, {
+            "tags": versions,
+            "body": text,
+            "media_type": media_type,
+            "etag": etag
+        }, ttl)
+
+    async def invalidate(self, *tags: str) -> None:
+        """Drop cached responses for ``tags`` in every worker; called from write paths."""
+        if not settings.http_cache_enabled:
+            return
+        for tag in tags:
+            await shared_cache.delete("http_tags", tag)
+
+# Singleton instance
+response_cache = ResponseCache()
@@ -0,0 +1,207 @@
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+from src.config import settings
+from src.core.metrics import metrics
+from src.core.serialization import dumps_str
+from src.core.tracing import tracer
+
+# LogRecord attributes that are not user-supplied ``extra`` fields
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_log_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("log_context", default=None)
+
+def new_request_id() -> str:
+    return os.urandom(8).hex()
+
+def current_context() -> Dict[str, Any]:
+    return _log_context.get() or {}
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[Dict[str, Any]]:
+    """Add correlation fields to every record logged inside the block.
+
+    Fields nest: an MCP tool call inside a request keeps the request ID.
+    The yielded dict is shared with code further down, so ``bind`` from a
+    dependency or a worker thread is still seen by the outer block.
+    """
+    fields = {**current_context(), **{key: value for key, value in fields.items() if value is not None}}
+    token = _log_context.set(fields)
+    try:
+        yield fields
+    finally:
+        _log_context.reset(token)
+
+def bind(**fields: Any) -> None:
+    """Add correlation fields to the enclosing ``log_context`` (no-op outside one)."""
+    context = _log_context.get()
+    if context is not None:
+        context.update({key: value for key, value in fields.items() if value is not None})
+
+class DebugSampler(logging.Filter):
+    """Keep a fraction of DEBUG records; other levels always pass.
+
+    Sampling is by request ID when there is one, so a sampled request keeps
+    all of its debug lines rather than a random scattering of them.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        request_id = current_context().get("request_id")
+        if request_id:
+            return zlib.crc32(request_id.encode("utf-8")) / 0xFFFFFFFF < self.rate
+        return random.random() < self.rate
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Hand records to the writer thread, leaving the formatting to it.
+
+    The caller only merges the message args, so the listener never reads
+    objects the event loop may still be changing. It also captures the
+    correlation fields and does a non-blocking queue put. Rendering the
+    line (JSON, timestamps, extras) happens in the listener thread.
+    Records are dropped (and counted) rather than blocking the loop when
+    the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the args now, as the stock handler does; by the time the listener
+        # runs, the objects they refer to may have changed
+        msg = record.getMessage()
+        record = copy.copy(record)
+        record.msg = msg
+        record.args = None
+        record.context = dict(current_context())
+        span = tracer.current_span()
+        if span.recording:
+            record.trace_id, record.span_id = span.trace_id, span.span_id
+        if record.exc_info and not record.exc_text:
+            # Tracebacks reference live frames; render them before they change
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, correlation IDs and extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update(getattr(record, "context", None) or {})
+        for key in ("trace_id", "span_id"):
+            if hasattr(record, key):
+                entry[key] = getattr(record, key)
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in entry and key not in ("context", "trace_id", "span_id"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        try:
+            return dumps_str(entry)
+        except TypeError:
+            return dumps_str({key: value if isinstance(value, (str, int, float, bool)) or value is None else repr(value)
+                              for key, value in entry.items()})
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with correlation IDs appended, for local development."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        context = getattr(record, "context", None)
+        if context:
+            line += " [" + " ".join(f"{key}={value}" for key, value in context.items()) + "]"
+        return line
+
+class LogPipeline:
+    """Root logging through a queue to a writer thread.
+
+    Nothing on the event loop touches stdout/stderr or a file: handlers run
+    in the ``QueueListener`` thread, which also does the formatting.
+    """
+
+    def __init__(self):
+        self.handler: Optional[ContextQueueHandler] = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self._root_level = logging.WARNING
+
+    @property
+    def configured(self) -> bool:
+        return self.listener is not None
+
+    def configure(self, stream=None) -> None:
+        """Install the pipeline on the root logger; later calls are no-ops until ``shutdown``."""
+        if self.configured:
+            return
+        if settings.log_file:
+            os.makedirs(os.path.dirname(settings.log_file) or ".", exist_ok=True)
+            output: logging.Handler = logging.FileHandler(settings.log_file, encoding="utf-8")
+        else:
+            output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JSONFormatter() if settings.log_format == "json" else TextFormatter())
+
+        self.handler = ContextQueueHandler(queue.Queue(settings.log_queue_size))
+        self.handler.addFilter(DebugSampler(settings.log_debug_sample_rate))
+        self.listener = logging.handlers.QueueListener(self.handler.queue, output)
+        self.listener.start()
+
+        root = logging.getLogger()
+        root.addHandler(self.handler)
+        self._root_level = root.level
+        root.setLevel(settings.log_level.upper())
+
+    def shutdown(self) -> None:
+        """Flush queued records and remove the pipeline."""
+        if not self.configured:
+            return
+        root = logging.getLogger()
+        root.removeHandler(self.handler)
+        root.setLevel(self._root_level)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+        self.listener = None
+
+    def stats(self) -> Dict[str, Any]:
+        if self.handler is None:
+            return {"configured": False}
+        return {
+            "configured": self.configured,
+            "queued": self.handler.queue.qsize(),
+            "dropped": self.handler.dropped
+        }
+
+# Singleton instance
+log_pipeline = LogPipeline()
+metrics.register("logging", log_pipeline.stats)
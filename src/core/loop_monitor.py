@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+from src.config import settings
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+def low_priority(endpoint: Callable) -> Callable:
+    """Mark a route endpoint as sheddable: it gets a fast 503 while the event loop is lagging.
+
+    Apply below ``@router.<method>(...)`` so the router registers the marked function.
+    """
+    endpoint.low_priority = True
+    return endpoint
+
+def is_low_priority(endpoint: Any) -> bool:
+    return getattr(endpoint, "low_priority", False)
+
+def _percentile(ordered: list, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class LoopMonitor:
+    """Measure event loop lag and report code that blocks the loop.
+
+    A task sleeps for ``loop_monitor_interval`` and records how late it
+    wakes up; that delay is the lag every other coroutine saw. While lag is
+    above ``load_shed_lag`` the monitor reports ``overloaded`` so
+    low-priority work can be shed, and it recovers once lag stays below
+    half the threshold for a few samples. A watchdog thread logs the loop
+    thread's stack whenever the loop has not ticked for
+    ``slow_callback_seconds``, catching the blocking call in the act.
+    """
+
+    # Consecutive calm samples needed before shedding stops
+    RECOVERY_SAMPLES = 5
+
+    def __init__(self):
+        self.samples: deque = deque(maxlen=settings.loop_lag_window)
+        self.lag = 0.0
+        self.overloaded = False
+        self.shed = 0
+        self.slow_callbacks = 0
+        self._calm = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def record(self, lag: float) -> None:
+        lag = max(0.0, lag)
+        self.lag = lag
+        self.samples.append(lag)
+        threshold = settings.load_shed_lag
+        if threshold <= 0:
+            return
+        if lag >= threshold:
+            if not self.overloaded:
+                logger.warning("Event loop lag %.0f ms; shedding low-priority work", lag * 1000)
+            self.overloaded = True
+            self._calm = 0
+        elif self.overloaded:
+            self._calm = self._calm + 1 if lag < threshold / 2 else 0
+            if self._calm >= self.RECOVERY_SAMPLES:
+                self.overloaded = False
+                logger.info("Event loop lag recovered; no longer shedding")
+
+    async def _sample(self) -> None:
+        interval = settings.loop_monitor_interval
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(interval)
+            self._heartbeat = time.monotonic()
+            self.record(self._heartbeat - start - interval)
+
+    def _watch(self) -> None:
+        interval = settings.loop_monitor_interval
+        reported = None
+        while not self._stop.wait(interval):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - interval
+            if blocked < settings.slow_callback_seconds or reported == heartbeat:
+                continue
+            reported = heartbeat
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            self.slow_callbacks += 1
+            logger.warning(
+                "Event loop blocked for %.0f ms so far in:\n%s",
+                blocked * 1000,
+                "".join(traceback.format_stack(frame))
+            )
+
+    def start(self) -> None:
+        """Start sampling the running loop; call from inside it."""
+        if self._task is not None or not settings.loop_monitor_enabled:
+            return
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._watchdog.join()
+        self._task = self._watchdog = None
+        self.overloaded = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        return {
+            "lag_ms": {
+                "current": round(self.lag * 1000, 2),
+                "p50": round(_percentile(ordered, 0.50) * 1000, 2),
+                "p95": round(_percentile(ordered, 0.95) * 1000, 2),
+                "p99": round(_percentile(ordered, 0.99) * 1000, 2),
+                "max": round((ordered[-1] if ordered else 0.0) * 1000, 2)
+            },
+            "overloaded": self.overloaded,
+            "shed": self.shed,
+            "slow_callbacks": self.slow_callbacks
+        }
+
+# Singleton instance
+loop_monitor = LoopMonitor()
+metrics.register("event_loop", loop_monitor.snapshot)
@@ -0,0 +1,17 @@
+from typing import Any, Callable, Dict
+
+class MetricsRegistry:
+    """Collects point-in-time snapshots from the components that register here."""
+
+    def __init__(self):
+        self._providers: Dict[str, Callable[[], Any]] = {}
+
+    def register(self, name: str, provider: Callable[[], Any]) -> None:
+        """Register a zero-argument callable returning a JSON-serializable snapshot."""
+        self._providers[name] = provider
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: provider() for name, provider in sorted(self._providers.items())}
+
+# Singleton instance
+metrics = MetricsRegistry()
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from src.config import settings
+
+# Profiles and tracemalloc snapshots kept for later retrieval
+MAX_STORED = 20
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _short_path(path: str) -> str:
+    if path.startswith(_ROOT):
+        return os.path.relpath(path, _ROOT)
+    marker = "site-packages" + os.sep
+    if marker in path:
+        return path.split(marker, 1)[1]
+    return path
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval from a helper thread.
+
+    The target (normally the event loop thread) is never paused or
+    instrumented; each tick only reads its current frame, so overhead is a
+    brief GIL hand-off per sample. Stacks are aggregated as collapsed
+    ("folded") stacks, the input format of flamegraph.pl, speedscope and
+    most other flamegraph viewers.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: Optional[float] = None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval or settings.profiling_interval
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._labels: Dict[Any, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.counts[tuple(reversed(stack))] += 1
+                self.samples += 1
+
+    def start(self) -> "SamplingProfiler":
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and not self._stop.is_set()
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.monotonic() - self.started_at
+        return self
+
+    def collapsed(self) -> str:
+        """One ``frame;frame;frame count`` line per distinct stack, root first."""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.counts.most_common()) + "\n"
+
+    def summary(self, limit: int = 20) -> Dict[str, Any]:
+        """Sample counts plus the functions most often on top of the stack (self time)."""
+        leaf: Counter = Counter()
+        for stack, count in self.counts.items():
+            leaf[stack[-1]] += count
+        return {
+            "samples": self.samples,
+            "interval": self.interval,
+            "duration": round(self.duration, 3),
+            "top_self": [{"frame": frame, "samples": count} for frame, count in leaf.most_common(limit)]
+        }
+
+class ProfileStore:
+    """Recent profiles and tracemalloc snapshots, held in memory by ID."""
+
+    def __init__(self):
+        self.profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.snapshots: "OrderedDict[str, Tuple[float, tracemalloc.Snapshot]]" = OrderedDict()
+        self.active = 0
+
+    def _keep(self, items: OrderedDict, key: str, value: Any) -> None:
+        items[key] = value
+        while len(items) > MAX_STORED:
+            items.popitem(last=False)
+
+    def save_profile(self, label: str, profiler: SamplingProfiler) -> str:
+        profile_id = uuid.uuid4().hex[:12]
+        self._keep(self.profiles, profile_id, {
+            "id": profile_id,
+            "label": label,
+            "created_at": time.time(),
+            "collapsed": profiler.collapsed(),
+            **profiler.summary()
+        })
+        return profile_id
+
+    def save_snapshot(self, snapshot: tracemalloc.Snapshot) -> str:
+        snapshot_id = uuid.uuid4().hex[:12]
+        self._keep(self.snapshots, snapshot_id, (time.time(), snapshot))
+        return snapshot_id
+
+async def profile_for(seconds: float, interval: Optional[float] = None) -> SamplingProfiler:
+    """Sample the calling event loop's thread for ``seconds`` while it keeps serving."""
+    profiler = SamplingProfiler(threading.get_ident(), interval).start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+    return profiler
+
+def take_snapshot() -> tracemalloc.Snapshot:
+    """Snapshot current allocations, excluding tracemalloc's own and import machinery."""
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+def _site(traceback: tracemalloc.Traceback) -> List[str]:
+    return [f"{_short_path(frame.filename)}:{frame.lineno}" for frame in traceback]
+
+def top_allocations(snapshot: tracemalloc.Snapshot, limit: int = 20, group_by: str = "lineno") -> Dict[str, Any]:
+    stats = snapshot.statistics(group_by)
+    return {
+        "total_bytes": sum(stat.size for stat in stats),
+        "top": [
+            {"site": _site(stat.traceback), "bytes": stat.size, "count": stat.count}
+            for stat in stats[:limit]
+        ]
+    }
+
+def diff_allocations(
+    old: tracemalloc.Snapshot,
+    new: tracemalloc.Snapshot,
+    limit: int = 20,
+    group_by: str = "lineno"
+) -> Dict[str, Any]:
+    stats = new.compare_to(old, group_by)
+    return {
+        "size_diff_bytes": sum(stat.size_diff for stat in stats),
+        "top": [
+            {
+                "site": _site(stat.traceback),
+                "size_diff": stat.size_diff,
+                "bytes": stat.size,
+                "count_diff": stat.count_diff
+            }
+            for stat in stats[:limit]
+        ]
+    }
+
+# Singleton instance
+profile_store = ProfileStore()
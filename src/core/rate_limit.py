@@ -0,0 +1,210 @@
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from src.config import settings
+
+@dataclass(frozen=True)
+class BucketLimit:
+    """A token bucket: ``rate`` tokens per second, holding at most ``burst``."""
+    key: str
+    rate: float
+    burst: float
+
+def _refill(tokens: float, updated: float, now: float, limit: BucketLimit) -> float:
+    return min(limit.burst, tokens + (now - updated) * limit.rate)
+
+# Longest wait reported to a caller; a rate of 0 closes a route and would otherwise never refill
+MAX_WAIT_SECONDS = 3600.0
+
+def _wait_time(tokens: float, limit: BucketLimit) -> float:
+    if limit.rate <= 0:
+        return MAX_WAIT_SECONDS
+    return min((1 - tokens) / limit.rate, MAX_WAIT_SECONDS)
+
+def _full_at(tokens: float, now: float, limit: BucketLimit) -> float:
+    """When a bucket left at ``tokens`` is full again, and so holds no state."""
+    if limit.rate <= 0:
+        return now + MAX_WAIT_SECONDS
+    return now + max(0.0, limit.burst - tokens) / limit.rate
+
+class InMemoryBucketStore:
+    """Per-process token buckets."""
+
+    _PURGE_EVERY = 1024
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float, BucketLimit]] = {}
+        self._calls = 0
+
+    async def take_all(self, limits: List[BucketLimit]) -> Optional[float]:
+        """Take one token from every bucket, or none if any is empty.
+
+        Returns ``None`` when admitted, otherwise the seconds to wait.
+        """
+        now = time.monotonic()
+        levels = []
+        retry_after = 0.0
+        for limit in limits:
+            tokens, updated, _ = self._buckets.get(limit.key, (limit.burst, now, limit))
+            tokens = _refill(tokens, updated, now, limit)
+            levels.append(tokens)
+            if tokens < 1:
+                retry_after = max(retry_after, _wait_time(tokens, limit))
+        if retry_after > 0:
+            return retry_after
+
+        for limit, tokens in zip(limits, levels):
+            self._buckets[limit.key] = (tokens - 1, now, limit)
+
+        self._calls += 1
+        if self._calls % self._PURGE_EVERY == 0:
+            self._purge(now)
+        return None
+
+    def _purge(self, now: float) -> None:
+        """Drop buckets that have refilled completely; they hold no state."""
+        full = [
+            key for key, (tokens, updated, limit) in self._buckets.items()
+            if _refill(tokens, updated, now, limit) >= limit.burst
+        ]
+        for key in full:
+            del self._buckets[key]
+
+class SQLiteBucketStore:
+    """Token buckets shared by every worker process on the host.
+
+    Rows for buckets that have refilled completely are purged every
+    ``_PURGE_EVERY`` calls, so one-off callers don't grow the file forever.
+    """
+
+    _PURGE_EVERY = 1024
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL DEFAULT 0)"
+            )
+            try:
+                # Files written before buckets were purged lack the column
+                conn.execute("ALTER TABLE buckets ADD COLUMN full_at REAL NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                pass
+            self._conn = conn
+        return self._conn
+
+    def _take_all(self, limits: List[BucketLimit]) -> Optional[float]:
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                levels = []
+                retry_after = 0.0
+                for limit in limits:
+                    row = conn.execute(
+                        "SELECT tokens, updated FROM buckets WHERE key = ?", (limit.key,)
+                    ).fetchone()
+                    tokens = _refill(row[0], row[1], now, limit) if row else limit.burst
+                    levels.append(tokens)
+                    if tokens < 1:
+                        retry_after = max(retry_after, _wait_time(tokens, limit))
+                if retry_after == 0:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)",
+                        [
+                            (limit.key, tokens - 1, now, _full_at(tokens - 1, now, limit))
+                            for limit, tokens in zip(limits, levels)
+                        ]
+                    )
+                self._calls += 1
+                if self._calls % self._PURGE_EVERY == 0:
+                    conn.execute("DELETE FROM buckets WHERE full_at <= ?", (now,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return retry_after or None
+
+    async def take_all(self, limits: List[BucketLimit]) -> Optional[float]:
+        return await asyncio.to_thread(self._take_all, limits)
+
+class AdmissionController:
+    """Token-bucket admission keyed by user, client and route, plus a concurrency cap."""
+
+    def __init__(self):
+        if settings.rate_limit_backend == "sqlite":
+            self.store = SQLiteBucketStore(settings.rate_limit_sqlite_path)
+        else:
+            self.store = InMemoryBucketStore()
+        self.in_flight = 0
+
+    def user_limit(self, user_id: str) -> BucketLimit:
+        rate = settings.rate_limit_user_rate
+        return BucketLimit(f"user:{user_id}", rate, rate * settings.rate_limit_burst_factor)
+
+    def limits_for(
+        self,
+        route: str,
+        user_id: Optional[str] = None,
+        client_id: Optional[str] = None
+    ) -> List[BucketLimit]:
+        """Build the bucket limits that apply to one call."""
+        route_rate = settings.rate_limit_route_limits.get(route, settings.rate_limit_route_rate)
+        limits = [BucketLimit(f"route:{route}", route_rate, route_rate * settings.rate_limit_burst_factor)]
+        if user_id:
+            limits.append(self.user_limit(user_id))
+        if client_id:
+            rate = settings.rate_limit_client_rate
+            limits.append(BucketLimit(f"client:{client_id}", rate, rate * settings.rate_limit_burst_factor))
+        return limits
+
+    async def admit(
+        self,
+        route: str,
+        user_id: Optional[str] = None,
+        client_id: Optional[str] = None
+    ) -> Optional[float]:
+        """Return ``None`` if the call may proceed, else seconds until it may retry."""
+        if not settings.rate_limit_enabled:
+            return None
+        return await self.store.take_all(self.limits_for(route, user_id, client_id))
+
+    async def admit_user(self, user_id: str) -> Optional[float]:
+        """Like :meth:`admit`, for the user bucket alone (once the caller is authenticated)."""
+        if not settings.rate_limit_enabled:
+            return None
+        return await self.store.take_all([self.user_limit(user_id)])
+
+    def try_enter(self) -> bool:
+        """Claim a slot under the global concurrency cap without waiting."""
+        if settings.rate_limit_enabled and self.in_flight >= settings.rate_limit_max_concurrency:
+            return False
+        self.in_flight += 1
+        return True
+
+    def leave(self) -> None:
+        self.in_flight -= 1
+
+def retry_after_header(seconds: float) -> str:
+    """Format a ``Retry-After`` value (whole seconds, at least 1)."""
+    return str(max(1, math.ceil(seconds)))
+
+# Singleton instance
+admission_controller = AdmissionController()
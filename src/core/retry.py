@@ -0,0 +1,70 @@
+import random
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Optional
+import httpx
+from src.config import settings
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+class RetryPolicy:
+    """Exponential backoff with full jitter inside a per-request deadline budget."""
+
+    def __init__(
+        self,
+        max_attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        deadline: Optional[float] = None
+    ):
+        self.max_attempts = max_attempts if max_attempts is not None else settings.retry_max_attempts
+        self.base_delay = base_delay if base_delay is not None else settings.retry_base_delay
+        self.max_delay = max_delay if max_delay is not None else settings.retry_max_delay
+        self.deadline = deadline if deadline is not None else settings.retry_deadline_seconds
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number ``attempt + 1`` (full jitter)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def is_retryable_error(self, error: Exception) -> bool:
+        return isinstance(error, httpx.TransportError)
+
+    def is_retryable_response(self, response: httpx.Response) -> bool:
+        return response.status_code in RETRYABLE_STATUS_CODES
+
+class UnsentRetryPolicy(RetryPolicy):
+    """Retry only failures that show the upstream never acted on the request.
+
+    For creates the upstream cannot deduplicate: a connect or pool error
+    means nothing was sent, and a 429 is turned away before processing.
+    Anything else, a read timeout included, may have been applied.
+    """
+
+    def is_retryable_error(self, error: Exception) -> bool:
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+    def is_retryable_response(self, response: httpx.Response) -> bool:
+        return response.status_code == 429
+
+def is_idempotent(method: str, idempotency_key: Optional[str] = None) -> bool:
+    """Whether a request may be replayed automatically."""
+    return method.upper() in IDEMPOTENT_METHODS or idempotency_key is not None
+
+def retry_after_seconds(response: httpx.Response) -> float:
+    """Parse a ``Retry-After`` header (seconds or HTTP date); 0 when absent."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if retry_at.tzinfo is None:
+        # A "-0000" zone parses as naive; HTTP dates are always UTC
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
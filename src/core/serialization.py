@@ -0,0 +1,44 @@
+import json
+from datetime import date, datetime
+from typing import Any, Union
+
+from pydantic import BaseModel, SecretStr
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Encode the non-JSON types that show up in service results."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(by_alias=True)
+    if isinstance(obj, SecretStr):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize an object to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        obj, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def dumps_str(obj: Any) -> str:
+    """Serialize an object to a JSON string."""
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Parse JSON from bytes or str without an intermediate decode step."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,252 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+from src.config import settings
+from src.core.metrics import metrics
+from src.core.serialization import dumps, loads
+from src.core.tracing import tracer
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS invalidations (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    namespace TEXT NOT NULL,
+    key_prefix TEXT NOT NULL
+);
+"""
+
+# How many invalidation records to keep for workers that are catching up
+_INVALIDATION_LOG_SIZE = 10000
+
+class SharedCache:
+    """Cache shared by every worker process on the host.
+
+    Entries live in a SQLite file (WAL mode) so all workers see one copy and
+    a cold worker does not repeat upstream calls another worker already made.
+    Each process keeps a small in-memory tier in front of it. Deletes and
+    overwrites of an existing key are appended to an invalidation log that
+    every process replays at most every ``shared_cache_sync_interval``
+    seconds, which is how a change in one worker reaches the in-memory tier
+    of the others.
+
+    Values are stored as JSON and decoded on every read, so callers may
+    mutate what they get back. The file can hold credentials (identity
+    traits), so it is created readable by the owner only.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.shared_cache_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._local: "OrderedDict[Tuple[str, str], Tuple[bytes, float]]" = OrderedDict()
+        self._last_seq = 0
+        self._synced_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if not os.path.exists(self.path):
+                os.close(os.open(self.path, os.O_CREAT | os.O_WRONLY, 0o600))
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            row = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM invalidations").fetchone()
+            self._last_seq = row[0]
+            self._conn = conn
+        return self._conn
+
+    def _run(self, fn, *args):
+        with self._lock:
+            return fn(self._connect(), *args)
+
+    async def _call(self, fn, *args):
+        return await asyncio.to_thread(self._run, fn, *args)
+
+    @staticmethod
+    def _select(conn, namespace, key, now):
+        row = conn.execute(
+            "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, now)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    @staticmethod
+    def _upsert(conn, namespace, key, value, expires_at):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = conn.execute(
+                "SELECT 1 FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, expires_at)
+            )
+            # Other workers may hold the old value in their local tier
+            if existing:
+                SharedCache._invalidate(conn, namespace, key, True)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _insert(conn, namespace, key, value, expires_at, now):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM entries WHERE namespace = ? AND key = ? AND expires_at <= ?", (namespace, key, now)
+            )
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, expires_at)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    @staticmethod
+    def _delete(conn, namespace, key_prefix, exact):
+        if exact:
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key_prefix))
+        else:
+            conn.execute(
+                "DELETE FROM entries WHERE namespace = ? AND substr(key, 1, ?) = ?",
+                (namespace, len(key_prefix), key_prefix)
+            )
+        SharedCache._invalidate(conn, namespace, key_prefix, exact)
+
+    @staticmethod
+    def _invalidate(conn, namespace, key_prefix, exact):
+        cursor = conn.execute(
+            "INSERT INTO invalidations (namespace, key_prefix) VALUES (?, ?)",
+            (namespace, key_prefix if not exact else key_prefix + "\x00")
+        )
+        if cursor.lastrowid % 1000 == 0:
+            conn.execute("DELETE FROM invalidations WHERE seq < ?", (cursor.lastrowid - _INVALIDATION_LOG_SIZE,))
+            conn.execute("DELETE FROM entries WHERE expires_at < ?", (time.time(),))
+
+    @staticmethod
+    def _changes_since(conn, seq) -> List[Tuple[int, str, str]]:
+        return conn.execute(
+            "SELECT seq, namespace, key_prefix FROM invalidations WHERE seq > ? ORDER BY seq",
+            (seq,)
+        ).fetchall()
+
+    def _drop_local(self, namespace: str, key_prefix: str) -> None:
+        if key_prefix.endswith("\x00"):
+            self._local.pop((namespace, key_prefix[:-1]), None)
+            return
+        for cache_key in [k for k in self._local if k[0] == namespace and k[1].startswith(key_prefix)]:
+            del self._local[cache_key]
+
+    async def _sync(self) -> None:
+        """Replay invalidations made by other workers into the local tier."""
+        now = time.monotonic()
+        if now - self._synced_at < settings.shared_cache_sync_interval:
+            return
+        self._synced_at = now
+        for seq, namespace, key_prefix in await self._call(self._changes_since, self._last_seq):
+            self._drop_local(namespace, key_prefix)
+            self._last_seq = max(self._last_seq, seq)
+
+    def _remember(self, namespace: str, key: str, value: bytes, expires_at: float) -> None:
+        self._local[(namespace, key)] = (value, expires_at)
+        self._local.move_to_end((namespace, key))
+        while len(self._local) > settings.shared_cache_local_entries:
+            self._local.popitem(last=False)
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the cached value, or ``None`` on a miss."""
+        if not settings.shared_cache_enabled:
+            return None
+        await self._sync()
+        now = time.time()
+        local = self._local.get((namespace, key))
+        if local and local[1] > now:
+            self.hits += 1
+            tracer.set_attribute(f"cache.{namespace}", "hit")
+            return loads(local[0])
+
+        row = await self._call(self._select, namespace, key, now)
+        if row is None:
+            self.misses += 1
+            tracer.set_attribute(f"cache.{namespace}", "miss")
+            return None
+        self.hits += 1
+        tracer.set_attribute(f"cache.{namespace}", "hit")
+        self._remember(namespace, key, row[0], row[1])
+        return loads(row[0])
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        """Store a JSON-serializable value for ``ttl`` seconds."""
+        if not settings.shared_cache_enabled or ttl <= 0:
+            return
+        data = dumps(value)
+        expires_at = time.time() + ttl
+        self._remember(namespace, key, data, expires_at)
+        await self._call(self._upsert, namespace, key, data, expires_at)
+
+    async def add(self, namespace: str, key: str, value: Any, ttl: float) -> bool:
+        """Store ``value`` only if ``key`` has no live entry; True when this call stored it.
+
+        The check and the write are one transaction, so of several workers
+        adding the same key at once exactly one succeeds. With the cache
+        disabled every call succeeds.
+        """
+        if not settings.shared_cache_enabled or ttl <= 0:
+            return True
+        data = dumps(value)
+        now = time.time()
+        added = await self._call(self._insert, namespace, key, data, now + ttl, now)
+        if added:
+            self._remember(namespace, key, data, now + ttl)
+        return added
+
+    async def delete(self, namespace: str, key: str) -> None:
+        """Invalidate one entry in every worker."""
+        if not settings.shared_cache_enabled:
+            return
+        self._local.pop((namespace, key), None)
+        await self._call(self._delete, namespace, key, True)
+
+    async def delete_prefix(self, namespace: str, key_prefix: str = "") -> None:
+        """Invalidate every entry in ``namespace`` whose key starts with ``key_prefix``."""
+        if not settings.shared_cache_enabled:
+            return
+        self._drop_local(namespace, key_prefix)
+        await self._call(self._delete, namespace, key_prefix, False)
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": settings.shared_cache_enabled,
+            "local_entries": len(self._local),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# Singleton instance
+shared_cache = SharedCache()
+metrics.register("shared_cache", shared_cache.snapshot)
@@ -0,0 +1,291 @@
+import functools
+import inspect
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, TextIO, Tuple
+from src.config import settings
+from src.core.metrics import metrics
+from src.core.serialization import dumps
+
+# OTLP span kinds, by the short names used in this codebase
+SPAN_KINDS = {
+    "internal": "SPAN_KIND_INTERNAL",
+    "server": "SPAN_KIND_SERVER",
+    "client": "SPAN_KIND_CLIENT",
+}
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """``(trace_id, parent_span_id, sampled)`` from a W3C ``traceparent`` header."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16), int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(int(parts[3], 16) & 1)
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class Span:
+    """One timed operation. Use as a context manager; it becomes the current span inside."""
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        kind: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        sampled: bool,
+        attributes: Optional[Dict[str, Any]] = None
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.recording = sampled
+        self.attributes: Dict[str, Any] = dict(attributes or {}) if sampled else {}
+        self.status: Tuple[str, str] = ("STATUS_CODE_UNSET", "")
+        self.start_ns = time.time_ns()
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.recording and value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def set_error(self, message: str = "") -> None:
+        self.status = ("STATUS_CODE_ERROR", message)
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.recording else '00'}"
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.set_attribute("error.type", exc_type.__name__)
+            self.set_error(str(exc))
+        self.end()
+
+    def end(self) -> None:
+        if self.recording:
+            self.tracer.export(self, time.time_ns())
+
+class _NoopSpan:
+    """Stands in for a span while tracing is disabled."""
+    recording = False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def set_error(self, message: str = "") -> None:
+        pass
+
+    def traceparent(self) -> Optional[str]:
+        return None
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class Tracer:
+    """Minimal OpenTelemetry-compatible tracer.
+
+    Spans are written one per line in OTLP/JSON (``resourceSpans``) form,
+    which the OpenTelemetry Collector's ``otlpjsonfile`` receiver and most
+    trace viewers read directly, so no collector has to be running. Context
+    follows asyncio tasks through a context variable and crosses process
+    boundaries as W3C ``traceparent`` headers.
+
+    Finished spans go through a queue to a writer thread, as log records
+    do, so the event loop never blocks on the file or pipe. Spans are
+    dropped (and counted) rather than blocking when the queue is full.
+    """
+
+    def __init__(self):
+        self._stream: Optional[TextIO] = None
+        self._queue: Optional[queue.Queue] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._lock = threading.Lock()
+        self.use_stderr = False
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.tracing_exporter != "none"
+
+    def span(
+        self,
+        name: str,
+        kind: str = "internal",
+        attributes: Optional[Dict[str, Any]] = None,
+        traceparent: Optional[str] = None
+    ):
+        """Start a span, as a child of the current span or of an incoming ``traceparent``."""
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = _current_span.get()
+        remote = parse_traceparent(traceparent) if parent is None else None
+        if parent is not None:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.recording
+        elif remote is not None:
+            trace_id, parent_id, sampled = remote
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+            sampled = random.random() < settings.tracing_sample_rate
+        return Span(self, name, kind, trace_id, parent_id, sampled, attributes)
+
+    def current_span(self):
+        return _current_span.get() or NOOP_SPAN
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Annotate the current span, if any (e.g. cache hits deep inside a service call)."""
+        span = _current_span.get()
+        if span is not None:
+            span.set_attribute(key, value)
+
+    def _open_stream(self) -> TextIO:
+        if settings.tracing_exporter == "stdout":
+            return sys.stderr if self.use_stderr else sys.stdout
+        directory = os.path.dirname(settings.tracing_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return open(settings.tracing_file, "a", encoding="utf-8")
+
+    def _start_writer(self) -> queue.Queue:
+        with self._lock:
+            if self._listener is None:
+                self._queue = queue.Queue(settings.tracing_queue_size)
+                self._listener = logging.handlers.QueueListener(self._queue, _SpanWriter(self))
+                self._listener.start()
+            return self._queue
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        """Write one span; runs in the writer thread."""
+        line = dumps({"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": settings.tracing_service_name}}]},
+            "scopeSpans": [{"scope": {"name": "notion-ory-agent"}, "spans": [record]}]
+        }]}).decode("utf-8")
+        if self._stream is None:
+            self._stream = self._open_stream()
+        self._stream.write(line + "\n")
+        # Flush once the backlog is written rather than after every span
+        if self._queue.empty():
+            self._stream.flush()
+
+    def export(self, span: Span, end_ns: int) -> None:
+        record = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": SPAN_KINDS.get(span.kind, "SPAN_KIND_INTERNAL"),
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": [{"key": key, "value": _attribute_value(value)} for key, value in span.attributes.items()],
+            "status": {"code": span.status[0], "message": span.status[1]} if span.status[1] else {"code": span.status[0]}
+        }
+        if span.parent_id:
+            record["parentSpanId"] = span.parent_id
+        span_queue = self._queue if self._listener is not None else self._start_writer()
+        try:
+            span_queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self) -> None:
+        """Write out queued spans and stop the writer thread."""
+        with self._lock:
+            if self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+            if self._stream is not None:
+                self._stream.flush()
+                if self._stream not in (sys.stdout, sys.stderr):
+                    self._stream.close()
+                self._stream = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._listener is not None else 0,
+            "dropped": self.dropped
+        }
+
+class _SpanWriter:
+    """Handler for the writer thread's ``QueueListener``."""
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+
+    def handle(self, record: Dict[str, Any]) -> None:
+        try:
+            self.tracer._write(record)
+        except Exception:
+            # An exporter failure must not kill the thread and back up the queue
+            self.tracer.dropped += 1
+
+def _trace_result(span, result: Any) -> None:
+    """Mark failed service results (``{"success": False, ...}``) on the span."""
+    if isinstance(result, dict) and result.get("success") is False:
+        span.set_attribute("result.status_code", result.get("status_code"))
+        span.set_error(str(result.get("error", ""))[:200])
+
+def traced(name: str) -> Callable:
+    """Decorate a coroutine function so each call runs in a span called ``name``."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tracer.span(name) as span:
+                result = await func(*args, **kwargs)
+                _trace_result(span, result)
+                return result
+        return wrapper
+    return decorator
+
+def trace_methods(component: str) -> Callable:
+    """Class decorator tracing every public coroutine method as ``<component>.<method>``."""
+    def decorator(cls: type) -> type:
+        for attr, value in list(vars(cls).items()):
+            if not attr.startswith("_") and inspect.iscoroutinefunction(value):
+                setattr(cls, attr, traced(f"{component}.{attr}")(value))
+        return cls
+    return decorator
+
+# Singleton instance
+tracer = Tracer()
+metrics.register("tracing", tracer.stats)
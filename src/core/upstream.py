@@ -0,0 +1,326 @@
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Any, Dict, List, Optional
+import httpx
+from src.config import settings
+from src.core.adaptive_limit import AdaptiveLimiter
+from src.core.circuit_breaker import CircuitBreaker, CircuitOpenError, breaker_registry
+from src.core.deadline import DeadlineExceeded, remaining, within_deadline
+from src.core.hedging import Hedger
+from src.core.metrics import metrics
+from src.core.retry import RetryPolicy, is_idempotent, retry_after_seconds
+from src.core.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+def h2_available() -> bool:
+    """Whether httpx's optional HTTP/2 support (the ``h2`` package) is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def fingerprint(secret: str) -> str:
+    """Stable, non-reversible identifier for an API key."""
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:16]
+
+class Upstream:
+    """Pooled HTTP client for one upstream service, guarded by circuit breakers.
+
+    Every call passes the upstream's breaker, which trips on error rate
+    (transport errors and 5xx) or slow-call rate. Calls made with an
+    ``auth_key`` also pass a per-credential breaker that only counts 401s,
+    so a revoked key fails fast without affecting other users.
+
+    Idempotent requests are retried on transport errors and 429/502/503/504
+    under the upstream's :class:`RetryPolicy`; other requests only when the
+    caller supplies an idempotency key.
+
+    With HTTP/2 enabled (``http2_upstreams``), concurrent calls share one
+    multiplexed connection per host instead of one connection each; at most
+    ``http2_max_concurrent_streams`` are in flight and the rest queue here.
+    If ``h2`` is missing, or an h2c server rejects the connection preface
+    before any HTTP/2 response was seen, the upstream drops to HTTP/1.1.
+
+    With a ``limiter``, every attempt made with an ``auth_key`` waits for a
+    slot under that credential's adaptive limit and reports its outcome.
+    With a ``hedger``, idempotent requests made with ``hedge=True`` may be
+    sent twice when slow (see :class:`~src.core.hedging.Hedger`).
+
+    Inside a :func:`~src.core.deadline.deadline` block, attempt timeouts and
+    retries fit in the time left, and a request still queued or in flight
+    when it runs out is cancelled with
+    :class:`~src.core.deadline.DeadlineExceeded`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float = 30.0,
+        http2: Optional[bool] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+        hedger: Optional[Hedger] = None
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.limiter = limiter
+        self.hedger = hedger
+        self.http2 = name in settings.http2_upstreams if http2 is None else http2
+        self.http_version: Optional[str] = None
+        self.breaker = breaker_registry.get(
+            name,
+            failure_rate_threshold=settings.breaker_failure_rate,
+            slow_call_threshold=settings.breaker_slow_call_seconds,
+            slow_call_rate_threshold=settings.breaker_slow_call_rate,
+            minimum_calls=settings.breaker_minimum_calls,
+            window=settings.breaker_window_seconds,
+            open_duration=settings.breaker_open_seconds
+        )
+        self.retry_policy = RetryPolicy()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._streams: Optional[asyncio.Semaphore] = None
+        self._streams_loop: Optional[asyncio.AbstractEventLoop] = None
+        _upstreams.append(self)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Connection-pooled client, recreated if the event loop changed."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = self._build_client()
+            self._client_loop = loop
+        return self._client
+
+    def _build_client(self) -> httpx.AsyncClient:
+        if self.http2 and not h2_available():
+            logger.warning("HTTP/2 requested for %s but h2 is not installed; using HTTP/1.1", self.name)
+            self.http2 = False
+        if not self.http2:
+            return httpx.AsyncClient(timeout=self.timeout)
+        return httpx.AsyncClient(timeout=self.timeout, http2=True, http1=not settings.http2_cleartext)
+
+    def _stream_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._streams is None or self._streams_loop is not loop:
+            self._streams = asyncio.Semaphore(settings.http2_max_concurrent_streams)
+            self._streams_loop = loop
+        return self._streams
+
+    async def _fallback_to_http1(self, error: Exception) -> None:
+        logger.warning("HTTP/2 to %s failed before any response (%s); falling back to HTTP/1.1", self.name, error)
+        self.http2 = False
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    async def _dispatch(self, method: str, url: str, idempotent: bool, **kwargs: Any) -> httpx.Response:
+        """Send over the pooled client, holding an HTTP/2 stream slot when multiplexing."""
+        if not self.http2:
+            response = await self.client.request(method, url, **kwargs)
+        else:
+            async with self._stream_slots():
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                except httpx.RemoteProtocolError as e:
+                    # Only an h2c preface sent before any response can have been turned away
+                    # unread; other protocol errors may come from a server that acted on the request
+                    if not settings.http2_cleartext or self.http_version is not None:
+                        raise
+                    if self.http2:
+                        await self._fallback_to_http1(e)
+                    # Even then, only resend what retries would resend
+                    if not idempotent:
+                        raise
+                    response = await self.client.request(method, url, **kwargs)
+        self.http_version = response.http_version
+        return response
+
+    def auth_breaker(self, auth_key: str) -> CircuitBreaker:
+        return breaker_registry.get(
+            f"{self.name}:token:{fingerprint(auth_key)}",
+            failure_rate_threshold=1.0,
+            slow_call_threshold=float("inf"),
+            minimum_calls=settings.breaker_auth_failures,
+            window=settings.breaker_window_seconds,
+            open_duration=settings.breaker_auth_open_seconds
+        )
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        auth_key: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+        idempotent: Optional[bool] = None,
+        retry: Optional[RetryPolicy] = None,
+        hedge: bool = False,
+        **kwargs: Any
+    ) -> httpx.Response:
+        """Send a request with retries, raising :class:`CircuitOpenError` if the upstream is tripped.
+
+        ``idempotent`` overrides the method-based default for requests such
+        as Notion's read-only ``POST .../query``. ``hedge`` allows a second
+        copy of a slow idempotent request when the upstream has a hedger.
+        """
+        if hedge and self.hedger is not None and (
+            idempotent if idempotent is not None else is_idempotent(method, idempotency_key)
+        ):
+            return await self.hedger.run(
+                lambda: self.request(method, url, auth_key=auth_key, idempotency_key=idempotency_key,
+                                     idempotent=idempotent, retry=retry, **kwargs)
+            )
+        if not tracer.enabled:
+            return await self._request(method, url, auth_key, idempotency_key, idempotent, retry, **kwargs)
+        request_url = httpx.URL(url)
+        with tracer.span(f"{method} {self.name}", kind="client", attributes={
+            "upstream": self.name,
+            "http.request.method": method,
+            "server.address": request_url.host,
+            "url.path": request_url.path
+        }) as span:
+            if span.recording:
+                kwargs["headers"] = {**kwargs.get("headers", {}), "traceparent": span.traceparent()}
+            response = await self._request(method, url, auth_key, idempotency_key, idempotent, retry, **kwargs)
+            span.set_attributes({
+                "http.response.status_code": response.status_code,
+                "http.request.resend_count": response.extensions.get("retries", 0)
+            })
+            if response.status_code >= 500:
+                span.set_error()
+            return response
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        auth_key: Optional[str],
+        idempotency_key: Optional[str],
+        idempotent: Optional[bool],
+        retry: Optional[RetryPolicy],
+        **kwargs: Any
+    ) -> httpx.Response:
+        policy = retry or self.retry_policy
+        if idempotent is None:
+            idempotent = is_idempotent(method, idempotency_key)
+        if idempotency_key:
+            kwargs["headers"] = {**kwargs.get("headers", {}), "Idempotency-Key": idempotency_key}
+        timeout = kwargs.pop("timeout", self.timeout)
+
+        deadline = time.monotonic() + policy.deadline
+        # The caller's own deadline (request header or MCP tool timeout) can only shorten the budget
+        left = remaining()
+        if left is not None:
+            deadline = min(deadline, time.monotonic() + left)
+        attempt = 0
+        # Also bounds time spent queued for an adaptive-limit slot or HTTP/2 stream
+        async with within_deadline(f"{method} {self.name}"):
+            while True:
+                # Each attempt gets whatever is left of the budget, up to the per-call timeout
+                attempt_timeout = max(0.001, min(timeout, deadline - time.monotonic()))
+                try:
+                    response = await self._send(method, url, auth_key, idempotent, timeout=attempt_timeout, **kwargs)
+                except httpx.TransportError as e:
+                    left = remaining()
+                    if left is not None and left <= 0:
+                        # The attempt timeout was the caller's deadline, not the upstream's own limit
+                        raise DeadlineExceeded(f"Deadline exceeded during {method} {self.name}") from e
+                    if not idempotent or not policy.is_retryable_error(e):
+                        raise
+                    delay = policy.backoff(attempt)
+                    if attempt + 1 >= policy.max_attempts or time.monotonic() + delay >= deadline:
+                        raise
+                else:
+                    if not idempotent or not policy.is_retryable_response(response):
+                        response.extensions["retries"] = attempt
+                        return response
+                    delay = max(policy.backoff(attempt), retry_after_seconds(response))
+                    if attempt + 1 >= policy.max_attempts or time.monotonic() + delay >= deadline:
+                        response.extensions["retries"] = attempt
+                        return response
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        auth_key: Optional[str],
+        idempotent: bool,
+        **kwargs: Any
+    ) -> httpx.Response:
+        """Send a single attempt, paced by the credential's adaptive limit if there is one."""
+        if self.limiter is None or not auth_key:
+            return await self._send_guarded(method, url, auth_key, idempotent, **kwargs)
+        async with self.limiter.slot(fingerprint(auth_key)) as slot:
+            start = time.monotonic()
+            try:
+                response = await self._send_guarded(method, url, auth_key, idempotent, **kwargs)
+            except httpx.TransportError:
+                slot.record(None, time.monotonic() - start)
+                raise
+            slot.record(response.status_code, time.monotonic() - start, retry_after_seconds(response))
+            return response
+
+    async def _send_guarded(
+        self,
+        method: str,
+        url: str,
+        auth_key: Optional[str],
+        idempotent: bool,
+        **kwargs: Any
+    ) -> httpx.Response:
+        """Send a single attempt through the circuit breakers."""
+        breakers: List[CircuitBreaker] = [self.breaker]
+        if auth_key:
+            breakers.append(self.auth_breaker(auth_key))
+
+        admitted: List[CircuitBreaker] = []
+        try:
+            for breaker in breakers:
+                breaker.before_call()
+                admitted.append(breaker)
+        except CircuitOpenError:
+            for breaker in admitted:
+                breaker.record(None)
+            raise
+
+        start = time.monotonic()
+        try:
+            response = await self._dispatch(method, url, idempotent, **kwargs)
+        except httpx.HTTPError:
+            self.breaker.record(False, time.monotonic() - start)
+            for breaker in admitted[1:]:
+                breaker.record(None)
+            raise
+        except BaseException:
+            for breaker in admitted:
+                breaker.record(None)
+            raise
+
+        elapsed = time.monotonic() - start
+        self.breaker.record(response.status_code < 500, elapsed)
+        for breaker in admitted[1:]:
+            breaker.record(response.status_code != 401)
+        return response
+
+_upstreams: List[Upstream] = []
+
+async def close_upstreams() -> None:
+    """Close every pooled client; called on application shutdown."""
+    for upstream in _upstreams:
+        if upstream._client is not None and not upstream._client.is_closed:
+            await upstream._client.aclose()
+        upstream._client = None
+
+def upstream_snapshot() -> Dict[str, Any]:
+    return {
+        upstream.name: {"http2": upstream.http2, "http_version": upstream.http_version}
+        for upstream in _upstreams
+    }
+
+metrics.register("upstreams", upstream_snapshot)
@@ -1,3 +1,5 @@
+import os
+from typing import Optional
 import uvicorn
 from src.config import settings
 from src.api.main import create_app
@@ -5,11 +7,35 @@ from src.api.main import create_app
 # Create the app instance
 app = create_app()
 
+def resolve_workers(workers: Optional[int] = None) -> int:
+    """Number of worker processes to run; 0 means one per CPU."""
+    if workers is None:
+        workers = settings.web_workers
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+def serve(workers: Optional[int] = None, host: Optional[str] = None, port: Optional[int] = None):
+    """Run the API with uvicorn, in one process or ``workers`` processes.
+
+    Worker processes share the job queue and the shared cache through their
+    SQLite files; admission control is switched to the sqlite backend so
+    limits are enforced across workers rather than per process.
+    """
+    workers = resolve_workers(workers)
+    host = host or settings.mcp_server_host
+    port = port or settings.mcp_server_port
+    log_level = "debug" if settings.debug else "info"
+
+    if workers > 1:
+        os.environ.setdefault("RATE_LIMIT_BACKEND", "sqlite")
+        uvicorn.run("src.main:app", host=host, port=port, workers=workers, log_level=log_level)
+    else:
+        uvicorn.run(
+            app,  # Pass the app instance directly
+            host=host,
+            port=port,
+            reload=settings.debug,
+            log_level=log_level
+        )
+
 if __name__ == "__main__":
-    uvicorn.run(
-        app,  # Pass the app instance directly
-        host=settings.mcp_server_host,
-        port=settings.mcp_server_port,
-        reload=settings.debug,
-        log_level="debug" if settings.debug else "info"
-    )
\ No newline at end of file
+    serve()
@@ -1,45 +1,57 @@
-from fastapi import APIRouter, WebSocket
-import json
-from .server import MCPServer
+import logging
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from src.core.serialization import dumps_str, loads
+from src.core.http_cache import cache_response
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/mcp", tags=["mcp"])
 
+def _mcp_server():
+    """Build an MCP server; imported here so REST-only use never loads the MCP SDK."""
+    from .server import MCPServer
+    return MCPServer()
+
 @router.websocket("/ws")
 async def mcp_websocket(websocket: WebSocket):
     """WebSocket endpoint for MCP communication."""
     await websocket.accept()
     
-    mcp_server = MCPServer()
+    mcp_server = _mcp_server()
     initialization_result = await mcp_server.initialize()
     
     try:
         while True:
             # Receive message from client
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = loads(data)
             
             # Here we would handle MCP protocol messages
             # For now, just echo back
-            await websocket.send_text(json.dumps({
+            await websocket.send_text(dumps_str({
                 "type": "response",
                 "content": f"Received: {message}"
             }))
             
-    except Exception as e:
-        print(f"WebSocket error: {e}")
+    except WebSocketDisconnect:
+        pass
+    except Exception:
+        logger.exception("MCP WebSocket error")
     finally:
         await websocket.close()
 
 @router.get("/tools")
+@cache_response(ttl=300.0, cache_control="public, max-age=60")
 async def list_mcp_tools():
     """List available MCP tools."""
-    mcp_server = MCPServer()
+    mcp_server = _mcp_server()
     tools = await mcp_server.handle_list_tools()
     return {"tools": tools}
 
 @router.get("/resources")
+@cache_response(ttl=300.0, cache_control="public, max-age=60")
 async def list_mcp_resources():
     """List available MCP resources."""
-    mcp_server = MCPServer()
+    mcp_server = _mcp_server()
     resources = await mcp_server.handle_list_resources()
     return {"resources": resources}
\ No newline at end of file
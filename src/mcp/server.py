@@ -1,14 +1,30 @@
+import logging
+import sys
+import time
 from typing import Any, List
 import mcp.types as types
 from mcp.server import Server, NotificationOptions
 from mcp.server.models import InitializationOptions
-import mcp.server.stdio
 from src.config import settings
-from src.services.kratos_service import kratos_service
-from src.services.hydra_service import hydra_service
-# Removed: from src.services.notion_service import notion_service
-from src.services.user_notion_service import user_notion_service
-from src.models.user_notion import UserNotionConfig
+from src.core.serialization import dumps_str
+from src.core.rate_limit import admission_controller, retry_after_header
+from src.core.tracing import tracer
+from src.core.loop_monitor import loop_monitor
+from src.core.logs import current_context, log_context, log_pipeline, new_request_id
+from src.core.deadline import DeadlineExceeded, deadline, parse_deadline
+
+# Services (and httpx behind them) are imported on first use rather than at
+# module load: every stdio client spawns a fresh server process, and most
+# sessions only list tools or touch one upstream.
+
+logger = logging.getLogger(__name__)
+
+# Tools shed with a fast error while the event loop is lagging
+LOW_PRIORITY_TOOLS = frozenset({"list_kratos_identities", "export_database", "upsert_notion_rows", "submit_job"})
+
+def _json_text(payload: Any) -> types.TextContent:
+    """Wrap a structured payload as JSON text content."""
+    return types.TextContent(type="text", text=dumps_str(payload))
 
 class MCPServer:
     """Main MCP server class."""
@@ -279,12 +295,207 @@ class MCPServer:
                     "required": ["user_id", "title"]
                 },
             ),
+            types.Tool(
+                name="export_database",
+                description="Export a whole Notion database to NDJSON, CSV or Parquet as a background job",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "user_id": {
+                            "type": "string",
+                            "description": "User ID from Kratos"
+                        },
+                        "database_id": {
+                            "type": "string",
+                            "description": "Database ID (optional, uses user's default)"
+                        },
+                        "format": {
+                            "type": "string",
+                            "enum": ["ndjson", "csv", "parquet"],
+                            "description": "Export format (default: ndjson)"
+                        }
+                    },
+                    "required": ["user_id"]
+                },
+            ),
+            types.Tool(
+                name="upsert_notion_rows",
+                description="Create or update rows in a user's Notion database keyed by a unique property; unchanged rows are skipped",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "user_id": {
+                            "type": "string",
+                            "description": "User ID from Kratos"
+                        },
+                        "key_property": {
+                            "type": "string",
+                            "description": "Property that uniquely identifies a row"
+                        },
+                        "records": {
+                            "type": "array",
+                            "items": {"type": "object"},
+                            "description": "Rows as property name -> plain value"
+                        },
+                        "database_id": {
+                            "type": "string",
+                            "description": "Database ID (optional, uses user's default)"
+                        },
+                        "dry_run": {
+                            "type": "boolean",
+                            "description": "Report the plan without writing"
+                        }
+                    },
+                    "required": ["user_id", "key_property", "records"]
+                },
+            ),
+            # Background job tools
+            types.Tool(
+                name="submit_job",
+                description="Submit a long-running job (e.g. database_export) to the background queue",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "user_id": {
+                            "type": "string",
+                            "description": "User ID from Kratos"
+                        },
+                        "job_type": {
+                            "type": "string",
+                            "description": "Job type, e.g. 'database_export'"
+                        },
+                        "params": {
+                            "type": "object",
+                            "description": "Job parameters (optional)"
+                        }
+                    },
+                    "required": ["user_id", "job_type"]
+                },
+            ),
+            types.Tool(
+                name="get_job_status",
+                description="Get the status and progress of a background job",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "job_id": {
+                            "type": "string",
+                            "description": "Job ID returned by submit_job"
+                        }
+                    },
+                    "required": ["job_id"]
+                },
+            ),
+            types.Tool(
+                name="cancel_job",
+                description="Cancel a queued or running background job",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "job_id": {
+                            "type": "string",
+                            "description": "Job ID returned by submit_job"
+                        }
+                    },
+                    "required": ["job_id"]
+                },
+            ),
+            types.Tool(
+                name="get_job_result",
+                description="Get the result of a finished background job",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "job_id": {
+                            "type": "string",
+                            "description": "Job ID returned by submit_job"
+                        }
+                    },
+                    "required": ["job_id"]
+                },
+            ),
         ]
     
     async def handle_call_tool(
         self, name: str, arguments: dict[str, Any] | None
     ) -> List[types.TextContent | types.ImageContent | types.EmbeddedResource]:
-        """Handle tool calls."""
+        """Handle tool calls, subject to the same admission control as the REST API."""
+        if loop_monitor.overloaded and name in LOW_PRIORITY_TOOLS:
+            loop_monitor.shed += 1
+            return [
+                types.TextContent(
+                    type="text",
+                    text=f"❌ Server is overloaded; {name} is temporarily unavailable. Retry in a few seconds."
+                )
+            ]
+        
+        user_id = arguments.get("user_id") if arguments else None
+        retry_after = await admission_controller.admit(f"mcp:{name}", user_id=user_id, client_id="mcp")
+        if retry_after is None:
+            if admission_controller.try_enter():
+                request_id = current_context().get("request_id") or new_request_id()
+                # A client-supplied "_timeout" (seconds) bounds every upstream call the tool makes
+                timeout = parse_deadline(str(arguments.pop("_timeout"))) if arguments and "_timeout" in arguments else None
+                with log_context(request_id=request_id, tool=name, user_id=user_id), \
+                        deadline(timeout if timeout is not None else settings.mcp_tool_timeout):
+                    start = time.perf_counter()
+                    try:
+                        with tracer.span(f"mcp.tool {name}", attributes={"mcp.tool.name": name}):
+                            if settings.profiling_enabled and arguments and arguments.pop("_profile", False):
+                                return await self._profile_tool(name, arguments)
+                            return await self._dispatch_tool(name, arguments)
+                    except DeadlineExceeded as e:
+                        return [types.TextContent(type="text", text=f"❌ {name} timed out: {e}")]
+                    finally:
+                        admission_controller.leave()
+                        logger.debug("MCP tool %s finished in %.1f ms", name, (time.perf_counter() - start) * 1000)
+            retry_after = 1.0
+        
+        return [
+            types.TextContent(
+                type="text",
+                text=f"❌ Rate limit exceeded for {name}. Retry after {retry_after_header(retry_after)}s."
+            )
+        ]
+    
+    async def _profile_tool(
+        self, name: str, arguments: dict[str, Any]
+    ) -> List[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+        """Run one tool call under the sampling profiler.
+
+        Opt in with ``"_profile": true`` and an ``"_admin_token"`` matching
+        ``ADMIN_TOKEN``, as for ``X-Profile`` on the REST API; only one call
+        is profiled at a time.
+        """
+        from src.api.dependencies import is_admin_request
+        from src.core.profiling import SamplingProfiler, profile_store
+        
+        if not is_admin_request(arguments.pop("_admin_token", None)):
+            return [types.TextContent(type="text", text="❌ Profiling requires a valid _admin_token")]
+        if profile_store.active:
+            return await self._dispatch_tool(name, arguments)
+        
+        profile_store.active += 1
+        profiler = SamplingProfiler().start()
+        try:
+            result = await self._dispatch_tool(name, arguments)
+        finally:
+            profiler.stop()
+            profile_store.active -= 1
+        profile_id = profile_store.save_profile(f"mcp:{name}", profiler)
+        return list(result) + [_json_text({"profile_id": profile_id, **profiler.summary(limit=10)})]
+    
+    async def _dispatch_tool(
+        self, name: str, arguments: dict[str, Any] | None
+    ) -> List[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+        """Dispatch a tool call to its implementation."""
+        from src.services.kratos_service import kratos_service
+        from src.services.hydra_service import hydra_service
+        from src.services.user_notion_service import user_notion_service
+        from src.services.job_service import job_service
+        from src.services.upsert_service import upsert_service
+        from src.models.user_notion import UserNotionConfig
+        
         if name == "health_check":
             return [
                 types.TextContent(
@@ -733,6 +944,45 @@ class MCPServer:
                 ]
         
         # User-specific Notion tools
+        elif name == "upsert_notion_rows":
+            if not arguments:
+                raise ValueError("Arguments required for upsert_notion_rows")
+            
+            user_id = arguments.get("user_id")
+            user_result = await kratos_service.get_identity(user_id)
+            if not user_result.get("success"):
+                return [
+                    types.TextContent(
+                        type="text",
+                        text=f"❌ User {user_id} not found in Kratos"
+                    )
+                ]
+            
+            notion_config = user_result.get("notion_config")
+            if not notion_config or not notion_config.enabled:
+                return [
+                    types.TextContent(
+                        type="text",
+                        text=f"❌ User {user_id} has no Notion configuration. Use 'configure_user_notion' first."
+                    )
+                ]
+            
+            result = await upsert_service.upsert(
+                notion_config,
+                arguments.get("records") or [],
+                arguments.get("key_property"),
+                database_id=arguments.get("database_id"),
+                dry_run=bool(arguments.get("dry_run", False))
+            )
+            if result.get("success"):
+                result.pop("success")
+                return [_json_text(result)]
+            return [
+                types.TextContent(
+                    type="text",
+                    text=f"❌ Upsert failed: {result.get('error', 'Unknown error')}"
+                )
+            ]
         elif name == "configure_user_notion":
             if not arguments:
                 raise ValueError("Arguments required for configure_user_notion")
@@ -765,6 +1015,52 @@ class MCPServer:
                         text=f"❌ Failed to configure Notion: {test_result.error}"
                     )
                 ]
+        # Background job tools
+        elif name in ("submit_job", "export_database"):
+            if not arguments:
+                raise ValueError(f"Arguments required for {name}")
+            
+            if name == "export_database":
+                job_type = "database_export"
+                params = {"format": arguments.get("format", "ndjson")}
+                if arguments.get("database_id"):
+                    params["database_id"] = arguments["database_id"]
+            else:
+                job_type = arguments.get("job_type")
+                params = arguments.get("params") or {}
+            
+            if settings.jobs_enabled:
+                await job_service.start()
+            result = await job_service.submit(arguments.get("user_id"), job_type, params)
+            if result.get("success"):
+                return [_json_text({"message": result["message"], "job": result["job"]})]
+            return [
+                types.TextContent(
+                    type="text",
+                    text=f"❌ Failed to submit job: {result.get('error', 'Unknown error')}"
+                )
+            ]
+        elif name in ("get_job_status", "cancel_job", "get_job_result"):
+            job_id = arguments.get("job_id") if arguments else None
+            if not job_id:
+                raise ValueError(f"Arguments required for {name}")
+            
+            if name == "get_job_status":
+                result = await job_service.get_job(job_id)
+            elif name == "cancel_job":
+                result = await job_service.cancel_job(job_id)
+            else:
+                result = await job_service.get_result(job_id)
+            
+            if result.get("success"):
+                result.pop("success")
+                return [_json_text(result)]
+            return [
+                types.TextContent(
+                    type="text",
+                    text=f"❌ {result.get('error', 'Unknown error')}"
+                )
+            ]
         else:
             raise ValueError(f"Unknown tool: {name}")
     
@@ -813,9 +1109,11 @@ class MCPServer:
         elif uri == "app://health":
             return "Application is healthy and running"
         elif uri == "kratos://health":
+            from src.services.kratos_service import kratos_service
             health_status = await kratos_service.get_health()
             return f"Kratos Status: {health_status.get('status', 'unknown')}"
         elif uri == "hydra://health":
+            from src.services.hydra_service import hydra_service
             health_status = await hydra_service.get_health()
             return f"Hydra Status: {health_status.get('status', 'unknown')}"
         elif uri == "notion://connection":
@@ -925,11 +1223,29 @@ class MCPServer:
         raise ValueError(f"Unknown prompt: {name}")
 
 async def run_mcp_server():
-    """Run the MCP server over stdio."""
+    """Run the MCP server over stdio.
+
+    The job dispatcher is started by the first ``submit_job`` call rather
+    than at spawn.
+    """
+    import mcp.server.stdio
+    
+    # stdout carries the protocol, so console spans and logs go to stderr
+    tracer.use_stderr = True
+    log_pipeline.configure()
     mcp_server = MCPServer()
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        await mcp_server.server.run(
-            read_stream,
-            write_stream,
-            mcp_server.initialize(),
-        )
\ No newline at end of file
+    try:
+        async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+            await mcp_server.server.run(
+                read_stream,
+                write_stream,
+                mcp_server.initialize(),
+            )
+    finally:
+        # Only clean up what this session actually loaded
+        if "src.services.job_service" in sys.modules:
+            await sys.modules["src.services.job_service"].job_service.stop()
+        if "src.core.upstream" in sys.modules:
+            await sys.modules["src.core.upstream"].close_upstreams()
+        tracer.shutdown()
+        log_pipeline.shutdown()
\ No newline at end of file
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+from datetime import datetime
+from enum import Enum
+
+class JobStatus(str, Enum):
+    """Lifecycle states of a background job."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+TERMINAL_STATUSES = {JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+class JobRecord(BaseModel):
+    """Persisted state of a background job (without its result payload)."""
+    id: str = Field(..., description="Job ID")
+    user_id: str = Field(..., description="Kratos identity that owns the job")
+    job_type: str = Field(..., description="Registered job type")
+    status: JobStatus = Field(..., description="Current job status")
+    params: Dict[str, Any] = Field(default_factory=dict, description="Job parameters")
+    progress_done: int = Field(0, description="Units of work completed")
+    progress_total: Optional[int] = Field(None, description="Total units of work, if known")
+    progress_message: Optional[str] = Field(None, description="Latest progress message")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+    cancel_requested: bool = Field(False, description="Whether cancellation was requested")
+    created_at: datetime = Field(..., description="When the job was submitted")
+    updated_at: datetime = Field(..., description="When the job was last updated")
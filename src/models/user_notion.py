@@ -51,4 +51,5 @@ class NotionConnectionTest(BaseModel):
     user_name: Optional[str] = Field(None, description="Notion user name")
     workspace_name: Optional[str] = Field(None, description="Notion workspace name")
     error: Optional[str] = Field(None, description="Error message if failed")
+    status_code: Optional[int] = Field(None, description="Notion's HTTP status if it answered with an error")
     tested_at: datetime = Field(default_factory=datetime.now)
\ No newline at end of file
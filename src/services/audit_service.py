@@ -0,0 +1,159 @@
+import asyncio
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from src.config import settings
+from src.core.adaptive_limit import BATCH, priority
+from src.core.tracing import trace_methods
+from src.core.upstream import fingerprint
+from src.models.user_notion import NotionConnectionTest, UserNotionConfig
+from src.services.kratos_service import KratosError, kratos_service
+from src.services.user_notion_service import user_notion_service
+
+# Notion answers 401 for revoked or malformed tokens; a 429, 5xx or network
+# error says nothing about the key, so those are reported but never disabled
+BROKEN_STATUS_CODES = frozenset({401})
+
+Owner = Tuple[str, UserNotionConfig]
+
+@trace_methods("audit")
+class NotionAuditService:
+    """Check every user's Notion connection, once per distinct API key."""
+
+    async def audit(self, disable_broken: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Yield one report row per configured identity, then a ``summary`` row.
+
+        Identities are listed a page at a time. Each distinct key (by
+        fingerprint) gets one ``/users/me`` call, at most
+        ``notion_audit_concurrency`` at once and in the batch lane, so the
+        per-token limits and interactive traffic take precedence. Rows for
+        a key are emitted after the first page its check finishes by. With
+        ``disable_broken``, configs whose key Notion rejects are saved with
+        ``enabled`` false. If listing fails, an ``error`` row comes before
+        the summary.
+        """
+        semaphore = asyncio.Semaphore(settings.notion_audit_concurrency)
+        checks: Dict[asyncio.Task, str] = {}
+        owners: Dict[str, List[Owner]] = {}
+        results: Dict[str, NotionConnectionTest] = {}
+        summary: Counter = Counter()
+
+        def tally(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            for row in rows:
+                summary[row["status"]] += 1
+                summary["disabled_now"] += row["disabled_now"]
+            return rows
+
+        async def resolve(done) -> List[Dict[str, Any]]:
+            rows = []
+            for task in done:
+                key = checks.pop(task)
+                results[key] = task.result()
+                rows += tally(await self._report(key, results[key], owners.pop(key), disable_broken, semaphore))
+            return rows
+
+        try:
+            try:
+                async for identities in kratos_service.iter_identities(settings.notion_audit_page_size):
+                    for identity in identities:
+                        summary["identities"] += 1
+                        notion_config = identity.get("notion_config")
+                        if notion_config is None:
+                            summary["unconfigured"] += 1
+                            continue
+                        if not notion_config.enabled:
+                            yield tally([self._row(identity["id"], notion_config, "disabled")])[0]
+                            continue
+
+                        key = fingerprint(notion_config.notion_api_key.get_secret_value())
+                        owner = (identity["id"], notion_config)
+                        if key in results:
+                            for row in tally(await self._report(key, results[key], [owner], disable_broken, semaphore)):
+                                yield row
+                        elif key in owners:
+                            owners[key].append(owner)
+                        else:
+                            owners[key] = [owner]
+                            checks[asyncio.ensure_future(self._check(notion_config, semaphore))] = key
+
+                    # Don't list further ahead than the checks can keep up with
+                    while sum(not task.done() for task in checks) > settings.notion_audit_concurrency:
+                        await asyncio.wait(set(checks), return_when=asyncio.FIRST_COMPLETED)
+                    for row in await resolve([task for task in checks if task.done()]):
+                        yield row
+            except KratosError as e:
+                yield {"error": str(e)}
+
+            while checks:
+                done, _ = await asyncio.wait(set(checks), return_when=asyncio.FIRST_COMPLETED)
+                for row in await resolve(done):
+                    yield row
+        finally:
+            for task in checks:
+                task.cancel()
+
+        yield {"summary": {"keys": len(results), **summary}}
+
+    async def _check(self, notion_config: UserNotionConfig, semaphore: asyncio.Semaphore) -> NotionConnectionTest:
+        if not notion_config.notion_api_key.get_secret_value():
+            return NotionConnectionTest(status="error", error="No Notion API key", status_code=401)
+        async with semaphore:
+            with priority(BATCH):
+                return await user_notion_service.test_user_connection(notion_config)
+
+    async def _report(
+        self,
+        key: str,
+        test: NotionConnectionTest,
+        owners: List[Owner],
+        disable_broken: bool,
+        semaphore: asyncio.Semaphore
+    ) -> List[Dict[str, Any]]:
+        if test.status == "connected":
+            return [self._row(identity_id, notion_config, "connected", key, test) for identity_id, notion_config in owners]
+        if test.status_code not in BROKEN_STATUS_CODES:
+            return [self._row(identity_id, notion_config, "unverified", key, test) for identity_id, notion_config in owners]
+
+        disabled = [False] * len(owners)
+        if disable_broken:
+            disabled = await asyncio.gather(*(self._disable(identity_id, key, semaphore) for identity_id, _ in owners))
+        return [
+            self._row(identity_id, notion_config, "broken", key, test, disabled_now)
+            for (identity_id, notion_config), disabled_now in zip(owners, disabled)
+        ]
+
+    async def _disable(self, identity_id: str, key: str, semaphore: asyncio.Semaphore) -> bool:
+        async with semaphore:
+            # Start from the saved config, not the listing: the user may have
+            # connected a new key since, which must be neither disabled nor replaced
+            current = await kratos_service.get_identity(identity_id, use_cache=False)
+            notion_config = current.get("notion_config")
+            if notion_config is None or not notion_config.enabled:
+                return False
+            if fingerprint(notion_config.notion_api_key.get_secret_value()) != key:
+                return False
+            result = await kratos_service.update_identity_notion_config(
+                identity_id, notion_config.model_copy(update={"enabled": False})
+            )
+        return bool(result.get("success"))
+
+    def _row(
+        self,
+        identity_id: str,
+        notion_config: UserNotionConfig,
+        status: str,
+        key: Optional[str] = None,
+        test: Optional[NotionConnectionTest] = None,
+        disabled_now: bool = False
+    ) -> Dict[str, Any]:
+        return {
+            "identity_id": identity_id,
+            "status": status,
+            "key_fingerprint": key,
+            "workspace_name": test.workspace_name if test else None,
+            "error": test.error if test and test.status != "connected" else None,
+            "connected_at": notion_config.connected_at.isoformat() if notion_config.connected_at else None,
+            "disabled_now": disabled_now
+        }
+
+# Singleton instance
+notion_audit_service = NotionAuditService()
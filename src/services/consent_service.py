@@ -0,0 +1,141 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+from src.core.tracing import trace_methods
+from src.services.hydra_service import hydra_service
+from src.services.kratos_service import kratos_service
+
+# Scope that grants access to the user's Notion integration
+NOTION_SCOPE = "notion_api"
+
+def notion_claims(identity_id: str, identity_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Claims for the ``notion_api`` scope.
+
+    They carry a reference to where the user's Notion config lives, never
+    the API key itself; resource servers resolve the reference server-side.
+    """
+    notion_config = identity_result.get("notion_config") if identity_result.get("success") else None
+    if notion_config is None:
+        return {"notion": {"configured": False}}
+    return {
+        "notion": {
+            "configured": True,
+            "enabled": notion_config.enabled,
+            "config_ref": f"kratos:identities/{identity_id}#traits.notion_config",
+            "database_id": notion_config.notion_database_id
+        }
+    }
+
+@trace_methods("consent")
+class ConsentService:
+    """Login and consent acceptance for Hydra's OAuth 2.0 flow.
+
+    Remembered logins and consents (Hydra's ``skip``) and first-party
+    clients with ``skip_consent`` are accepted as soon as the challenge is
+    fetched, without a UI round-trip. When the subject is already known,
+    its Kratos identity is fetched alongside the challenge so the claims
+    are ready when the grant is accepted.
+    """
+
+    async def _fetch_with_identity(self, fetch, subject: Optional[str]) -> List[Dict[str, Any]]:
+        if subject is None:
+            return [await fetch, {"success": False}]
+        return list(await asyncio.gather(fetch, kratos_service.get_identity(subject)))
+
+    async def session_claims(
+        self,
+        subject: str,
+        grant_scope: List[str],
+        identity_result: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """``session`` payload for accepting consent, with claims for the granted scopes."""
+        claims: Dict[str, Any] = {}
+        if NOTION_SCOPE in grant_scope:
+            if identity_result is None or not identity_result.get("success"):
+                identity_result = await kratos_service.get_identity(subject)
+            claims.update(notion_claims(subject, identity_result))
+        return {"access_token": dict(claims), "id_token": dict(claims)}
+
+    async def login(
+        self,
+        login_challenge: str,
+        subject: Optional[str] = None,
+        remember: bool = True
+    ) -> Dict[str, Any]:
+        """Accept a login request for ``subject``, or for Hydra's remembered subject.
+
+        Returns ``status: "login_required"`` with the login request when
+        neither applies, so the caller can authenticate the user first.
+        """
+        request_result, identity_result = await self._fetch_with_identity(
+            hydra_service.get_oauth_login_request(login_challenge), subject
+        )
+        if not request_result.get("success"):
+            return request_result
+
+        login_request = request_result["login_request"]
+        skip = bool(login_request.get("skip"))
+        if skip:
+            # Hydra only accepts the subject it remembered
+            subject = login_request.get("subject")
+        elif subject is None:
+            return {"success": True, "status": "login_required", "login_request": login_request}
+        elif not identity_result.get("success"):
+            return {"success": False, "error": f"Identity {subject} not found", "status_code": 404}
+
+        result = await hydra_service.accept_oauth_login_request(login_challenge, subject, remember=remember and not skip)
+        if result.get("success"):
+            result.update({"status": "accepted", "skipped": skip, "subject": subject})
+        return result
+
+    async def consent(
+        self,
+        consent_challenge: str,
+        grant_scope: Optional[List[str]] = None,
+        remember: bool = True,
+        subject: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Accept a consent request when a remembered grant applies, or with ``grant_scope``.
+
+        Returns ``status: "consent_required"`` with the consent request when
+        the user still has to approve. Passing the expected ``subject`` lets
+        the identity lookup for claims run alongside the challenge fetch. An
+        explicit ``grant_scope`` is only accepted when ``subject`` is the
+        user the consent request belongs to.
+        """
+        request_result, identity_result = await self._fetch_with_identity(
+            hydra_service.get_oauth_consent_request(consent_challenge), subject
+        )
+        if not request_result.get("success"):
+            return request_result
+
+        consent_request = request_result["consent_request"]
+        request_subject = consent_request.get("subject")
+        if grant_scope is not None and (subject is None or subject != request_subject):
+            return {"success": False, "error": "Consent request belongs to another user", "status_code": 403}
+
+        requested_scope = consent_request.get("requested_scope") or []
+        remembered = bool(consent_request.get("skip"))
+        skip = remembered or bool((consent_request.get("client") or {}).get("skip_consent"))
+        if skip:
+            scope = requested_scope
+        elif grant_scope is None:
+            return {"success": True, "status": "consent_required", "consent_request": consent_request}
+        else:
+            scope = [item for item in grant_scope if item in requested_scope]
+
+        if request_subject != subject:
+            identity_result = None
+        session = await self.session_claims(request_subject, scope, identity_result)
+        result = await hydra_service.accept_oauth_consent_request(
+            consent_challenge,
+            grant_scope=scope,
+            session_data=session,
+            remember=remember and not remembered,
+            grant_access_token_audience=consent_request.get("requested_access_token_audience")
+        )
+        if result.get("success"):
+            result.update({"status": "accepted", "skipped": skip, "grant_scope": scope})
+        return result
+
+# Singleton instance
+consent_service = ConsentService()
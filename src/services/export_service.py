@@ -0,0 +1,311 @@
+import csv
+import io
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from src.config import settings
+from src.core.adaptive_limit import BATCH, priority
+from src.core.serialization import dumps, dumps_str
+from src.core.tracing import trace_methods
+from src.models.user_notion import UserNotionConfig
+from src.services.user_notion_service import user_notion_service
+
+EXPORT_FORMATS = ("ndjson", "csv", "parquet")
+
+# Page metadata columns written before the database properties
+BASE_COLUMNS: List[Tuple[str, str]] = [
+    ("page_id", "id"),
+    ("page_url", "url"),
+    ("page_created_time", "created_time"),
+    ("page_last_edited_time", "last_edited_time"),
+]
+
+# Property types that flatten to a list of strings
+LIST_TYPES = frozenset({"multi_select", "people", "relation", "files"})
+TIMESTAMP_TYPES = frozenset({"date", "created_time", "last_edited_time"})
+
+class ExportError(Exception):
+    """Raised when an export cannot start or a page fetch fails mid-stream."""
+
+def _plain_text(items: Optional[List[Dict[str, Any]]]) -> Optional[str]:
+    if items is None:
+        return None
+    return "".join(item.get("plain_text", "") for item in items)
+
+def _formula_value(value: Dict[str, Any]) -> Any:
+    kind = value.get("type")
+    inner = value.get(kind)
+    if kind == "date":
+        return inner.get("start") if inner else None
+    return inner
+
+def flatten_property(prop: Dict[str, Any]) -> Any:
+    """Reduce a Notion property value to a scalar (or list of strings)."""
+    kind = prop.get("type")
+    value = prop.get(kind)
+    if value is None:
+        return None
+    if kind in ("title", "rich_text"):
+        return _plain_text(value)
+    if kind in ("select", "status"):
+        return value.get("name")
+    if kind == "multi_select":
+        return [option.get("name") for option in value]
+    if kind == "people":
+        return [person.get("name") or person.get("id") for person in value]
+    if kind == "relation":
+        return [related.get("id") for related in value]
+    if kind == "files":
+        return [f.get("name") for f in value]
+    if kind == "date":
+        return value.get("start")
+    if kind in ("created_by", "last_edited_by"):
+        return value.get("name") or value.get("id")
+    if kind == "unique_id":
+        prefix = value.get("prefix")
+        return f"{prefix}-{value.get('number')}" if prefix else str(value.get("number"))
+    if kind == "formula":
+        return _formula_value(value)
+    if kind == "rollup":
+        return dumps_str(value.get(value.get("type")))
+    return value
+
+def schema_columns(properties: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """``(column name, Notion type)`` for each database property, in schema order."""
+    return [(name, prop.get("type", "rich_text")) for name, prop in properties.items()]
+
+def flatten_page(page: Dict[str, Any], columns: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """One export row: page metadata followed by flattened property values."""
+    row = {column: page.get(key) for column, key in BASE_COLUMNS}
+    properties = page.get("properties", {})
+    for name, _ in columns:
+        prop = properties.get(name)
+        row[name] = flatten_property(prop) if prop else None
+    return row
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+class NDJSONExportWriter:
+    """Raw page objects, one per line (lossless)."""
+
+    media_type = "application/x-ndjson"
+    resumable = True
+
+    def __init__(self, columns: List[Tuple[str, str]], resume: bool = False):
+        self.columns = columns
+
+    def write_pages(self, pages: List[Dict[str, Any]]) -> bytes:
+        return b"".join(dumps(page) + b"\n" for page in pages)
+
+    def close(self) -> bytes:
+        return b""
+
+class CSVExportWriter:
+    """Flattened rows with a header; list values are written as JSON arrays."""
+
+    media_type = "text/csv"
+    resumable = True
+
+    def __init__(self, columns: List[Tuple[str, str]], resume: bool = False):
+        self.columns = columns
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        if not resume:
+            self._writer.writerow([name for name, _ in BASE_COLUMNS] + [name for name, _ in columns])
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def write_pages(self, pages: List[Dict[str, Any]]) -> bytes:
+        for page in pages:
+            row = flatten_page(page, self.columns)
+            self._writer.writerow(
+                dumps_str(value) if isinstance(value, list) else value
+                for value in row.values()
+            )
+        return self._drain()
+
+    def close(self) -> bytes:
+        return self._drain()
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:  # pyarrow is optional and heavy; only Parquet export needs it
+        raise ExportError("Parquet export requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+class ParquetExportWriter:
+    """Typed columns from the database schema, one row group per ``export_row_group_size`` rows.
+
+    A Parquet file cannot be appended to once its footer is written, so
+    interrupted exports always restart from the first page.
+    """
+
+    media_type = "application/vnd.apache.parquet"
+    resumable = False
+
+    def __init__(self, columns: List[Tuple[str, str]], resume: bool = False):
+        pa = _import_pyarrow()
+        self._pa = pa
+        self.columns = columns
+        timestamp = pa.timestamp("us", tz="UTC")
+        fields = [
+            pa.field("page_id", pa.string()),
+            pa.field("page_url", pa.string()),
+            pa.field("page_created_time", timestamp),
+            pa.field("page_last_edited_time", timestamp),
+        ]
+        self._converters = [None, None, _parse_timestamp, _parse_timestamp]
+        for name, kind in columns:
+            arrow_type, convert = self._arrow_type(kind)
+            fields.append(pa.field(name, arrow_type))
+            self._converters.append(convert)
+        self.schema = pa.schema(fields)
+        self._sink = _ChunkSink()
+        self._writer = pa.parquet.ParquetWriter(self._sink, self.schema)
+        self._pending: List[Dict[str, Any]] = []
+
+    def _arrow_type(self, kind: str):
+        pa = self._pa
+        if kind == "number":
+            return pa.float64(), lambda v: float(v) if v is not None else None
+        if kind == "checkbox":
+            return pa.bool_(), None
+        if kind in LIST_TYPES:
+            return pa.list_(pa.string()), None
+        if kind in TIMESTAMP_TYPES:
+            return pa.timestamp("us", tz="UTC"), _parse_timestamp
+        # Formulas and everything text-like are written as strings
+        return pa.string(), lambda v: v if v is None or isinstance(v, str) else dumps_str(v)
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        columns = [[] for _ in self.schema]
+        for page in self._pending:
+            for i, value in enumerate(flatten_page(page, self.columns).values()):
+                convert = self._converters[i]
+                columns[i].append(convert(value) if convert else value)
+        self._writer.write_table(self._pa.Table.from_arrays(
+            [self._pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema
+        ))
+        self._pending = []
+
+    def write_pages(self, pages: List[Dict[str, Any]]) -> bytes:
+        self._pending.extend(pages)
+        if len(self._pending) >= settings.export_row_group_size:
+            self._flush()
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._flush()
+        self._writer.close()
+        return self._sink.drain()
+
+WRITERS = {
+    "ndjson": NDJSONExportWriter,
+    "csv": CSVExportWriter,
+    "parquet": ParquetExportWriter,
+}
+
+@trace_methods("export")
+class ExportService:
+    """Stream whole Notion databases through the paginated query API."""
+
+    async def open_export(
+        self,
+        user_notion_config: UserNotionConfig,
+        database_id: Optional[str] = None,
+        export_format: str = "ndjson",
+        resume: bool = False
+    ):
+        """Validate the request and build a writer before any bytes are sent.
+
+        Returns ``(database_id, writer)``; raises :class:`ExportError` on
+        an unknown format, a missing database or a missing optional dependency.
+        ``resume`` builds a writer that continues an existing file.
+        """
+        if export_format not in WRITERS:
+            raise ExportError(f"Unknown export format: {export_format}. Available: {', '.join(EXPORT_FORMATS)}")
+
+        schema = await user_notion_service.get_database_schema(user_notion_config, database_id=database_id)
+        if not schema.get("success"):
+            raise ExportError(schema.get("error", "Failed to get database schema"))
+
+        writer = WRITERS[export_format](schema_columns(schema.get("properties", {})), resume=resume)
+        return schema["database_id"], writer
+
+    async def iter_pages(
+        self,
+        user_notion_config: UserNotionConfig,
+        database_id: str,
+        start_cursor: Optional[str] = None
+    ) -> AsyncIterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """Yield ``(results, next_cursor)`` for each query page; only one page is held at a time."""
+        cursor = start_cursor
+        while True:
+            # Set per call rather than around the generator, whose body runs in the consumer's context
+            with priority(BATCH):
+                result = await user_notion_service.query_user_database(
+                    user_notion_config,
+                    database_id=database_id,
+                    page_size=100,
+                    start_cursor=cursor
+                )
+            if not result.get("success"):
+                raise ExportError(result.get("error", "Failed to query database"))
+
+            cursor = result.get("next_cursor")
+            yield result.get("results", []), cursor
+            if not result.get("has_more") or not cursor:
+                return
+
+    async def stream(
+        self,
+        user_notion_config: UserNotionConfig,
+        database_id: str,
+        writer: Any
+    ) -> AsyncIterator[bytes]:
+        """Encoded export chunks, one per query page (plus the writer's trailer)."""
+        async for pages, _ in self.iter_pages(user_notion_config, database_id):
+            chunk = writer.write_pages(pages)
+            if chunk:
+                yield chunk
+        trailer = writer.close()
+        if trailer:
+            yield trailer
+
+# Singleton instance
+export_service = ExportService()
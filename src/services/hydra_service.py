@@ -1,29 +1,92 @@
-import httpx
 from typing import Optional, Dict, Any, List
+import httpx
 from src.config import settings
+from src.core.serialization import loads
+from src.core.circuit_breaker import CircuitOpenError
+from src.core.deadline import DeadlineExceeded
+from src.core.shared_cache import shared_cache
+from src.core.http_cache import response_cache
+from src.core.upstream import Upstream
+from src.core.tracing import trace_methods
+
+# Fields that must never be cached or returned after creation
+SECRET_FIELDS = ("client_secret", "registration_access_token")
+
+def strip_secrets(client: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in client.items() if key not in SECRET_FIELDS}
+
+def next_page_token(response: httpx.Response) -> Optional[str]:
+    """``page_token`` from the ``rel="next"`` entry of Hydra's ``Link`` header."""
+    next_url = response.links.get("next", {}).get("url")
+    if not next_url:
+        return None
+    return httpx.URL(next_url).params.get("page_token")
+
+class ClientRegistry:
+    """OAuth client cache keyed by client_id, shared by every worker.
+
+    Entries live in the shared cache, so a create or delete through this
+    service on one worker reaches the others. Secrets are stripped when an
+    entry is inserted, so nothing read back from the registry can leak
+    them. A full listing is served until ``oauth_client_cache_ttl`` passes
+    or a client is created or deleted.
+    """
+
+    async def get(self, client_id: str) -> Optional[Dict[str, Any]]:
+        return await shared_cache.get("oauth_client", client_id)
+
+    async def put(self, client: Dict[str, Any]) -> Dict[str, Any]:
+        sanitized = strip_secrets(client)
+        await shared_cache.set("oauth_client", client["client_id"], sanitized, settings.oauth_client_cache_ttl)
+        return sanitized
+
+    async def remove(self, client_id: str) -> None:
+        await shared_cache.delete("oauth_client", client_id)
+        await self.forget_listing()
+
+    async def listing(self) -> Optional[List[Dict[str, Any]]]:
+        """Every client, if a full listing is still fresh."""
+        return await shared_cache.get("oauth_clients", "all")
 
+    async def forget_listing(self) -> None:
+        await shared_cache.delete("oauth_clients", "all")
+
+    async def replace_all(self, clients: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        sanitized = [await self.put(client) for client in clients]
+        await shared_cache.set("oauth_clients", "all", sanitized, settings.oauth_client_cache_ttl)
+        return sanitized
+
+@trace_methods("hydra")
 class HydraService:
     """Service for interacting with Ory Hydra."""
     
     def __init__(self):
         self.base_url = settings.ory_hydra_url
         self.admin_url = settings.ory_hydra_admin_url or self.base_url.replace("4444", "4445")
+        self.http = Upstream("hydra")
+        self.clients = ClientRegistry()
         
     async def get_health(self) -> Dict[str, Any]:
         """Check Hydra health status."""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(f"{self.admin_url}/health/ready")
-                return {
-                    "status": "healthy" if response.status_code == 200 else "unhealthy",
-                    "status_code": response.status_code,
-                    "response": response.json() if response.status_code == 200 else None
-                }
-            except Exception as e:
-                return {
-                    "status": "error",
-                    "error": str(e)
-                }
+        cached = await shared_cache.get("health", "hydra")
+        if cached is not None:
+            return cached
+        try:
+            response = await self.http.request("GET", f"{self.admin_url}/health/ready")
+            health = {
+                "status": "healthy" if response.status_code == 200 else "unhealthy",
+                "status_code": response.status_code,
+                "response": loads(response.content) if response.status_code == 200 else None
+            }
+            await shared_cache.set("health", "hydra", health, settings.health_cache_ttl)
+            return health
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "status": "error",
+                "error": str(e)
+            }
     
     async def create_oauth_client(
         self,
@@ -41,77 +104,306 @@ class HydraService:
             "token_endpoint_auth_method": "client_secret_basic"
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    f"{self.admin_url}/admin/clients",
-                    json=payload,
-                    timeout=30.0
-                )
+        try:
+            response = await self.http.request(
+                "POST",
+                f"{self.admin_url}/admin/clients",
+                json=payload,
+                timeout=30.0
+            )
+            
+            if response.status_code == 201:
+                client_data = loads(response.content)
+                await self.clients.put(client_data)
+                await self.clients.forget_listing()
+                await response_cache.invalidate("oauth_clients")
+                # The secret is only ever returned here, straight from Hydra
+                return {
+                    "success": True,
+                    "client": client_data,
+                    "message": "OAuth client created successfully",
+                    "client_id": client_data.get("client_id"),
+                    "client_secret": client_data.get("client_secret")
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": f"Failed to create client: {response.text}",
+                    "status_code": response.status_code
+                }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}"
+            }
+    
+    async def list_oauth_clients(
+        self,
+        page_size: Optional[int] = None,
+        page_token: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """List OAuth clients (without secrets).
+
+        With no arguments, every page is fetched by following Hydra's
+        ``Link`` headers and the result is served from the client registry
+        while fresh. With ``page_size``/``page_token``, a single page is
+        returned along with ``next_page_token``.
+        """
+        single_page = page_size is not None or page_token is not None
+        if not single_page:
+            cached = await self.clients.listing()
+            if cached is not None:
+                return {"success": True, "clients": cached, "count": len(cached), "cached": True}
+        
+        clients: List[Dict[str, Any]] = []
+        token = page_token
+        try:
+            while True:
+                params = {"page_size": page_size or settings.hydra_page_size}
+                if token:
+                    params["page_token"] = token
+                response = await self.http.request("GET", f"{self.admin_url}/admin/clients", params=params)
                 
-                if response.status_code == 201:
-                    client_data = response.json()
-                    return {
-                        "success": True,
-                        "client": client_data,
-                        "message": "OAuth client created successfully",
-                        "client_id": client_data.get("client_id"),
-                        "client_secret": client_data.get("client_secret")
-                    }
-                else:
+                if response.status_code != 200:
                     return {
                         "success": False,
-                        "error": f"Failed to create client: {response.text}",
+                        "error": f"Failed to list clients: {response.text}",
                         "status_code": response.status_code
                     }
-            except Exception as e:
+                
+                clients.extend(loads(response.content))
+                token = next_page_token(response)
+                if single_page or not token:
+                    break
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}"
+            }
+        
+        if single_page:
+            sanitized = [await self.clients.put(client) for client in clients]
+            return {"success": True, "clients": sanitized, "count": len(sanitized), "next_page_token": token}
+        sanitized = await self.clients.replace_all(clients)
+        return {"success": True, "clients": sanitized, "count": len(sanitized)}
+    
+    async def get_oauth_client(self, client_id: str) -> Dict[str, Any]:
+        """Get an OAuth client by ID (without its secret)."""
+        cached = await self.clients.get(client_id)
+        if cached is not None:
+            return {"success": True, "client": cached}
+        
+        try:
+            response = await self.http.request("GET", f"{self.admin_url}/admin/clients/{client_id}")
+            
+            if response.status_code == 200:
+                return {"success": True, "client": await self.clients.put(loads(response.content))}
+            else:
+                return {
+                    "success": False,
+                    "error": f"Failed to get client: {response.text}",
+                    "status_code": response.status_code
+                }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}"
+            }
+    
+    async def delete_oauth_client(self, client_id: str) -> Dict[str, Any]:
+        """Delete an OAuth client."""
+        try:
+            response = await self.http.request("DELETE", f"{self.admin_url}/admin/clients/{client_id}")
+            
+            if response.status_code in (204, 404):
+                await self.clients.remove(client_id)
+                await response_cache.invalidate(f"oauth_client:{client_id}", "oauth_clients")
+            if response.status_code == 204:
+                return {
+                    "success": True,
+                    "message": "OAuth client deleted successfully"
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": f"Failed to delete client: {response.text}",
+                    "status_code": response.status_code
+                }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}"
+            }
+    
+    async def get_oauth_login_request(self, login_challenge: str) -> Dict[str, Any]:
+        """Get an OAuth login request, including whether Hydra remembers the user (``skip``)."""
+        try:
+            response = await self.http.request(
+                "GET",
+                f"{self.admin_url}/admin/oauth2/auth/requests/login",
+                params={"login_challenge": login_challenge}
+            )
+            
+            if response.status_code == 200:
+                return {
+                    "success": True,
+                    "login_request": loads(response.content)
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": f"Failed to get login request: {response.text}",
+                    "status_code": response.status_code
+                }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}"
+            }
+    
+    async def accept_oauth_login_request(
+        self,
+        login_challenge: str,
+        subject: str,
+        remember: bool = True
+    ) -> Dict[str, Any]:
+        """Accept an OAuth login request for ``subject`` (a Kratos identity ID)."""
+        payload = {
+            "subject": subject,
+            "remember": remember,
+            "remember_for": settings.oauth_remember_for
+        }
+        
+        try:
+            response = await self.http.request(
+                "PUT",
+                f"{self.admin_url}/admin/oauth2/auth/requests/login/accept",
+                params={"login_challenge": login_challenge},
+                json=payload
+            )
+            
+            if response.status_code == 200:
+                return {
+                    "success": True,
+                    "redirect_to": loads(response.content).get("redirect_to"),
+                    "message": "Login accepted successfully"
+                }
+            else:
                 return {
                     "success": False,
-                    "error": f"Exception occurred: {str(e)}"
+                    "error": f"Failed to accept login: {response.text}",
+                    "status_code": response.status_code
                 }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}"
+            }
+    
+    async def get_oauth_consent_request(self, consent_challenge: str) -> Dict[str, Any]:
+        """Get an OAuth consent request, including whether a remembered grant applies (``skip``)."""
+        try:
+            response = await self.http.request(
+                "GET",
+                f"{self.admin_url}/admin/oauth2/auth/requests/consent",
+                params={"consent_challenge": consent_challenge}
+            )
+            
+            if response.status_code == 200:
+                return {
+                    "success": True,
+                    "consent_request": loads(response.content)
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": f"Failed to get consent request: {response.text}",
+                    "status_code": response.status_code
+                }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}"
+            }
     
     async def accept_oauth_consent_request(
         self,
         consent_challenge: str,
         grant_scope: List[str],
         session_data: Optional[Dict[str, Any]] = None,
-        remember: bool = True
+        remember: bool = True,
+        grant_access_token_audience: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """Accept an OAuth consent request with session data."""
         payload = {
             "grant_scope": grant_scope,
             "remember": remember,
-            "remember_for": 3600,
+            "remember_for": settings.oauth_remember_for,
             "session": session_data or {
                 "access_token": {},
                 "id_token": {}
             }
         }
+        if grant_access_token_audience:
+            payload["grant_access_token_audience"] = grant_access_token_audience
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.put(
-                    f"{self.admin_url}/admin/oauth2/auth/requests/consent/accept?consent_challenge={consent_challenge}",
-                    json=payload
-                )
-                
-                if response.status_code == 200:
-                    return {
-                        "success": True,
-                        "redirect_to": response.json().get("redirect_to"),
-                        "message": "Consent accepted successfully"
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": f"Failed to accept consent: {response.text}",
-                        "status_code": response.status_code
-                    }
-            except Exception as e:
+        try:
+            response = await self.http.request(
+                "PUT",
+                f"{self.admin_url}/admin/oauth2/auth/requests/consent/accept",
+                params={"consent_challenge": consent_challenge},
+                json=payload
+            )
+            
+            if response.status_code == 200:
+                return {
+                    "success": True,
+                    "redirect_to": loads(response.content).get("redirect_to"),
+                    "message": "Consent accepted successfully"
+                }
+            else:
                 return {
                     "success": False,
-                    "error": f"Exception occurred: {str(e)}"
+                    "error": f"Failed to accept consent: {response.text}",
+                    "status_code": response.status_code
                 }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}"
+            }
 
 # Singleton instance
 hydra_service = HydraService()
\ No newline at end of file
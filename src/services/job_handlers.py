@@ -0,0 +1,120 @@
+import asyncio
+import os
+from typing import Any, Dict, TYPE_CHECKING
+from src.config import settings
+from src.core.serialization import dumps
+from src.models.user_notion import UserNotionConfig
+from src.services.kratos_service import kratos_service
+from src.services.audit_service import notion_audit_service
+from src.services.export_service import export_service, ExportError
+from src.services.job_service import JobError
+
+if TYPE_CHECKING:
+    from src.services.job_service import JobContext, JobService
+
+async def get_job_notion_config(user_id: str) -> UserNotionConfig:
+    """Resolve the job owner's Notion config at run time (keys are never persisted in jobs)."""
+    user_result = await kratos_service.get_identity(user_id)
+    if not user_result.get("success"):
+        raise JobError(f"User {user_id} not found in Kratos")
+
+    notion_config = user_result.get("notion_config")
+    if not notion_config or not notion_config.enabled:
+        raise JobError("User has no Notion configuration or it's disabled")
+    return notion_config
+
+def _append_chunk(path: str, offset: int, chunk: bytes) -> int:
+    """Write a chunk at ``offset`` (dropping anything after it) and return the new size."""
+    with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+        f.truncate(offset)
+        f.seek(offset)
+        f.write(chunk)
+        return f.tell()
+
+async def run_database_export(ctx: "JobContext") -> Dict[str, Any]:
+    """Page through a whole database into an NDJSON, CSV or Parquet file, checkpointing per page."""
+    notion_config = await get_job_notion_config(ctx.user_id)
+    export_format = ctx.params.get("format", "ndjson")
+    state = ctx.checkpoint or {"cursor": None, "rows": 0, "offset": 0, "complete": False}
+    try:
+        database_id, writer = await export_service.open_export(
+            notion_config,
+            ctx.params.get("database_id"),
+            export_format,
+            resume=state["offset"] > 0
+        )
+    except ExportError as e:
+        raise JobError(str(e))
+    if not writer.resumable:
+        state = {"cursor": None, "rows": 0, "offset": 0, "complete": False}
+
+    os.makedirs(settings.jobs_data_dir, exist_ok=True)
+    path = os.path.join(settings.jobs_data_dir, f"{ctx.job_id}.{export_format}")
+
+    # The cursor is None both before the first page and after the last, so the final
+    # checkpoint is marked complete; resuming from it only has the trailer left to write
+    try:
+        if not state.get("complete"):
+            async for pages, cursor in export_service.iter_pages(notion_config, database_id, state["cursor"]):
+                chunk = writer.write_pages(pages)
+                offset = await asyncio.to_thread(_append_chunk, path, state["offset"], chunk)
+                state = {
+                    "cursor": cursor,
+                    "rows": state["rows"] + len(pages),
+                    "offset": offset,
+                    "complete": cursor is None
+                }
+                # Parquet files cannot be resumed, so there is nothing to checkpoint
+                if writer.resumable:
+                    await ctx.save_checkpoint(state, done=state["rows"], message=f"Exported {state['rows']} rows")
+                else:
+                    await ctx.report_progress(done=state["rows"], message=f"Exported {state['rows']} rows")
+    except ExportError as e:
+        raise JobError(str(e))
+
+    trailer = writer.close()
+    if trailer:
+        state["offset"] = await asyncio.to_thread(_append_chunk, path, state["offset"], trailer)
+
+    return {
+        "database_id": database_id,
+        "format": export_format,
+        "path": path,
+        "rows": state["rows"],
+        "bytes": state["offset"]
+    }
+
+async def run_notion_audit(ctx: "JobContext") -> Dict[str, Any]:
+    """Audit every user's Notion connection into an NDJSON report file.
+
+    Not resumable: a job picked up again after a restart audits from the
+    start and overwrites the partial report.
+    """
+    os.makedirs(settings.jobs_data_dir, exist_ok=True)
+    path = os.path.join(settings.jobs_data_dir, f"{ctx.job_id}.ndjson")
+    offset, rows, summary, buffer, error = 0, 0, {}, [], None
+    async for row in notion_audit_service.audit(disable_broken=bool(ctx.params.get("disable_broken"))):
+        if "summary" in row:
+            summary = row["summary"]
+            continue
+        if "identity_id" not in row:
+            error = row["error"]
+            continue
+        buffer.append(dumps(row))
+        rows += 1
+        if len(buffer) == 100:
+            offset = await asyncio.to_thread(_append_chunk, path, offset, b"\n".join(buffer) + b"\n")
+            buffer = []
+            await ctx.report_progress(done=rows, message=f"Audited {rows} identities")
+
+    offset = await asyncio.to_thread(_append_chunk, path, offset, b"\n".join(buffer) + b"\n" if buffer else b"")
+    await ctx.report_progress(done=rows, message=f"Audited {rows} identities")
+    if error:
+        # The rows already written stay in the report
+        raise JobError(error)
+    return {"path": path, "rows": rows, "summary": summary}
+
+def register_builtin_jobs(service: "JobService") -> None:
+    """Register the job types shipped with the application."""
+    service.register("database_export", run_database_export)
+    service.register("notion_audit", run_notion_audit, admin=True)
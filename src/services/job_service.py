@@ -0,0 +1,463 @@
+import asyncio
+import contextvars
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from src.config import settings
+from src.core.adaptive_limit import BATCH, priority
+from src.core.logs import log_context
+from src.core.loop_monitor import loop_monitor
+from src.core.serialization import dumps_str, loads
+from src.models.job import JobRecord, JobStatus, TERMINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[["JobContext"], Awaitable[Dict[str, Any]]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    job_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    progress_done INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER,
+    progress_message TEXT,
+    checkpoint TEXT,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    heartbeat_at REAL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_user_idx ON jobs (user_id, status);
+"""
+
+_RECORD_COLUMNS = (
+    "id, user_id, job_type, status, params, progress_done, progress_total, "
+    "progress_message, error, cancel_requested, created_at, updated_at"
+)
+
+class JobError(Exception):
+    """Expected job failure; the message is stored as the job's error."""
+
+class JobStore:
+    """SQLite persistence for jobs. Every call runs off the event loop."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path,
+                timeout=30.0,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            return fn(self._connect(), *args)
+
+    async def call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(connection, *args)`` in a worker thread."""
+        return await asyncio.to_thread(self._run, fn, *args)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+def _to_record(row: sqlite3.Row) -> JobRecord:
+    return JobRecord(
+        id=row["id"],
+        user_id=row["user_id"],
+        job_type=row["job_type"],
+        status=row["status"],
+        params=loads(row["params"]),
+        progress_done=row["progress_done"],
+        progress_total=row["progress_total"],
+        progress_message=row["progress_message"],
+        error=row["error"],
+        cancel_requested=bool(row["cancel_requested"]),
+        created_at=datetime.fromisoformat(row["created_at"]),
+        updated_at=datetime.fromisoformat(row["updated_at"])
+    )
+
+def _insert_job(conn, job_id, user_id, job_type, params):
+    now = _now()
+    conn.execute(
+        "INSERT INTO jobs (id, user_id, job_type, status, params, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (job_id, user_id, job_type, JobStatus.QUEUED.value, dumps_str(params), now, now)
+    )
+    return _select_job(conn, job_id)
+
+def _select_job(conn, job_id):
+    row = conn.execute(f"SELECT {_RECORD_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _to_record(row) if row else None
+
+def _select_jobs(conn, user_id, limit):
+    if user_id:
+        rows = conn.execute(
+            f"SELECT {_RECORD_COLUMNS} FROM jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+            (user_id, limit)
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            f"SELECT {_RECORD_COLUMNS} FROM jobs ORDER BY created_at DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+    return [_to_record(row) for row in rows]
+
+def _select_queued(conn, per_user_limit, limit):
+    """Oldest queued jobs, skipping users already at their concurrency limit."""
+    rows = conn.execute(
+        f"SELECT {_RECORD_COLUMNS} FROM jobs WHERE status = ? AND cancel_requested = 0 "
+        "AND user_id NOT IN (SELECT user_id FROM jobs WHERE status = ? "
+        "GROUP BY user_id HAVING COUNT(*) >= ?) "
+        "ORDER BY created_at LIMIT ?",
+        (JobStatus.QUEUED.value, JobStatus.RUNNING.value, per_user_limit, limit)
+    ).fetchall()
+    return [_to_record(row) for row in rows]
+
+def _claim_job(conn, job_id, user_id, owner, per_user_limit):
+    """Atomically move a queued job to running if its user is under the limit."""
+    cursor = conn.execute(
+        "UPDATE jobs SET status = ?, owner = ?, heartbeat_at = ?, updated_at = ? "
+        "WHERE id = ? AND status = ? AND cancel_requested = 0 "
+        "AND (SELECT COUNT(*) FROM jobs WHERE user_id = ? AND status = ?) < ?",
+        (
+            JobStatus.RUNNING.value, owner, time.time(), _now(),
+            job_id, JobStatus.QUEUED.value,
+            user_id, JobStatus.RUNNING.value, per_user_limit
+        )
+    )
+    if cursor.rowcount != 1:
+        return False, None
+    row = conn.execute("SELECT checkpoint FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return True, loads(row["checkpoint"]) if row["checkpoint"] else None
+
+def _update_progress(conn, job_id, done, total, message, checkpoint):
+    fields = ["progress_done = ?", "updated_at = ?"]
+    values: List[Any] = [done, _now()]
+    if total is not None:
+        fields.append("progress_total = ?")
+        values.append(total)
+    if message is not None:
+        fields.append("progress_message = ?")
+        values.append(message)
+    if checkpoint is not None:
+        fields.append("checkpoint = ?")
+        values.append(dumps_str(checkpoint))
+    values.append(job_id)
+    conn.execute(f"UPDATE jobs SET {', '.join(fields)} WHERE id = ?", values)
+
+def _finish_job(conn, job_id, status, result, error):
+    conn.execute(
+        "UPDATE jobs SET status = ?, result = ?, error = ?, owner = NULL, updated_at = ? WHERE id = ?",
+        (status.value, dumps_str(result) if result is not None else None, error, _now(), job_id)
+    )
+
+def _requeue_jobs(conn, job_ids):
+    conn.executemany(
+        "UPDATE jobs SET status = ?, owner = NULL, updated_at = ? WHERE id = ? AND status = ?",
+        [(JobStatus.QUEUED.value, _now(), job_id, JobStatus.RUNNING.value) for job_id in job_ids]
+    )
+
+def _requeue_stale(conn, stale_before):
+    cursor = conn.execute(
+        "UPDATE jobs SET status = ?, owner = NULL, updated_at = ? "
+        "WHERE status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+        (JobStatus.QUEUED.value, _now(), JobStatus.RUNNING.value, stale_before)
+    )
+    return cursor.rowcount
+
+def _heartbeat(conn, owner, job_ids):
+    """Refresh heartbeats and return the owned jobs with a pending cancel."""
+    if not job_ids:
+        return []
+    placeholders = ", ".join("?" for _ in job_ids)
+    conn.execute(
+        f"UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND id IN ({placeholders})",
+        (time.time(), owner, *job_ids)
+    )
+    rows = conn.execute(
+        f"SELECT id FROM jobs WHERE cancel_requested = 1 AND id IN ({placeholders})",
+        job_ids
+    ).fetchall()
+    return [row["id"] for row in rows]
+
+def _request_cancel(conn, job_id):
+    conn.execute(
+        "UPDATE jobs SET status = CASE WHEN status = ? THEN ? ELSE status END, "
+        "cancel_requested = 1, updated_at = ? WHERE id = ?",
+        (JobStatus.QUEUED.value, JobStatus.CANCELLED.value, _now(), job_id)
+    )
+    return _select_job(conn, job_id)
+
+def _select_result(conn, job_id):
+    row = conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return loads(row["result"]) if row and row["result"] else None
+
+class JobContext:
+    """Handle passed to a job handler for progress and checkpointing."""
+
+    def __init__(self, service: "JobService", job: JobRecord, checkpoint: Optional[Dict[str, Any]]):
+        self._service = service
+        self.job = job
+        self.checkpoint = checkpoint
+
+    @property
+    def job_id(self) -> str:
+        return self.job.id
+
+    @property
+    def user_id(self) -> str:
+        return self.job.user_id
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return self.job.params
+
+    async def report_progress(
+        self,
+        done: int,
+        total: Optional[int] = None,
+        message: Optional[str] = None
+    ) -> None:
+        """Record progress without changing the checkpoint."""
+        await self._service.store.call(_update_progress, self.job_id, done, total, message, None)
+
+    async def save_checkpoint(
+        self,
+        state: Dict[str, Any],
+        done: int,
+        total: Optional[int] = None,
+        message: Optional[str] = None
+    ) -> None:
+        """Persist resumable state together with the matching progress."""
+        self.checkpoint = state
+        await self._service.store.call(_update_progress, self.job_id, done, total, message, state)
+
+class JobService:
+    """Persistent background job queue with a bounded pool of asyncio workers."""
+
+    def __init__(self):
+        self.store = JobStore(settings.jobs_db_path)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._admin_job_types: set = set()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._background: List[asyncio.Task] = []
+        self._stopping = False
+
+    def register(self, job_type: str, handler: JobHandler, admin: bool = False) -> None:
+        """Register a handler for a job type; ``admin`` ones are only submitted through admin routes."""
+        self._handlers[job_type] = handler
+        if admin:
+            self._admin_job_types.add(job_type)
+
+    @property
+    def job_types(self) -> List[str]:
+        return sorted(self._handlers)
+
+    def _ensure_builtin_jobs(self) -> None:
+        # Imported here because the handlers depend on the other services
+        from src.services.job_handlers import register_builtin_jobs
+        register_builtin_jobs(self)
+
+    async def start(self) -> None:
+        """Start the dispatcher and heartbeat loops."""
+        if self._background:
+            return
+        self._ensure_builtin_jobs()
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        # Started lazily from an MCP tool call too; jobs must not inherit that call's deadline or log fields
+        self._background = [
+            asyncio.create_task(self._dispatch_loop(), context=contextvars.Context()),
+            asyncio.create_task(self._heartbeat_loop(), context=contextvars.Context()),
+        ]
+
+    async def stop(self) -> None:
+        """Stop workers and hand running jobs back to the queue for resumption."""
+        self._stopping = True
+        for task in self._background:
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        self._background = []
+
+        running = list(self._running.values())
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        self.store.close()
+
+    async def submit(
+        self,
+        user_id: str,
+        job_type: str,
+        params: Optional[Dict[str, Any]] = None,
+        admin: bool = False
+    ) -> Dict[str, Any]:
+        """Queue a new job."""
+        self._ensure_builtin_jobs()
+        if job_type not in self._handlers:
+            return {
+                "success": False,
+                "error": f"Unknown job type: {job_type}. Available: {', '.join(self.job_types)}",
+                "status_code": 400
+            }
+        if job_type in self._admin_job_types and not admin:
+            return {
+                "success": False,
+                "error": f"Job type {job_type} can only be submitted by an admin",
+                "status_code": 403
+            }
+
+        job = await self.store.call(_insert_job, uuid.uuid4().hex, user_id, job_type, params or {})
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return {
+            "success": True,
+            "job": job,
+            "message": "Job queued successfully"
+        }
+
+    async def get_job(self, job_id: str) -> Dict[str, Any]:
+        """Get a job's status and progress."""
+        job = await self.store.call(_select_job, job_id)
+        if not job:
+            return {"success": False, "error": f"Job {job_id} not found", "status_code": 404}
+        return {"success": True, "job": job}
+
+    async def list_jobs(self, user_id: Optional[str] = None, limit: int = 50) -> Dict[str, Any]:
+        """List recent jobs, optionally for one user."""
+        jobs = await self.store.call(_select_jobs, user_id, limit)
+        return {"success": True, "jobs": jobs, "count": len(jobs)}
+
+    async def cancel_job(self, job_id: str) -> Dict[str, Any]:
+        """Cancel a queued or running job."""
+        job = await self.store.call(_select_job, job_id)
+        if not job:
+            return {"success": False, "error": f"Job {job_id} not found", "status_code": 404}
+        if job.status in TERMINAL_STATUSES:
+            return {"success": False, "error": f"Job is already {job.status.value}", "status_code": 409}
+
+        job = await self.store.call(_request_cancel, job_id)
+        task = self._running.get(job_id)
+        if task:
+            task.cancel()
+        return {"success": True, "job": job, "message": "Cancellation requested"}
+
+    async def get_result(self, job_id: str) -> Dict[str, Any]:
+        """Get the result of a finished job."""
+        job = await self.store.call(_select_job, job_id)
+        if not job:
+            return {"success": False, "error": f"Job {job_id} not found", "status_code": 404}
+        if job.status != JobStatus.SUCCEEDED:
+            return {
+                "success": False,
+                "error": f"Job is {job.status.value}" + (f": {job.error}" if job.error else ""),
+                "status_code": 409
+            }
+        result = await self.store.call(_select_result, job_id)
+        return {"success": True, "job": job, "result": result}
+
+    async def _dispatch_loop(self) -> None:
+        stale_check_at = 0.0
+        while True:
+            now = time.time()
+            if now >= stale_check_at:
+                # Jobs whose owner stopped heartbeating (crash, restart) resume elsewhere
+                await self.store.call(_requeue_stale, now - settings.jobs_stale_after)
+                stale_check_at = now + settings.jobs_stale_after / 3
+            await self._dispatch_once()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.jobs_poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _dispatch_once(self) -> None:
+        free = settings.jobs_max_workers - len(self._running)
+        if free <= 0 or loop_monitor.overloaded:
+            # Queued jobs wait (or go to a less loaded worker) while this loop is lagging
+            return
+        candidates = await self.store.call(
+            _select_queued, settings.jobs_per_user_concurrency, free * 4
+        )
+        for job in candidates:
+            if free <= 0:
+                break
+            if job.job_type not in self._handlers:
+                continue
+            claimed, checkpoint = await self.store.call(
+                _claim_job, job.id, job.user_id, self.owner, settings.jobs_per_user_concurrency
+            )
+            if not claimed:
+                # Another process took it, or the user is at their concurrency limit
+                continue
+            job.status = JobStatus.RUNNING
+            context = JobContext(self, job, checkpoint)
+            self._running[job.id] = asyncio.create_task(self._run_job(context))
+            free -= 1
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.jobs_stale_after / 3)
+            cancelled = await self.store.call(_heartbeat, self.owner, list(self._running))
+            for job_id in cancelled:
+                task = self._running.get(job_id)
+                if task:
+                    task.cancel()
+
+    async def _run_job(self, context: JobContext) -> None:
+        handler = self._handlers[context.job.job_type]
+        with log_context(job_id=context.job_id, job_type=context.job.job_type, user_id=context.job.user_id), \
+                priority(BATCH):
+            try:
+                result = await handler(context)
+                await self.store.call(_finish_job, context.job_id, JobStatus.SUCCEEDED, result, None)
+            except asyncio.CancelledError:
+                if self._stopping:
+                    await self.store.call(_requeue_jobs, [context.job_id])
+                else:
+                    await self.store.call(_finish_job, context.job_id, JobStatus.CANCELLED, None, "Cancelled")
+            except Exception as e:
+                logger.exception("Job %s failed", context.job_id)
+                await self.store.call(_finish_job, context.job_id, JobStatus.FAILED, None, str(e))
+            finally:
+                self._running.pop(context.job_id, None)
+                if self._wakeup is not None:
+                    self._wakeup.set()
+
+# Singleton instance
+job_service = JobService()
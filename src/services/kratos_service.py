@@ -1,30 +1,76 @@
-import httpx
-from typing import Optional, Dict, Any
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional, Dict, Any, AsyncIterator, List
 from src.config import settings
+from src.core.serialization import loads
+from src.core.batch_loader import BatchLoader
+from src.core.circuit_breaker import CircuitOpenError
+from src.core.deadline import DeadlineExceeded
+from src.core.hedging import Hedger
+from src.core.shared_cache import shared_cache
+from src.core.http_cache import response_cache
+from src.core.metrics import metrics
+from src.core.upstream import Upstream, fingerprint
+from src.core.tracing import trace_methods
 from src.models.user_notion import UserNotionConfig
 
+# Identities enriched per event loop turn when listing
+IDENTITY_BATCH = 200
+
+def session_ttl(expires_at: Optional[str]) -> float:
+    """Seconds until a Kratos ``expires_at`` timestamp (0 if missing or unparseable)."""
+    if not expires_at:
+        return 0.0
+    # Kratos may send nanoseconds; datetime takes at most microseconds
+    stamp = expires_at.replace("Z", "+00:00")
+    if "." in stamp:
+        head, _, rest = stamp.partition(".")
+        digits = len(rest) - len(rest.lstrip("0123456789"))
+        stamp = f"{head}.{rest[:min(digits, 6)]}{rest[digits:]}"
+    try:
+        return max(0.0, datetime.fromisoformat(stamp).timestamp() - time.time())
+    except ValueError:
+        return 0.0
+
+class KratosError(Exception):
+    """Raised when a streamed identity listing fails part way."""
+
+@trace_methods("kratos")
 class KratosService:
     """Service for interacting with Ory Kratos."""
     
     def __init__(self):
         self.base_url = settings.ory_kratos_url
         self.admin_url = settings.ory_kratos_admin_url or self.base_url.replace("4433", "4434")
+        self.http = Upstream("kratos", hedger=Hedger("kratos") if settings.kratos_hedging else None)
+        self.identity_loader = BatchLoader(
+            self._fetch_identities,
+            max_batch=settings.identity_batch_size,
+            window=settings.identity_batch_window
+        )
         
     async def get_health(self) -> Dict[str, Any]:
         """Check Kratos health status."""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(f"{self.admin_url}/health/ready")
-                return {
-                    "status": "healthy" if response.status_code == 200 else "unhealthy",
-                    "status_code": response.status_code,
-                    "response": response.json() if response.status_code == 200 else None
-                }
-            except Exception as e:
-                return {
-                    "status": "error",
-                    "error": str(e)
-                }
+        cached = await shared_cache.get("health", "kratos")
+        if cached is not None:
+            return cached
+        try:
+            response = await self.http.request("GET", f"{self.admin_url}/health/ready")
+            health = {
+                "status": "healthy" if response.status_code == 200 else "unhealthy",
+                "status_code": response.status_code,
+                "response": loads(response.content) if response.status_code == 200 else None
+            }
+            await shared_cache.set("health", "kratos", health, settings.health_cache_ttl)
+            return health
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "status": "error",
+                "error": str(e)
+            }
     
     async def create_identity(self, email: str, traits: Optional[Dict] = None) -> Dict[str, Any]:
         """Create a new identity in Kratos with optional Notion config."""
@@ -36,56 +82,267 @@ class KratosService:
             }
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    f"{self.admin_url}/admin/identities",
-                    json=payload,
-                    timeout=30.0
-                )
-                
-                if response.status_code == 201:
-                    return {
-                        "success": True,
-                        "identity": response.json(),
-                        "message": "Identity created successfully"
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": f"Failed to create identity: {response.text}",
-                        "status_code": response.status_code
-                    }
-            except Exception as e:
+        try:
+            response = await self.http.request(
+                "POST",
+                f"{self.admin_url}/admin/identities",
+                json=payload,
+                timeout=30.0
+            )
+            
+            if response.status_code == 201:
+                await response_cache.invalidate("identities")
+                return {
+                    "success": True,
+                    "identity": loads(response.content),
+                    "message": "Identity created successfully"
+                }
+            else:
                 return {
                     "success": False,
-                    "error": f"Exception occurred: {str(e)}"
+                    "error": f"Failed to create identity: {response.text}",
+                    "status_code": response.status_code
+                }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}"
+            }
+    
+    async def get_identity(self, identity_id: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Get an identity by ID.
+
+        Served from the shared cache when possible; misses from concurrent
+        callers are fetched together by the identity loader. Pass
+        ``use_cache=False`` before a read-modify-write so the update starts
+        from current traits.
+        """
+        if not use_cache:
+            return await self._fetch_identity(identity_id)
+        identity_data = await shared_cache.get("identity", identity_id)
+        if identity_data is not None:
+            return self._identity_result(identity_data)
+        if self.identity_loader.max_batch <= 1:
+            return await self._fetch_identity(identity_id)
+        return await self.identity_loader.load(identity_id)
+    
+    def _identity_result(self, identity_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "identity": identity_data,
+            "notion_config": self._extract_notion_config(identity_data)
+        }
+    
+    async def _fetch_identity(self, identity_id: str) -> Dict[str, Any]:
+        try:
+            response = await self.http.request("GET", f"{self.admin_url}/admin/identities/{identity_id}", hedge=True)
+            
+            if response.status_code == 200:
+                identity_data = loads(response.content)
+                await shared_cache.set("identity", identity_id, identity_data, settings.identity_cache_ttl)
+                return self._identity_result(identity_data)
+            else:
+                return {
+                    "success": False,
+                    "error": f"Failed to get identity: {response.text}",
+                    "status_code": response.status_code
+                }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}"
+            }
+    
+    async def _fetch_identities(self, identity_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch several identities with one ``?ids=`` list call.
+
+        IDs the list call doesn't return (unknown IDs, or a Kratos too old to
+        filter by ID) are fetched one by one so each gets its own result.
+        """
+        if len(identity_ids) == 1:
+            return {identity_ids[0]: await self._fetch_identity(identity_ids[0])}
+        
+        results: Dict[str, Dict[str, Any]] = {}
+        try:
+            response = await self.http.request(
+                "GET",
+                f"{self.admin_url}/admin/identities",
+                params={"ids": identity_ids, "page_size": len(identity_ids)},
+                hedge=True
+            )
+            if response.status_code == 200:
+                wanted = set(identity_ids)
+                for identity_data in loads(response.content):
+                    if identity_data.get("id") in wanted:
+                        results[identity_data["id"]] = identity_data
+        except CircuitOpenError as e:
+            return {identity_id: e.to_result() for identity_id in identity_ids}
+        except DeadlineExceeded:
+            raise
+        except Exception:
+            pass
+        
+        for identity_id, identity_data in results.items():
+            await shared_cache.set("identity", identity_id, identity_data, settings.identity_cache_ttl)
+        found = {identity_id: self._identity_result(identity_data) for identity_id, identity_data in results.items()}
+        missing = [identity_id for identity_id in identity_ids if identity_id not in found]
+        for identity_id, result in zip(missing, await asyncio.gather(*map(self._fetch_identity, missing))):
+            found[identity_id] = result
+        return found
+    
+    async def get_login_flow(self, flow_id: str) -> Dict[str, Any]:
+        """Get a self-service login flow by ID."""
+        try:
+            response = await self.http.request(
+                "GET",
+                f"{self.base_url}/self-service/login/flows",
+                params={"id": flow_id}
+            )
+            
+            if response.status_code == 200:
+                return {
+                    "success": True,
+                    "flow": loads(response.content)
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": f"Failed to get login flow: {response.text}",
+                    "status_code": response.status_code
                 }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}"
+            }
+    
+    def _session_credentials(self, session_token: Optional[str], session_cookie: Optional[str]) -> Dict[str, str]:
+        if session_token:
+            return {"X-Session-Token": session_token}
+        return {"Cookie": f"{settings.kratos_session_cookie}={session_cookie}"}
     
-    async def get_identity(self, identity_id: str) -> Dict[str, Any]:
-        """Get an identity by ID."""
-        async with httpx.AsyncClient() as client:
+    def _session_key(self, session_token: Optional[str], session_cookie: Optional[str]) -> str:
+        return ("token:" + fingerprint(session_token)) if session_token else ("cookie:" + fingerprint(session_cookie or ""))
+    
+    async def resolve_session(
+        self,
+        session_token: Optional[str] = None,
+        session_cookie: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Resolve a session token or cookie to its identity.
+
+        Kratos ``whoami`` is called once per session; the result is cached
+        (keyed by a fingerprint of the credential) until the session's
+        ``expires_at``, bounded by ``session_cache_max_ttl``. The identity
+        itself comes from the identity cache, so trait updates made through
+        this service are seen immediately.
+        """
+        if not session_token and not session_cookie:
+            return {"success": False, "error": "No session credentials", "status_code": 401}
+        
+        key = self._session_key(session_token, session_cookie)
+        session = await shared_cache.get("sessions", key)
+        if session is None:
             try:
-                response = await client.get(f"{self.admin_url}/admin/identities/{identity_id}")
+                response = await self.http.request(
+                    "GET",
+                    f"{self.base_url}/sessions/whoami",
+                    headers=self._session_credentials(session_token, session_cookie),
+                    hedge=True
+                )
                 
-                if response.status_code == 200:
-                    identity_data = response.json()
-                    return {
-                        "success": True,
-                        "identity": identity_data,
-                        "notion_config": self._extract_notion_config(identity_data)
-                    }
-                else:
+                if response.status_code != 200:
                     return {
                         "success": False,
-                        "error": f"Failed to get identity: {response.text}",
-                        "status_code": response.status_code
+                        "error": "Session is invalid or expired",
+                        "status_code": 401 if response.status_code in (401, 403) else response.status_code
                     }
+                whoami = loads(response.content)
+            except CircuitOpenError as e:
+                return e.to_result()
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 return {
                     "success": False,
                     "error": f"Exception occurred: {str(e)}"
                 }
+            
+            if not whoami.get("active"):
+                return {"success": False, "error": "Session is not active", "status_code": 401}
+            identity_data = whoami.get("identity") or {}
+            session = {
+                "session_id": whoami.get("id"),
+                "identity_id": identity_data.get("id"),
+                "expires_at": whoami.get("expires_at"),
+                "authenticated_at": whoami.get("authenticated_at"),
+                "aal": whoami.get("authenticator_assurance_level")
+            }
+            ttl = min(session_ttl(session["expires_at"]), settings.session_cache_max_ttl)
+            if ttl > 0:
+                await shared_cache.set("sessions", key, session, ttl)
+            if identity_data.get("id"):
+                await shared_cache.set("identity", identity_data["id"], identity_data, settings.identity_cache_ttl)
+        
+        identity_result = await self.get_identity(session["identity_id"])
+        if not identity_result.get("success"):
+            return identity_result
+        return {"success": True, "session": session, **identity_result}
+    
+    async def logout(
+        self,
+        session_token: Optional[str] = None,
+        session_cookie: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Forget a cached session and end it in Kratos.
+
+        Token sessions are revoked directly. Browser sessions get a logout
+        URL the browser must visit, since Kratos also has to clear its cookie.
+        """
+        await shared_cache.delete("sessions", self._session_key(session_token, session_cookie))
+        try:
+            if session_token:
+                response = await self.http.request(
+                    "DELETE",
+                    f"{self.base_url}/self-service/logout/api",
+                    json={"session_token": session_token}
+                )
+                if response.status_code == 204:
+                    return {"success": True, "message": "Session revoked"}
+            else:
+                response = await self.http.request(
+                    "GET",
+                    f"{self.base_url}/self-service/logout/browser",
+                    headers=self._session_credentials(None, session_cookie)
+                )
+                if response.status_code == 200:
+                    return {"success": True, "logout_url": loads(response.content).get("logout_url")}
+            return {
+                "success": False,
+                "error": f"Failed to log out: {response.text}",
+                "status_code": response.status_code
+            }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}"
+            }
     
     async def update_identity_notion_config(
         self, 
@@ -94,7 +351,7 @@ class KratosService:
     ) -> Dict[str, Any]:
         """Update a user's Notion configuration."""
         # First get current identity
-        identity_result = await self.get_identity(identity_id)
+        identity_result = await self.get_identity(identity_id, use_cache=False)
         if not identity_result.get("success"):
             return identity_result
         
@@ -110,31 +367,38 @@ class KratosService:
             "schema_id": identity_data.get("schema_id", "default")
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.put(
-                    f"{self.admin_url}/admin/identities/{identity_id}",
-                    json=payload,
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    return {
-                        "success": True,
-                        "identity": response.json(),
-                        "message": "Notion configuration updated successfully"
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": f"Failed to update identity: {response.text}",
-                        "status_code": response.status_code
-                    }
-            except Exception as e:
+        try:
+            response = await self.http.request(
+                "PUT",
+                f"{self.admin_url}/admin/identities/{identity_id}",
+                json=payload,
+                timeout=30.0
+            )
+            
+            if response.status_code == 200:
+                updated = loads(response.content)
+                await shared_cache.set("identity", identity_id, updated, settings.identity_cache_ttl)
+                await response_cache.invalidate(f"identity:{identity_id}", "identities")
+                return {
+                    "success": True,
+                    "identity": updated,
+                    "message": "Notion configuration updated successfully"
+                }
+            else:
                 return {
                     "success": False,
-                    "error": f"Exception occurred: {str(e)}"
+                    "error": f"Failed to update identity: {response.text}",
+                    "status_code": response.status_code
                 }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}"
+            }
     
     def _extract_notion_config(self, identity_data: Dict[str, Any]) -> Optional[UserNotionConfig]:
         """Extract Notion config from identity traits."""
@@ -148,35 +412,73 @@ class KratosService:
     
     async def list_identities(self) -> Dict[str, Any]:
         """List all identities."""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(f"{self.admin_url}/admin/identities")
-                
-                if response.status_code == 200:
-                    identities = response.json()
-                    # Add notion config to each identity
-                    enriched_identities = []
-                    for identity in identities:
-                        notion_config = self._extract_notion_config(identity)
-                        identity["notion_config"] = notion_config.dict() if notion_config else None
-                        enriched_identities.append(identity)
+        try:
+            response = await self.http.request("GET", f"{self.admin_url}/admin/identities")
+            
+            if response.status_code == 200:
+                identities = loads(response.content)
+                # Add notion config to each identity, yielding to the event loop
+                # between batches so a large list doesn't stall other requests
+                enriched_identities = []
+                for index, identity in enumerate(identities, 1):
+                    notion_config = self._extract_notion_config(identity)
+                    identity["notion_config"] = notion_config
+                    enriched_identities.append(identity)
+                    if index % IDENTITY_BATCH == 0:
+                        await asyncio.sleep(0)
                     
-                    return {
-                        "success": True,
-                        "identities": enriched_identities,
-                        "count": len(identities)
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": f"Failed to list identities: {response.text}",
-                        "status_code": response.status_code
-                    }
-            except Exception as e:
+                return {
+                    "success": True,
+                    "identities": enriched_identities,
+                    "count": len(identities)
+                }
+            else:
                 return {
                     "success": False,
-                    "error": f"Exception occurred: {str(e)}"
+                    "error": f"Failed to list identities: {response.text}",
+                    "status_code": response.status_code
                 }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}"
+            }
+    
+    async def iter_identities(self, page_size: int = 250) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield every identity a page at a time, each with ``notion_config`` added.
+
+        Follows the ``Link: rel="next"`` header Kratos sends with each page,
+        so only one page is held at a time. Raises :class:`KratosError` if
+        a page cannot be fetched.
+        """
+        url: Optional[str] = f"{self.admin_url}/admin/identities"
+        params: Optional[Dict[str, Any]] = {"page_size": page_size}
+        while url:
+            try:
+                response = await self.http.request("GET", url, params=params)
+            except CircuitOpenError as e:
+                raise KratosError(str(e))
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                raise KratosError(f"Exception occurred: {str(e)}")
+            if response.status_code != 200:
+                raise KratosError(f"Failed to list identities: {response.text}")
+            
+            identities = loads(response.content)
+            for identity in identities:
+                identity["notion_config"] = self._extract_notion_config(identity)
+            yield identities
+            
+            # The next link already carries page_size and page_token
+            next_url = response.links.get("next", {}).get("url")
+            url = str(response.url.join(next_url)) if next_url and identities else None
+            params = None
 
 # Singleton instance
-kratos_service = KratosService()
\ No newline at end of file
+kratos_service = KratosService()
+metrics.register("identity_loader", kratos_service.identity_loader.snapshot)
\ No newline at end of file
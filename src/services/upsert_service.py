@@ -0,0 +1,230 @@
+import asyncio
+from typing import Any, AsyncIterable, Dict, Iterable, List, Optional, Tuple, Union
+from src.config import settings
+from src.core.adaptive_limit import batch
+from src.core.tracing import trace_methods
+from src.models.user_notion import UserNotionConfig
+from src.services.export_service import ExportError, export_service, flatten_property
+from src.services.user_notion_service import user_notion_service
+
+# Notion caps each rich text object at 2000 characters
+RICH_TEXT_LIMIT = 2000
+
+# Property types that can be written, and the subset that can identify a row
+WRITABLE_TYPES = frozenset({
+    "title", "rich_text", "number", "select", "status", "multi_select", "date",
+    "checkbox", "url", "email", "phone_number", "relation", "people",
+})
+KEY_TYPES = frozenset({"title", "rich_text", "number", "select", "status", "url", "email", "phone_number"})
+
+# Errors reported back per run; the counts are always complete
+MAX_REPORTED_ERRORS = 50
+
+Records = Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]
+
+def _rich_text(value: str) -> List[Dict[str, Any]]:
+    return [
+        {"type": "text", "text": {"content": value[i:i + RICH_TEXT_LIMIT]}}
+        for i in range(0, len(value), RICH_TEXT_LIMIT)
+    ]
+
+def normalize(kind: str, value: Any) -> Any:
+    """Canonical form of a plain value, used both for diffing and for the key index."""
+    if kind in ("title", "rich_text"):
+        return "" if value is None else str(value)
+    if kind == "number":
+        return None if value is None or value == "" else float(value)
+    if kind == "checkbox":
+        return bool(value)
+    if kind in ("multi_select", "relation", "people"):
+        if value is None:
+            return []
+        return [str(v) for v in (value if isinstance(value, list) else [value])]
+    if kind == "date" and isinstance(value, dict):
+        value = value.get("start")
+    return None if value is None or value == "" else str(value)
+
+def current_value(prop: Dict[str, Any]) -> Any:
+    """Plain value of a page property, with people and relations as IDs (what gets written)."""
+    kind = prop.get("type")
+    if kind in ("people", "relation"):
+        return [item.get("id") for item in prop.get(kind) or []]
+    return flatten_property(prop)
+
+def to_property_value(kind: str, value: Any) -> Dict[str, Any]:
+    """Notion property payload for a normalized plain value."""
+    if kind in ("title", "rich_text"):
+        return {kind: _rich_text(value)}
+    if kind in ("select", "status"):
+        return {kind: {"name": value} if value is not None else None}
+    if kind == "multi_select":
+        return {kind: [{"name": name} for name in value]}
+    if kind in ("relation", "people"):
+        return {kind: [{"id": item_id} for item_id in value]}
+    if kind == "date":
+        return {kind: {"start": value} if value is not None else None}
+    return {kind: value}
+
+@trace_methods("upsert")
+class UpsertService:
+    """Create-or-update rows in a Notion database keyed by a unique property."""
+
+    async def _collect(
+        self,
+        records: Records,
+        key_property: str,
+        types: Dict[str, str],
+        errors: List[Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Normalize records and collapse them by key (last one wins)."""
+        by_key: Dict[str, Dict[str, Any]] = {}
+
+        async def iterate():
+            if hasattr(records, "__aiter__"):
+                async for record in records:
+                    yield record
+            else:
+                for record in records:
+                    yield record
+
+        index = 0
+        async for record in iterate():
+            index += 1
+            if not isinstance(record, dict):
+                errors.append({"record": index, "error": "Record is not an object"})
+                continue
+            unknown = [name for name in record if name not in types]
+            read_only = [name for name in record if name in types and types[name] not in WRITABLE_TYPES]
+            if record.get(key_property) in (None, ""):
+                errors.append({"record": index, "error": f"Missing key property '{key_property}'"})
+            elif unknown or read_only:
+                errors.append({"record": index, "error": f"Unknown or read-only properties: {', '.join(unknown + read_only)}"})
+            else:
+                try:
+                    values = {name: normalize(types[name], value) for name, value in record.items()}
+                except (TypeError, ValueError) as e:
+                    errors.append({"record": index, "error": f"Invalid value: {e}"})
+                    continue
+                by_key[str(values[key_property])] = values
+        return by_key
+
+    async def _index(
+        self,
+        user_notion_config: UserNotionConfig,
+        database_id: str,
+        key_property: str,
+        key_type: str,
+        wanted: Dict[str, Dict[str, Any]]
+    ) -> Tuple[Dict[str, Tuple[str, Dict[str, Any]]], List[str]]:
+        """One paginated scan mapping key -> (page ID, properties) for the keys being written."""
+        index: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        duplicates: List[str] = []
+        async for pages, _ in export_service.iter_pages(user_notion_config, database_id):
+            for page in pages:
+                prop = page.get("properties", {}).get(key_property)
+                if not prop:
+                    continue
+                key = str(normalize(key_type, flatten_property(prop)))
+                if key not in wanted:
+                    continue
+                if key in index:
+                    duplicates.append(key)
+                    continue
+                index[key] = (page["id"], page.get("properties", {}))
+        return index, duplicates
+
+    @batch
+    async def upsert(
+        self,
+        user_notion_config: UserNotionConfig,
+        records: Records,
+        key_property: str,
+        database_id: Optional[str] = None,
+        dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """Write ``records`` (plain values by property name), touching only what changed.
+
+        Existing rows are PATCHed with just the properties whose values
+        differ; rows whose key is missing are created; rows that already
+        match are skipped without a request. ``dry_run`` reports the plan.
+        """
+        schema = await user_notion_service.get_database_schema(user_notion_config, database_id=database_id)
+        if not schema.get("success"):
+            return schema
+        db_id = schema["database_id"]
+        types = {name: prop.get("type") for name, prop in schema.get("properties", {}).items()}
+        key_type = types.get(key_property)
+        if key_type not in KEY_TYPES:
+            return {
+                "success": False,
+                "error": f"Key property '{key_property}' must be one of the database's text, number or select properties",
+                "status_code": 400
+            }
+
+        errors: List[Dict[str, Any]] = []
+        wanted = await self._collect(records, key_property, types, errors)
+        try:
+            index, duplicates = await self._index(user_notion_config, db_id, key_property, key_type, wanted)
+        except ExportError as e:
+            return {"success": False, "error": str(e)}
+
+        creates: List[Tuple[str, Dict[str, Any]]] = []
+        updates: List[Tuple[str, str, Dict[str, Any]]] = []
+        for key, values in wanted.items():
+            properties = {name: to_property_value(types[name], value) for name, value in values.items()}
+            if key not in index:
+                creates.append((key, properties))
+                continue
+            page_id, current = index[key]
+            changed = {
+                name: properties[name] for name, value in values.items()
+                if name not in current or normalize(types[name], current_value(current[name])) != value
+            }
+            if changed:
+                updates.append((key, page_id, changed))
+
+        summary = {
+            "success": True,
+            "database_id": db_id,
+            "key_property": key_property,
+            "records": len(wanted),
+            "created": len(creates),
+            "updated": len(updates),
+            "unchanged": len(wanted) - len(creates) - len(updates),
+            "patched_properties": sum(len(changed) for _, _, changed in updates),
+            "duplicate_keys": duplicates[:MAX_REPORTED_ERRORS],
+            "dry_run": dry_run
+        }
+        if dry_run:
+            summary["failed"] = len(errors)
+            summary["errors"] = errors[:MAX_REPORTED_ERRORS]
+            return summary
+
+        semaphore = asyncio.Semaphore(settings.upsert_concurrency)
+
+        # Counts below are of successful writes
+        summary["created"] = summary["updated"] = 0
+
+        async def write(action: str, key: str, send) -> None:
+            async with semaphore:
+                result = await send()
+            if result.get("success"):
+                summary[action] += 1
+            else:
+                errors.append({"key": key, "error": result.get("error"), "status_code": result.get("status_code")})
+
+        await asyncio.gather(
+            *(write("created", key, lambda properties=properties: user_notion_service.create_user_page(
+                user_notion_config, database_id=db_id, properties=properties
+            )) for key, properties in creates),
+            *(write("updated", key, lambda page_id=page_id, changed=changed: user_notion_service.update_page(
+                user_notion_config, page_id, changed
+            )) for key, page_id, changed in updates)
+        )
+
+        summary["failed"] = len(errors)
+        summary["errors"] = errors[:MAX_REPORTED_ERRORS]
+        return summary
+
+# Singleton instance
+upsert_service = UpsertService()
@@ -1,14 +1,27 @@
 from typing import Optional, Dict, Any, List
-import httpx
 from datetime import datetime
 from src.config import settings
+from src.core.serialization import loads
+from src.core.adaptive_limit import notion_limits
+from src.core.circuit_breaker import CircuitOpenError
+from src.core.deadline import DeadlineExceeded
+from src.core.retry import UnsentRetryPolicy
+from src.core.shared_cache import shared_cache
+from src.core.upstream import Upstream, fingerprint
+from src.core.tracing import trace_methods
 from src.models.user_notion import UserNotionConfig, NotionConnectionTest
 
+def notion_id(value: str) -> str:
+    """Canonical Notion ID (IDs are accepted with or without dashes)."""
+    return value.replace("-", "").lower()
+
+@trace_methods("notion")
 class UserNotionService:
     """Service for user-specific Notion API operations."""
     
     def __init__(self):
         self.base_url = "https://api.notion.com/v1"
+        self.http = Upstream("notion", limiter=notion_limits if settings.notion_adaptive_limits else None)
         # App-level fallback configuration
         self.app_api_key = settings.notion_api_key
         self.app_database_id = settings.notion_database_id
@@ -29,43 +42,113 @@ class UserNotionService:
         user_notion_config: UserNotionConfig
     ) -> NotionConnectionTest:
         """Test if a user's Notion API key works."""
-        headers = self._get_headers(user_notion_config.notion_api_key.get_secret_value())
+        api_key = user_notion_config.notion_api_key.get_secret_value()
+        headers = self._get_headers(api_key)
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/users/me",
-                    headers=headers,
-                    timeout=10.0
+        try:
+            response = await self.http.request(
+                "GET",
+                f"{self.base_url}/users/me",
+                headers=headers,
+                auth_key=api_key,
+                timeout=10.0
+            )
+            
+            if response.status_code == 200:
+                user_data = loads(response.content)
+                return NotionConnectionTest(
+                    status="connected",
+                    user_id=user_data.get("id"),
+                    user_name=user_data.get("name"),
+                    workspace_name=user_data.get("bot", {}).get("workspace_name"),
+                    tested_at=datetime.now()
                 )
-                
-                if response.status_code == 200:
-                    user_data = response.json()
-                    return NotionConnectionTest(
-                        status="connected",
-                        user_id=user_data.get("id"),
-                        user_name=user_data.get("name"),
-                        workspace_name=user_data.get("bot", {}).get("workspace_name"),
-                        tested_at=datetime.now()
-                    )
-                else:
-                    return NotionConnectionTest(
-                        status="error",
-                        error=f"API Error: {response.status_code} - {response.text}",
-                        tested_at=datetime.now()
-                    )
-            except Exception as e:
+            else:
                 return NotionConnectionTest(
                     status="error",
-                    error=f"Connection failed: {str(e)}",
+                    error=f"API Error: {response.status_code} - {response.text}",
+                    status_code=response.status_code,
                     tested_at=datetime.now()
                 )
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return NotionConnectionTest(
+                status="error",
+                error=f"Connection failed: {str(e)}",
+                tested_at=datetime.now()
+            )
+    
+    async def get_database_schema(
+        self,
+        user_notion_config: UserNotionConfig,
+        database_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get a database's title and property schema.
+
+        Cached per database and API key fingerprint, so one user's access is
+        never served to another; ``database:{id}:`` prefixes invalidate it.
+        """
+        db_id = database_id or user_notion_config.notion_database_id
+        
+        if not db_id:
+            return {
+                "success": False,
+                "error": "No database ID provided"
+            }
+        
+        api_key = user_notion_config.notion_api_key.get_secret_value()
+        cache_key = f"database:{notion_id(db_id)}:{fingerprint(api_key)}"
+        cached = await shared_cache.get("notion_schema", cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self.http.request(
+                "GET",
+                f"{self.base_url}/databases/{db_id}",
+                headers=self._get_headers(api_key),
+                auth_key=api_key,
+                timeout=30.0
+            )
+            
+            if response.status_code == 200:
+                data = loads(response.content)
+                result = {
+                    "success": True,
+                    "database_id": db_id,
+                    "title": "".join(t.get("plain_text", "") for t in data.get("title", [])),
+                    "properties": data.get("properties", {}),
+                    "last_edited_time": data.get("last_edited_time"),
+                    "user_owned": True
+                }
+                await shared_cache.set("notion_schema", cache_key, result, settings.schema_cache_ttl)
+                return result
+            else:
+                return {
+                    "success": False,
+                    "error": f"Failed to get database: {response.status_code}",
+                    "details": response.text,
+                    "status_code": response.status_code,
+                    "user_owned": True
+                }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}",
+                "user_owned": True
+            }
     
     async def query_user_database(
         self,
         user_notion_config: UserNotionConfig,
         database_id: Optional[str] = None,
-        page_size: int = 100
+        page_size: int = 100,
+        start_cursor: Optional[str] = None
     ) -> Dict[str, Any]:
         """Query a user's Notion database."""
         db_id = database_id or user_notion_config.notion_database_id
@@ -76,52 +159,72 @@ class UserNotionService:
                 "error": "No database ID provided"
             }
         
-        headers = self._get_headers(user_notion_config.notion_api_key.get_secret_value())
+        api_key = user_notion_config.notion_api_key.get_secret_value()
+        headers = self._get_headers(api_key)
         payload = {"page_size": page_size}
+        if start_cursor:
+            payload["start_cursor"] = start_cursor
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    f"{self.base_url}/databases/{db_id}/query",
-                    headers=headers,
-                    json=payload,
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "success": True,
-                        "results": data.get("results", []),
-                        "has_more": data.get("has_more", False),
-                        "next_cursor": data.get("next_cursor"),
-                        "count": len(data.get("results", [])),
-                        "database_id": db_id,
-                        "user_owned": True
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": f"Failed to query database: {response.status_code}",
-                        "details": response.text,
-                        "status_code": response.status_code,
-                        "user_owned": True
-                    }
-            except Exception as e:
+        try:
+            response = await self.http.request(
+                "POST",
+                f"{self.base_url}/databases/{db_id}/query",
+                headers=headers,
+                auth_key=api_key,
+                idempotent=True,  # read-only despite being a POST
+                json=payload,
+                timeout=30.0
+            )
+            
+            if response.status_code == 200:
+                data = loads(response.content)
+                return {
+                    "success": True,
+                    "results": data.get("results", []),
+                    "has_more": data.get("has_more", False),
+                    "next_cursor": data.get("next_cursor"),
+                    "count": len(data.get("results", [])),
+                    "database_id": db_id,
+                    "user_owned": True
+                }
+            else:
                 return {
                     "success": False,
-                    "error": f"Exception occurred: {str(e)}",
+                    "error": f"Failed to query database: {response.status_code}",
+                    "details": response.text,
+                    "status_code": response.status_code,
                     "user_owned": True
                 }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}",
+                "user_owned": True
+            }
     
     async def create_user_page(
         self,
         user_notion_config: UserNotionConfig,
         database_id: Optional[str] = None,
         title: str = "New Page",
-        content: Optional[str] = None
+        content: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+        properties: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """Create a page in user's Notion database."""
+        """Create a page in user's Notion database.
+
+        ``properties`` (Notion property values) replaces the default
+        ``Name`` title built from ``title``. Notion can't deduplicate
+        creates, so the request is only retried when it was never sent or
+        was rate limited. With an ``idempotency_key``, a repeat of a create
+        that succeeded returns the first page (``replayed``) and a repeat
+        still in flight gets a 409; failed creates can be retried with the
+        same key.
+        """
         db_id = database_id or user_notion_config.notion_database_id
         
         if not db_id:
@@ -130,7 +233,20 @@ class UserNotionService:
                 "error": "No database ID provided"
             }
         
-        headers = self._get_headers(user_notion_config.notion_api_key.get_secret_value())
+        api_key = user_notion_config.notion_api_key.get_secret_value()
+        headers = self._get_headers(api_key)
+
+        claim = f"{fingerprint(api_key)}:{idempotency_key}" if idempotency_key else None
+        if claim and not await shared_cache.add("notion_page_creates", claim, {"pending": True}, settings.idempotency_key_ttl):
+            previous = await shared_cache.get("notion_page_creates", claim)
+            if previous is None or previous.get("pending"):
+                return {
+                    "success": False,
+                    "error": "A page create with this idempotency key is still in progress",
+                    "status_code": 409,
+                    "user_owned": True
+                }
+            return {**previous, "replayed": True}
         
         payload = {
             "parent": {"database_id": db_id},
@@ -147,6 +263,9 @@ class UserNotionService:
             }
         }
         
+        if properties is not None:
+            payload["properties"] = properties
+        
         if content:
             payload["children"] = [
                 {
@@ -165,39 +284,107 @@ class UserNotionService:
                 }
             ]
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    f"{self.base_url}/pages",
-                    headers=headers,
-                    json=payload,
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    page_data = response.json()
-                    return {
-                        "success": True,
-                        "page": page_data,
-                        "page_id": page_data.get("id"),
-                        "url": page_data.get("url"),
-                        "message": "Page created successfully",
-                        "user_owned": True
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": f"Failed to create page: {response.status_code}",
-                        "details": response.text,
-                        "status_code": response.status_code,
-                        "user_owned": True
-                    }
-            except Exception as e:
+        try:
+            response = await self.http.request(
+                "POST",
+                f"{self.base_url}/pages",
+                headers=headers,
+                auth_key=api_key,
+                idempotent=True,
+                retry=UnsentRetryPolicy(),
+                json=payload,
+                timeout=30.0
+            )
+            
+            if response.status_code == 200:
+                page_data = loads(response.content)
+                result = {
+                    "success": True,
+                    "page": page_data,
+                    "page_id": page_data.get("id"),
+                    "url": page_data.get("url"),
+                    "message": "Page created successfully",
+                    "user_owned": True
+                }
+                if claim:
+                    await shared_cache.set("notion_page_creates", claim, result, settings.idempotency_key_ttl)
+                    claim = None
+                return result
+            else:
                 return {
                     "success": False,
-                    "error": f"Exception occurred: {str(e)}",
+                    "error": f"Failed to create page: {response.status_code}",
+                    "details": response.text,
+                    "status_code": response.status_code,
                     "user_owned": True
                 }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}",
+                "user_owned": True
+            }
+        finally:
+            # A create that failed leaves the key free, so the caller can retry with it
+            if claim:
+                await shared_cache.delete("notion_page_creates", claim)
+
+    async def update_page(
+        self,
+        user_notion_config: UserNotionConfig,
+        page_id: str,
+        properties: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Set property values on an existing page.
+
+        Only the given properties change. Setting absolute values is safe
+        to replay, so the PATCH is retried like an idempotent request.
+        """
+        api_key = user_notion_config.notion_api_key.get_secret_value()
+        headers = self._get_headers(api_key)
+        
+        try:
+            response = await self.http.request(
+                "PATCH",
+                f"{self.base_url}/pages/{page_id}",
+                headers=headers,
+                auth_key=api_key,
+                idempotent=True,
+                json={"properties": properties},
+                timeout=30.0
+            )
+            
+            if response.status_code == 200:
+                page_data = loads(response.content)
+                return {
+                    "success": True,
+                    "page": page_data,
+                    "page_id": page_data.get("id"),
+                    "message": "Page updated successfully",
+                    "user_owned": True
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": f"Failed to update page: {response.status_code}",
+                    "details": response.text,
+                    "status_code": response.status_code,
+                    "user_owned": True
+                }
+        except CircuitOpenError as e:
+            return e.to_result()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Exception occurred: {str(e)}",
+                "user_owned": True
+            }
 
 # Singleton instance
 user_notion_service = UserNotionService()
\ No newline at end of file
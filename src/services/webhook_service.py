@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from src.config import settings
+from src.core.adaptive_limit import batch
+from src.core.http_cache import response_cache
+from src.core.metrics import metrics
+from src.core.serialization import loads
+from src.core.shared_cache import shared_cache
+from src.core.tracing import trace_methods
+from src.services.user_notion_service import notion_id
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Event types after which a database's cached schema is stale
+SCHEMA_EVENTS = frozenset({
+    "database.schema_updated",
+    "database.deleted",
+    "database.undeleted",
+    "database.moved",
+    "data_source.schema_updated",
+    "data_source.deleted",
+})
+
+def sign(body: bytes, secret: str) -> str:
+    """``X-Notion-Signature`` value for ``body``."""
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+def event_database_id(event: Dict[str, Any]) -> Optional[str]:
+    """The database an event concerns: the entity itself, or a page's parent database."""
+    entity = event.get("entity") or {}
+    if entity.get("type") in ("database", "data_source"):
+        return entity.get("id")
+    parent = (event.get("data") or {}).get("parent") or {}
+    if parent.get("type") in ("database", "data_source"):
+        return parent.get("id")
+    return None
+
+@trace_methods("webhooks")
+class WebhookService:
+    """Verify, dedupe and dispatch Notion webhook events.
+
+    Events are acknowledged as soon as they are verified and queued; a
+    background worker runs the subscribed handlers. Handlers subscribe by
+    event type prefix (``"page."``, ``"database.schema_updated"``, ``""`` for
+    all) and must be idempotent, since Notion delivers at least once.
+    """
+
+    def __init__(self):
+        self._handlers: List[Tuple[str, EventHandler]] = []
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.stats = {"received": 0, "duplicates": 0, "rejected": 0, "processed": 0, "failed": 0}
+
+    def subscribe(self, prefix: str, handler: EventHandler) -> None:
+        self._handlers.append((prefix, handler))
+
+    def verify_signature(self, body: bytes, signature: Optional[str]) -> bool:
+        secret = settings.notion_webhook_secret
+        if not secret or not signature:
+            return False
+        return hmac.compare_digest(sign(body, secret.get_secret_value()), signature)
+
+    async def receive(self, body: bytes, signature: Optional[str]) -> Dict[str, Any]:
+        """Verify and enqueue one delivery."""
+        try:
+            event = loads(body)
+        except ValueError:
+            return {"success": False, "error": "Invalid JSON body", "status_code": 400}
+        if not isinstance(event, dict):
+            return {"success": False, "error": "Invalid event", "status_code": 400}
+
+        # Subscription handshake: Notion sends the verification token unsigned
+        if "verification_token" in event and "type" not in event:
+            logger.warning(
+                "Notion webhook verification request received; set NOTION_WEBHOOK_SECRET to the "
+                "verification token shown in the Notion integration settings"
+            )
+            return {"success": True, "status": "verification_received"}
+
+        if not self.verify_signature(body, signature):
+            self.stats["rejected"] += 1
+            return {"success": False, "error": "Invalid webhook signature", "status_code": 401}
+
+        event_id = event.get("id")
+        if not event_id or not event.get("type"):
+            return {"success": False, "error": "Event is missing id or type", "status_code": 400}
+
+        self.stats["received"] += 1
+        # Claimed atomically, so concurrent redeliveries to different workers run once
+        if not await shared_cache.add("notion_webhook_events", event_id, True, settings.notion_webhook_dedupe_seconds):
+            self.stats["duplicates"] += 1
+            return {"success": True, "status": "duplicate", "event_id": event_id}
+
+        if self._worker is None:
+            # No background worker (tests, replay): handle inline
+            await self.process(event)
+            return {"success": True, "status": "processed", "event_id": event_id}
+        else:
+            try:
+                self._queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Let Notion redeliver later rather than drop the event
+                await shared_cache.delete("notion_webhook_events", event_id)
+                return {"success": False, "error": "Webhook queue is full", "status_code": 503}
+        return {"success": True, "status": "queued", "event_id": event_id}
+
+    @batch
+    async def process(self, event: Dict[str, Any]) -> None:
+        """Run every handler subscribed to the event's type."""
+        event_type = event.get("type", "")
+        for prefix, handler in self._handlers:
+            if not event_type.startswith(prefix):
+                continue
+            try:
+                await handler(event)
+            except Exception:
+                self.stats["failed"] += 1
+                logger.exception("Webhook handler failed for %s event %s", event_type, event.get("id"))
+        self.stats["processed"] += 1
+
+    async def _run(self) -> None:
+        while True:
+            event = await self._queue.get()
+            try:
+                await self.process(event)
+            finally:
+                self._queue.task_done()
+
+    async def start(self) -> None:
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=settings.notion_webhook_queue_size)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Drain queued events, then stop the worker."""
+        if self._worker is None:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+        self._queue = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "queued": self._queue.qsize() if self._queue else 0}
+
+async def invalidate_database_schema(event: Dict[str, Any]) -> None:
+    """Drop cached schemas for the database an event touched, for every token."""
+    if event.get("type") not in SCHEMA_EVENTS:
+        return
+    database_id = event_database_id(event)
+    if database_id:
+        await shared_cache.delete_prefix("notion_schema", f"database:{notion_id(database_id)}:")
+
+async def invalidate_database_responses(event: Dict[str, Any]) -> None:
+    """Drop cached schema and query responses (tagged ``database:{id}``) for the database an event touched."""
+    database_id = event_database_id(event)
+    if not database_id:
+        return
+    # Routes are tagged with the ID as the caller wrote it, with or without dashes
+    canonical = notion_id(database_id)
+    dashed = "-".join((canonical[:8], canonical[8:12], canonical[12:16], canonical[16:20], canonical[20:]))
+    await response_cache.invalidate(f"database:{canonical}", f"database:{dashed}")
+
+# Singleton instance
+webhook_service = WebhookService()
+webhook_service.subscribe("", invalidate_database_schema)
+webhook_service.subscribe("", invalidate_database_responses)
+metrics.register("notion_webhooks", webhook_service.snapshot)
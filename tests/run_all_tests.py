@@ -26,7 +26,31 @@ def main():
         "test_mcp.py",
         "test_notion.py",
         "test_kratos.py",
-        "test_hydra.py"
+        "test_hydra.py",
+        "test_serialization.py",
+        "test_jobs.py",
+        "test_rate_limit.py",
+        "test_circuit_breaker.py",
+        "test_retry.py",
+        "test_shared_cache.py",
+        "test_startup.py",
+        "test_export.py",
+        "test_upsert.py",
+        "test_webhooks.py",
+        "test_http_cache.py",
+        "test_hydra_clients.py",
+        "test_consent.py",
+        "test_sessions.py",
+        "test_tracing.py",
+        "test_profiling.py",
+        "test_loop_monitor.py",
+        "test_logging.py",
+        "test_http2.py",
+        "test_adaptive_limit.py",
+        "test_hedging.py",
+        "test_identity_loader.py",
+        "test_notion_audit.py",
+        "test_deadline.py"
     ]
     
     print("Running all tests for Notion Ory Agent")
@@ -0,0 +1,223 @@
+import sys
+import os
+import asyncio
+import time
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from src.config import settings
+from src.core.adaptive_limit import BATCH, INTERACTIVE, AdaptiveLimit, AdaptiveLimiter, _lane, batch, priority
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.retry import RetryPolicy
+from src.core.upstream import Upstream, fingerprint
+
+def with_fast_limits(test):
+    """Start limits high enough that pacing doesn't slow the test down."""
+    def run():
+        names = ("notion_initial_rate", "notion_min_rate", "notion_max_rate", "notion_initial_concurrency")
+        original = [getattr(settings, name) for name in names]
+        settings.notion_initial_rate, settings.notion_min_rate, settings.notion_max_rate = 5000.0, 1000.0, 50000.0
+        settings.notion_initial_concurrency = 2.0
+        try:
+            test()
+        finally:
+            for name, value in zip(names, original):
+                setattr(settings, name, value)
+    run.__name__ = test.__name__
+    run.__doc__ = test.__doc__
+    return run
+
+@with_fast_limits
+def test_additive_increase():
+    """Test healthy responses raise concurrency and rate a little at a time."""
+    limit = AdaptiveLimit("token")
+    now = time.monotonic()
+    limit.in_flight = 64  # every slot busy: concurrency is the bottleneck
+    for _ in range(2):
+        limit.record(now, 200, 0.05)
+    assert 2.5 < limit.concurrency < 3.0
+    for _ in range(200):
+        limit.record(now, 200, 0.05)
+    assert 15 < limit.concurrency < 25
+    assert limit.rate == 5000.0
+
+    limit.in_flight, limit.rate_limited = 0, True
+    limit.record(now, 200, 0.05)
+    assert limit.rate > 5000
+    assert limit.decreases == 0
+    print("✓ Healthy responses increase limits additively")
+
+@with_fast_limits
+def test_multiplicative_decrease_once_per_burst():
+    """Test a burst of 429s halves the limits once and honours Retry-After."""
+    limit = AdaptiveLimit("token")
+    limit.concurrency, limit.rate = 16.0, 10000.0
+    sent_at = time.monotonic()
+    for _ in range(8):
+        limit.record(sent_at, 429, 0.05, retry_after=0.2)
+    assert limit.concurrency == 8.0 and limit.rate == 5000.0
+    assert limit.decreases == 1
+    assert limit._next_send >= time.monotonic() + 0.15
+
+    limit.record(time.monotonic(), 429, 0.05)
+    assert limit.concurrency == 4.0 and limit.decreases == 2
+    print("✓ 429 bursts back off multiplicatively once")
+
+@with_fast_limits
+def test_rising_latency_backs_off():
+    """Test smoothed latency well above the baseline reduces the limits."""
+    limit = AdaptiveLimit("token")
+    limit.concurrency = 10.0
+    for _ in range(20):
+        limit.record(time.monotonic(), 200, 0.05)
+    before = limit.concurrency
+    for _ in range(10):
+        limit.record(time.monotonic(), 200, 0.5)
+    assert limit.decreases >= 1
+    assert limit.concurrency < before
+    print("✓ Rising latency backs off")
+
+@with_fast_limits
+def test_concurrency_enforced():
+    """Test no more than the current limit run at once and cancelled waiters leak no slots."""
+    limiter = AdaptiveLimiter("test")
+    in_flight, peak = 0, 0
+
+    async def call():
+        nonlocal in_flight, peak
+        async with limiter.slot("token"):
+            in_flight += 1
+            peak = max(peak, in_flight)
+            try:
+                await asyncio.sleep(0.005)
+            finally:
+                in_flight -= 1
+
+    async def scenario():
+        waiter = asyncio.create_task(call())
+        blocked = [asyncio.create_task(call()) for _ in range(3)]
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(*[call() for _ in range(20)], *blocked, return_exceptions=True)
+        return limiter.get("token")
+
+    limit = asyncio.run(scenario())
+    assert peak == 2
+    assert limit.in_flight == 0 and not any(limit._lanes.values())
+    print("✓ Concurrency limit is enforced")
+
+def grant_order(limit, lanes):
+    """Queue one waiter per entry of ``lanes`` behind a held slot; return the order they were granted."""
+    order = []
+
+    async def waiter(index, lane):
+        await limit.acquire(lane)
+        order.append((index, lane))
+        limit.release()
+
+    async def scenario():
+        await limit.acquire()
+        tasks = []
+        for index, lane in enumerate(lanes):
+            tasks.append(asyncio.create_task(waiter(index, lane)))
+            await asyncio.sleep(0)
+        limit.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    return order
+
+@with_fast_limits
+def test_interactive_preempts_queued_batch():
+    """Test an interactive call jumps ahead of batch work queued before it."""
+    limit = AdaptiveLimit("token")
+    limit.concurrency = 1.0
+    order = grant_order(limit, [BATCH] * 10 + [INTERACTIVE])
+    assert order[0] == (10, INTERACTIVE)
+    assert [index for index, _ in order[1:]] == list(range(10))
+
+    paced = AdaptiveLimit("paced")
+    paced.concurrency, paced.rate = 100.0, 200.0
+    order = grant_order(paced, [BATCH] * 5 + [INTERACTIVE])
+    assert order.index((5, INTERACTIVE)) <= 1
+    print("✓ Interactive calls preempt queued batch work")
+
+@with_fast_limits
+def test_batch_not_starved():
+    """Test batch work gets one grant per notion_interactive_weight interactive grants."""
+    limit = AdaptiveLimit("token")
+    limit.concurrency = 1.0
+    weight = settings.notion_interactive_weight
+    order = grant_order(limit, [BATCH] * 3 + [INTERACTIVE] * (3 * weight))
+    assert [lane for _, lane in order] == ([INTERACTIVE] * weight + [BATCH]) * 3
+    print("✓ Batch work is not starved")
+
+def test_lane_context():
+    """Test batch entry points mark their Notion calls and nothing leaks out."""
+    @batch
+    async def bulk():
+        return _lane.get()
+
+    async def scenario():
+        assert _lane.get() == INTERACTIVE
+        assert await bulk() == BATCH
+        with priority(BATCH):
+            inherited = await asyncio.create_task(asyncio.sleep(0, result=_lane.get()))
+        return inherited, _lane.get()
+
+    assert asyncio.run(scenario()) == (BATCH, INTERACTIVE)
+    print("✓ Batch lanes follow the work that set them")
+
+@with_fast_limits
+def test_upstream_converges_under_server_limit():
+    """Test Notion calls settle near a server's real concurrency limit."""
+    server_limit = 6
+    in_flight, served, rejected = 0, 0, 0
+
+    async def handler(request):
+        nonlocal in_flight, served, rejected
+        if in_flight >= server_limit:
+            rejected += 1
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        in_flight += 1
+        await asyncio.sleep(0.005)
+        in_flight -= 1
+        served += 1
+        return httpx.Response(200, json={"object": "list", "results": []})
+
+    limiter = AdaptiveLimiter("test-notion")
+
+    async def scenario():
+        upstream = Upstream("test-notion-aimd", limiter=limiter)
+        upstream.breaker = CircuitBreaker("test-notion-aimd")
+        upstream.retry_policy = RetryPolicy(max_attempts=10, base_delay=0.001, max_delay=0.01, deadline=10.0)
+        upstream._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        upstream._client_loop = asyncio.get_running_loop()
+        responses = await asyncio.gather(*[
+            upstream.request("GET", f"https://api.notion.test/v1/blocks/{i}/children", auth_key="secret_abc")
+            for i in range(300)
+        ])
+        await upstream._client.aclose()
+        return responses
+
+    responses = asyncio.run(scenario())
+    assert all(response.status_code == 200 for response in responses)
+    assert served == 300
+    assert rejected < 60
+    snapshot = limiter.snapshot()[fingerprint("secret_abc")]
+    assert snapshot["decreases"] >= 1
+    assert 1 <= snapshot["concurrency"] <= server_limit * 2 + 1
+    print("✓ Adaptive limit converges on the server's limit")
+
+if __name__ == "__main__":
+    test_additive_increase()
+    test_multiplicative_decrease_once_per_burst()
+    test_rising_latency_backs_off()
+    test_concurrency_enforced()
+    test_interactive_preempts_queued_batch()
+    test_batch_not_starved()
+    test_lane_context()
+    test_upstream_converges_under_server_limit()
+    print("\n✅ Adaptive limit tests passed!")
@@ -0,0 +1,100 @@
+import sys
+import os
+import asyncio
+import time
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi.testclient import TestClient
+from src.core.circuit_breaker import BreakerState, CircuitBreaker, CircuitOpenError
+from src.core.upstream import Upstream
+from src.main import app
+
+client = TestClient(app)
+
+def test_breaker_trips_on_error_rate():
+    """Test the breaker opens once the failure rate crosses its threshold."""
+    breaker = CircuitBreaker("test-errors", minimum_calls=4, failure_rate_threshold=0.5)
+    for success in (True, False, True, False):
+        breaker.before_call()
+        breaker.record(success, 0.01)
+    assert breaker.state == BreakerState.OPEN
+    try:
+        breaker.before_call()
+        assert False, "open breaker should fail fast"
+    except CircuitOpenError as e:
+        assert e.to_result()["status_code"] == 503
+    print("✓ Breaker trips on error rate")
+
+def test_breaker_trips_on_latency():
+    """Test the breaker opens when most calls are slow."""
+    breaker = CircuitBreaker("test-latency", minimum_calls=3, slow_call_threshold=0.5, slow_call_rate_threshold=0.6)
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record(True, 1.0)
+    assert breaker.state == BreakerState.OPEN
+    print("✓ Breaker trips on slow calls")
+
+def test_half_open_probe():
+    """Test a single probe is admitted after the open period and closes the breaker."""
+    breaker = CircuitBreaker("test-probe", minimum_calls=1, open_duration=0.05)
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == BreakerState.OPEN
+    time.sleep(0.06)
+
+    breaker.before_call()
+    assert breaker.state == BreakerState.HALF_OPEN
+    try:
+        breaker.before_call()
+        assert False, "only one probe may be in flight"
+    except CircuitOpenError:
+        pass
+    breaker.record(True, 0.01)
+    assert breaker.state == BreakerState.CLOSED
+    print("✓ Half-open probing closes the breaker")
+
+def test_auth_breaker_isolates_tokens():
+    """Test repeated 401s trip only the offending token's breaker."""
+    async def scenario():
+        upstream = Upstream("test-notion")
+        upstream._client = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(401 if "revoked" in request.headers["authorization"] else 200)
+        ))
+        upstream._client_loop = asyncio.get_running_loop()
+
+        for _ in range(3):
+            await upstream.request("GET", "https://example.test/users/me",
+                                   headers={"authorization": "Bearer revoked"}, auth_key="revoked")
+        try:
+            await upstream.request("GET", "https://example.test/users/me",
+                                   headers={"authorization": "Bearer revoked"}, auth_key="revoked")
+            assert False, "revoked token should fail fast"
+        except CircuitOpenError:
+            pass
+
+        response = await upstream.request("GET", "https://example.test/users/me",
+                                          headers={"authorization": "Bearer good"}, auth_key="good")
+        assert response.status_code == 200
+        assert upstream.breaker.state == BreakerState.CLOSED
+        await upstream._client.aclose()
+
+    asyncio.run(scenario())
+    print("✓ Auth breaker isolates revoked tokens")
+
+def test_breakers_in_health_and_metrics():
+    """Test breaker state is visible in the health and metrics endpoints."""
+    assert "circuit_breakers" in client.get("/health/").json()
+    metrics = client.get("/health/metrics").json()
+    assert "kratos" in metrics["circuit_breakers"]
+    print("✓ Breaker state is exposed")
+
+if __name__ == "__main__":
+    test_breaker_trips_on_error_rate()
+    test_breaker_trips_on_latency()
+    test_half_open_probe()
+    test_auth_breaker_isolates_tokens()
+    test_breakers_in_health_and_metrics()
+    print("\n✅ Circuit breaker tests passed!")
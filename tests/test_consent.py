@@ -0,0 +1,205 @@
+import sys
+import os
+import asyncio
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api import dependencies
+from src.api.routers import oauth
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.serialization import loads
+from src.services.consent_service import ConsentService
+import src.services.consent_service as consent_module
+from src.services.hydra_service import HydraService
+from src.services.kratos_service import KratosService
+
+ORIGINAL_SERVICES = (consent_module.hydra_service, consent_module.kratos_service)
+
+IDENTITY = {
+    "id": "user-1",
+    "traits": {
+        "email": "u@example.com",
+        "notion_config": {"api_key": "secret_abc", "database_id": "db-1", "enabled": True}
+    }
+}
+
+def make_services(consent_request, login_request, calls):
+    def hydra_handler(request):
+        calls.append((request.method, request.url.path))
+        if request.url.path.endswith("/consent"):
+            return httpx.Response(200, json=consent_request)
+        if request.url.path.endswith("/login"):
+            return httpx.Response(200, json=login_request)
+        calls.append(("body", loads(request.content)))
+        return httpx.Response(200, json={"redirect_to": "http://client/callback"})
+
+    def kratos_handler(request):
+        calls.append((request.method, request.url.path))
+        return httpx.Response(200, json=IDENTITY)
+
+    hydra, kratos = HydraService(), KratosService()
+    for service, handler in ((hydra, hydra_handler), (kratos, kratos_handler)):
+        service.http.breaker = CircuitBreaker(f"{service.http.name}-consent-test")
+        service.http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        service.http._client_loop = asyncio.get_running_loop()
+        service.http._build_client = lambda handler=handler: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    consent_module.hydra_service, consent_module.kratos_service = hydra, kratos
+    return hydra, kratos
+
+def test_remembered_consent_accepted_immediately():
+    """Test a remembered grant is accepted in one step with Notion claims."""
+    async def scenario():
+        calls = []
+        hydra, kratos = make_services(
+            {"skip": True, "subject": "user-1", "requested_scope": ["openid", "notion_api"], "client": {}},
+            {}, calls
+        )
+        result = await ConsentService().consent("challenge-1", subject="user-1")
+        assert result["success"] and result["status"] == "accepted" and result["skipped"]
+        assert result["redirect_to"] == "http://client/callback"
+
+        body = next(item for kind, item in calls if kind == "body")
+        assert body["grant_scope"] == ["openid", "notion_api"] and body["remember"] is False
+        claims = body["session"]["access_token"]["notion"]
+        assert claims["config_ref"] == "kratos:identities/user-1#traits.notion_config"
+        assert claims["database_id"] == "db-1"
+        assert "secret_abc" not in str(body)
+        await hydra.http._client.aclose()
+        await kratos.http._client.aclose()
+        consent_module.hydra_service, consent_module.kratos_service = ORIGINAL_SERVICES
+
+    asyncio.run(scenario())
+    print("✓ Remembered consent is accepted immediately")
+
+def test_consent_required_without_grant():
+    """Test an unremembered consent waits for the user, then grants only requested scopes."""
+    async def scenario():
+        calls = []
+        hydra, kratos = make_services(
+            {"skip": False, "subject": "user-1", "requested_scope": ["openid"], "client": {}},
+            {}, calls
+        )
+        service = ConsentService()
+        result = await service.consent("challenge-2")
+        assert result["status"] == "consent_required"
+        assert [method for method, _ in calls] == ["GET"]
+
+        for subject in (None, "user-2"):
+            result = await service.consent("challenge-2", grant_scope=["openid"], subject=subject)
+            assert not result["success"] and result["status_code"] == 403
+        assert not any(kind == "body" for kind, _ in calls)
+
+        result = await service.consent("challenge-2", grant_scope=["openid", "notion_api"], subject="user-1")
+        assert result["status"] == "accepted" and result["grant_scope"] == ["openid"]
+        await hydra.http._client.aclose()
+        await kratos.http._client.aclose()
+        consent_module.hydra_service, consent_module.kratos_service = ORIGINAL_SERVICES
+
+    asyncio.run(scenario())
+    print("✓ Consent waits for approval and grants only requested scopes")
+
+def test_login_fast_path():
+    """Test remembered logins are accepted for Hydra's subject and unknown users must log in."""
+    async def scenario():
+        calls = []
+        hydra, kratos = make_services({}, {"skip": True, "subject": "user-1"}, calls)
+        result = await ConsentService().login("login-1")
+        assert result["status"] == "accepted" and result["subject"] == "user-1"
+        body = next(item for kind, item in calls if kind == "body")
+        assert body["subject"] == "user-1"
+
+        calls.clear()
+        hydra, kratos = make_services({}, {"skip": False}, calls)
+        assert (await ConsentService().login("login-2"))["status"] == "login_required"
+        result = await ConsentService().login("login-2", subject="user-1")
+        assert result["status"] == "accepted" and not result["skipped"]
+        await hydra.http._client.aclose()
+        await kratos.http._client.aclose()
+        consent_module.hydra_service, consent_module.kratos_service = ORIGINAL_SERVICES
+
+    asyncio.run(scenario())
+    print("✓ Login fast path works")
+
+def test_accept_login_requires_session():
+    """Test logins are accepted only as the caller's own identity."""
+    logins = []
+
+    class StubKratos:
+        async def resolve_session(self, session_token=None, session_cookie=None):
+            if session_token == "token-1":
+                return {"success": True, "session": {"identity_id": "user-1"}, "identity": IDENTITY}
+            return {"success": False, "error": "Session is invalid or expired", "status_code": 401}
+
+    class StubConsent:
+        async def login(self, login_challenge, subject=None, remember=True):
+            logins.append(subject)
+            return {"success": True, "redirect_to": "http://client/callback", "skipped": False}
+
+    oauth_app = FastAPI()
+    oauth_app.include_router(oauth.router)
+    original = (dependencies.kratos_service, oauth.consent_service)
+    dependencies.kratos_service, oauth.consent_service = StubKratos(), StubConsent()
+    try:
+        client = TestClient(oauth_app)
+        assert client.post("/oauth/login/login-1/accept", params={"subject": "victim"}).status_code == 401
+        assert client.post("/oauth/login/login-1/accept", headers={"X-Session-Token": "forged"}).status_code == 401
+        assert logins == []
+
+        response = client.post(
+            "/oauth/login/login-1/accept",
+            params={"subject": "victim"},
+            headers={"Authorization": "Bearer token-1"}
+        )
+        assert response.status_code == 200 and logins == ["user-1"]
+    finally:
+        dependencies.kratos_service, oauth.consent_service = original
+    print("✓ Accepting a login requires the caller's session")
+
+def test_accept_consent_requires_session():
+    """Test consent is granted only by the user the consent request belongs to."""
+    class StubKratos:
+        async def resolve_session(self, session_token=None, session_cookie=None):
+            if session_token in ("token-1", "token-2"):
+                identity_id = f"user-{session_token[-1]}"
+                return {"success": True, "session": {"identity_id": identity_id}, "identity": IDENTITY}
+            return {"success": False, "error": "Session is invalid or expired", "status_code": 401}
+
+    async def setup(calls):
+        return make_services(
+            {"skip": False, "subject": "user-1", "requested_scope": ["openid", "notion_api"], "client": {}},
+            {}, calls
+        )
+
+    calls = []
+    asyncio.run(setup(calls))
+    oauth_app = FastAPI()
+    oauth_app.include_router(oauth.router)
+    original = (dependencies.kratos_service, oauth.consent_service)
+    dependencies.kratos_service, oauth.consent_service = StubKratos(), ConsentService()
+    try:
+        client = TestClient(oauth_app)
+        url = "/oauth/consent/consent-1/accept"
+        params = {"grant_scope": ["openid", "notion_api"]}
+        assert client.post(url, params=params).status_code == 401
+        assert client.post(url, params=params, headers={"X-Session-Token": "forged"}).status_code == 401
+        assert client.post(url, params=params, headers={"X-Session-Token": "token-2"}).status_code == 403
+        assert not any(kind == "body" for kind, _ in calls)
+
+        response = client.post(url, params=params, headers={"X-Session-Token": "token-1"})
+        assert response.status_code == 200 and response.json()["grant_scope"] == ["openid", "notion_api"]
+    finally:
+        dependencies.kratos_service, oauth.consent_service = original
+        consent_module.hydra_service, consent_module.kratos_service = ORIGINAL_SERVICES
+    print("✓ Accepting consent requires the subject's own session")
+
+if __name__ == "__main__":
+    test_remembered_consent_accepted_immediately()
+    test_consent_required_without_grant()
+    test_login_fast_path()
+    test_accept_login_requires_session()
+    test_accept_consent_requires_session()
+    print("\n✅ Consent tests passed!")
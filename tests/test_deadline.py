@@ -0,0 +1,233 @@
+import sys
+import os
+import asyncio
+import time
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api.main import create_app
+from src.api.middleware.deadline import DeadlineMiddleware
+from src.config import settings
+from src.core.adaptive_limit import AdaptiveLimiter
+from src.core.batch_loader import BatchLoader
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.deadline import DeadlineExceeded, deadline, parse_deadline, remaining
+from src.core.serialization import dumps
+from src.core.upstream import Upstream, fingerprint
+from src.services.hydra_service import hydra_service
+from src.services.kratos_service import kratos_service
+from src.services.user_notion_service import user_notion_service
+
+def slow_upstream(name, delay, limiter=None):
+    """An Upstream whose server takes ``delay`` seconds; returns (upstream, per-request read timeouts)."""
+    timeouts = []
+
+    async def handler(request):
+        timeouts.append(request.extensions["timeout"]["read"])
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json={})
+
+    upstream = Upstream(name, limiter=limiter)
+    upstream.breaker = CircuitBreaker(name)
+    upstream._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    upstream._client_loop = asyncio.get_running_loop()
+    return upstream, timeouts
+
+def test_parse_deadline():
+    """Test header values in seconds or as a timestamp, capped and validated."""
+    assert parse_deadline("2.5") == 2.5
+    assert 9 < parse_deadline(str(time.time() + 10)) <= 10
+    assert parse_deadline(str(time.time() - 10)) == 0.0
+    assert parse_deadline("1e9999") is None and parse_deadline("soon") is None and parse_deadline(None) is None
+    assert parse_deadline("100000") == settings.request_deadline_max
+    print("✓ Deadline headers are parsed")
+
+def test_nested_deadlines():
+    """Test an inner deadline can't extend an outer one."""
+    assert remaining() is None
+    with deadline(1.0):
+        with deadline(60.0):
+            assert remaining() <= 1.0
+        with deadline(0.5):
+            assert remaining() <= 0.5
+    assert remaining() is None
+    print("✓ The earliest deadline wins")
+
+def test_upstream_call_bounded_by_deadline():
+    """Test attempt timeouts come from the remaining budget and slow calls are cut off."""
+    async def scenario():
+        upstream, timeouts = slow_upstream("deadline-slow", 5.0)
+        start = time.monotonic()
+        try:
+            with deadline(0.2):
+                await upstream.request("GET", "https://kratos.test/admin/identities/1")
+        except DeadlineExceeded:
+            pass
+        else:
+            raise AssertionError("request outlived its deadline")
+        elapsed = time.monotonic() - start
+
+        try:
+            with deadline(0.0):
+                await upstream.request("GET", "https://kratos.test/admin/identities/1")
+        except DeadlineExceeded:
+            pass
+        else:
+            raise AssertionError("request sent after its deadline")
+        await upstream._client.aclose()
+        return elapsed, timeouts
+
+    elapsed, timeouts = asyncio.run(scenario())
+    assert elapsed < 0.5
+    assert len(timeouts) == 1 and timeouts[0] <= 0.2
+    print("✓ Upstream calls fit inside the caller's deadline")
+
+def test_queued_limiter_slot_released():
+    """Test a request still queued for a rate-limit slot gives it up at the deadline."""
+    limiter = AdaptiveLimiter("deadline-test")
+
+    async def scenario():
+        upstream, _ = slow_upstream("deadline-queued", 0.3, limiter=limiter)
+        limit = limiter.get(fingerprint("secret_abc"))
+        limit.concurrency = 1.0
+        holder = asyncio.ensure_future(upstream.request("GET", "https://api.notion.test/v1/users/me", auth_key="secret_abc"))
+        await asyncio.sleep(0.05)
+        try:
+            with deadline(0.05):
+                await upstream.request("GET", "https://api.notion.test/v1/users/me", auth_key="secret_abc")
+        except DeadlineExceeded:
+            pass
+        else:
+            raise AssertionError("queued request outlived its deadline")
+        waiting = sum(limit.snapshot()["waiting"].values())
+        await holder
+        await upstream._client.aclose()
+        return waiting, limit.in_flight
+
+    waiting, in_flight = asyncio.run(scenario())
+    assert waiting == 0 and in_flight == 0
+    print("✓ Queued limiter slots are given up at the deadline")
+
+def test_abandoned_batch_cancelled():
+    """Test a batch nobody waits for any more is cancelled."""
+    cancelled = []
+
+    async def fetch(keys):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(keys)
+            raise
+        return {}
+
+    async def scenario():
+        loader = BatchLoader(fetch)
+        with deadline(0.05):
+            results = await asyncio.gather(loader.load("a"), loader.load("b"), return_exceptions=True)
+        await asyncio.sleep(0.01)
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, DeadlineExceeded) for result in results)
+    assert cancelled == [["a", "b"]]
+    print("✓ Abandoned batches are cancelled")
+
+def test_header_and_disconnect():
+    """Test the header sets the deadline and a disconnect cancels the handler."""
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware)
+    events = []
+
+    @app.get("/budget")
+    async def budget():
+        return {"remaining": remaining()}
+
+    @app.get("/slow")
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+
+    client = TestClient(app)
+    assert 0 < client.get("/budget", headers={"X-Request-Deadline": "1.5"}).json()["remaining"] <= 1.5
+    assert client.get("/budget").json()["remaining"] is None
+
+    async def disconnect_early():
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.sleep(0.05)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            events.append(message["type"])
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/slow", "raw_path": b"/slow", "root_path": "", "query_string": b"",
+            "headers": [], "client": ("test", 1), "server": ("test", 80), "app": app
+        }
+        start = time.monotonic()
+        await app(scope, receive, send)
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(disconnect_early())
+    assert elapsed < 1.0
+    assert events == ["cancelled"]
+    print("✓ Client disconnects cancel the handler")
+
+def test_routes_return_504_at_deadline():
+    """Test Kratos, Notion and Hydra routes answer 504 when the caller's deadline passes."""
+    user_id = f"deadline-{time.monotonic_ns()}"
+    identity = {"id": user_id, "traits": {"notion_config": {"api_key": "secret_slow", "database_id": "db-1"}}}
+    slow_kratos = True
+
+    async def handler(request):
+        if request.url.host == "api.notion.com" or "/clients/" in request.url.path or slow_kratos:
+            await asyncio.sleep(2.0)
+        return httpx.Response(200, content=dumps(identity))
+
+    services = (kratos_service, user_notion_service, hydra_service)
+    originals = [(service.http._build_client, service.http._client, service.http.breaker) for service in services]
+    max_batch = kratos_service.identity_loader.max_batch
+    for service in services:
+        service.http._build_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        service.http._client = None
+        service.http.breaker = CircuitBreaker(f"deadline-routes-{service.http.name}-{user_id}")
+    headers = {"X-Request-Deadline": "0.2"}
+    client = TestClient(create_app())
+    try:
+        for batch_size in (1, 100):
+            kratos_service.identity_loader.max_batch = batch_size
+            start = time.monotonic()
+            response = client.get(f"/auth/identities/{user_id}-{batch_size}", headers=headers)
+            assert response.status_code == 504, response.text
+            assert time.monotonic() - start < 1.0
+            assert client.get(f"/notion/users/{user_id}-{batch_size}/databases/schema", headers=headers).status_code == 504
+
+        slow_kratos = False
+        assert client.get(f"/notion/users/{user_id}/databases/schema", headers=headers).status_code == 504
+        assert client.get(f"/oauth/clients/{user_id}", headers=headers).status_code == 504
+    finally:
+        kratos_service.identity_loader.max_batch = max_batch
+        for service, (build, http_client, breaker) in zip(services, originals):
+            service.http._build_client, service.http._client, service.http.breaker = build, http_client, breaker
+    print("✓ Routes answer 504 once the deadline passes")
+
+if __name__ == "__main__":
+    test_parse_deadline()
+    test_nested_deadlines()
+    test_upstream_call_bounded_by_deadline()
+    test_queued_limiter_slot_released()
+    test_abandoned_batch_cancelled()
+    test_header_and_disconnect()
+    test_routes_return_504_at_deadline()
+    print("\n✅ Deadline tests passed!")
@@ -0,0 +1,165 @@
+import sys
+import os
+import asyncio
+from collections import deque
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from src.config import settings
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.hedging import HedgeBudget, Hedger
+from src.core.upstream import Upstream
+
+def make_upstream(name, handler, budget=None):
+    upstream = Upstream(name, hedger=Hedger(name, budget or HedgeBudget()))
+    upstream.breaker = CircuitBreaker(name)
+    upstream._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    upstream._client_loop = asyncio.get_running_loop()
+    return upstream
+
+def warm(hedger, latency=0.01):
+    for _ in range(settings.hedge_min_samples):
+        hedger.latencies.append(latency)
+
+def test_slow_request_is_hedged():
+    """Test a request slower than p95 gets a second copy and the fast answer wins."""
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            await asyncio.sleep(1.0)
+        return httpx.Response(200, json={"id": "identity-1", "copy": len(calls)})
+
+    async def scenario():
+        upstream = make_upstream("test-hedge-slow", handler)
+        warm(upstream.hedger)
+        started = asyncio.get_running_loop().time()
+        response = await upstream.request("GET", "http://kratos.test/admin/identities/1", hedge=True)
+        elapsed = asyncio.get_running_loop().time() - started
+        await upstream._client.aclose()
+        return upstream.hedger, response, elapsed
+
+    hedger, response, elapsed = asyncio.run(scenario())
+    assert response.json()["copy"] == 2
+    assert elapsed < 0.5
+    assert len(calls) == 2 and hedger.hedged == 1 and hedger.hedge_wins == 1
+    # The cancelled primary counts as at least as slow as it had run, not the hedge's quick answer
+    assert len(hedger.latencies) == settings.hedge_min_samples + 1
+    assert hedger.latencies[-1] >= hedger.delay()
+    print("✓ Slow requests are hedged")
+
+def test_threshold_stable_when_hedges_win():
+    """Test hedges winning the slow tail don't drag the hedge threshold down."""
+    async def scenario():
+        hedger = Hedger("test-hedge-stable", HedgeBudget())
+        hedger.latencies = deque(maxlen=100)
+        for i in range(100):
+            hedger.latencies.append(0.05 if i % 10 == 9 else 0.01)
+        initial = hedger.delay()
+        for i in range(100):
+            copies = 0
+
+            async def send():
+                nonlocal copies
+                copies += 1
+                if copies == 1:
+                    await asyncio.sleep(0.2 if i % 10 == 9 else 0.01)
+                return copies
+
+            await hedger.run(send)
+        hedger._delay = None
+        return hedger, initial
+
+    hedger, initial = asyncio.run(scenario())
+    assert hedger.hedge_wins >= 9
+    assert hedger.delay() >= initial
+    print("✓ Hedge threshold stays put when hedges win")
+
+def test_fast_and_unsafe_requests_not_hedged():
+    """Test fast reads, writes and cold hedgers send one request."""
+    calls = []
+
+    async def handler(request):
+        calls.append(request.method)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={})
+
+    async def scenario():
+        upstream = make_upstream("test-hedge-unsafe", handler)
+        await upstream.request("GET", "http://kratos.test/admin/identities/1", hedge=True)
+        warm(upstream.hedger, latency=0.2)
+        await upstream.request("GET", "http://kratos.test/admin/identities/1", hedge=True)
+        warm(upstream.hedger, latency=0.001)
+        upstream.hedger._delay = None
+        await upstream.request("POST", "http://kratos.test/admin/identities", hedge=True, json={})
+        await upstream.request("GET", "http://kratos.test/admin/identities/1")
+        await upstream._client.aclose()
+        return upstream.hedger
+
+    hedger = asyncio.run(scenario())
+    assert calls == ["GET", "GET", "POST", "GET"]
+    assert hedger.hedged == 0
+    print("✓ Fast, unsafe and unmarked requests are not hedged")
+
+def test_budget_caps_hedges():
+    """Test the shared budget stops hedging from doubling load when everything is slow."""
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return httpx.Response(200, json={})
+
+    original = (settings.hedge_budget_ratio, settings.hedge_budget_burst)
+    settings.hedge_budget_ratio, settings.hedge_budget_burst = 0.1, 2.0
+    try:
+        async def scenario():
+            upstream = make_upstream("test-hedge-budget", handler, HedgeBudget())
+            warm(upstream.hedger, latency=0.005)
+            await asyncio.gather(*[
+                upstream.request("GET", f"http://kratos.test/admin/identities/{i}", hedge=True) for i in range(40)
+            ])
+            await upstream._client.aclose()
+            return upstream.hedger
+        hedger = asyncio.run(scenario())
+    finally:
+        settings.hedge_budget_ratio, settings.hedge_budget_burst = original
+    assert hedger.hedged <= 2 + 40 * 0.1
+    assert hedger.denied >= 30
+    assert calls == 40 + hedger.hedged
+    print("✓ Hedge budget caps extra load")
+
+def test_failed_copy_falls_back_to_other():
+    """Test a failing copy doesn't win over a slower successful one."""
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={"copy": 1})
+        raise httpx.ConnectError("refused", request=request)
+
+    async def scenario():
+        upstream = make_upstream("test-hedge-failure", handler)
+        upstream.retry_policy.max_attempts = 1
+        warm(upstream.hedger)
+        response = await upstream.request("GET", "http://kratos.test/admin/identities/1", hedge=True)
+        await upstream._client.aclose()
+        return response
+
+    assert asyncio.run(scenario()).json() == {"copy": 1}
+    print("✓ Failed hedges fall back to the primary")
+
+if __name__ == "__main__":
+    test_slow_request_is_hedged()
+    test_threshold_stable_when_hedges_win()
+    test_fast_and_unsafe_requests_not_hedged()
+    test_budget_caps_hedges()
+    test_failed_copy_falls_back_to_other()
+    print("\n✅ Hedging tests passed!")
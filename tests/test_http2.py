@@ -0,0 +1,167 @@
+import sys
+import os
+import asyncio
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from src.config import settings
+from src.core import upstream as upstream_module
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.upstream import Upstream
+
+def http2_response(request):
+    return httpx.Response(200, json={"ok": True}, extensions={"http_version": b"HTTP/2"})
+
+def make_upstream(name, handler):
+    upstream = Upstream(name, http2=True)
+    upstream.breaker = CircuitBreaker(name)
+    upstream._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    upstream._client_loop = asyncio.get_running_loop()
+    return upstream
+
+def test_opt_in_by_name():
+    """Test HTTP/2 is only enabled for upstreams listed in settings."""
+    original = settings.http2_upstreams
+    settings.http2_upstreams = ["test-h2-listed"]
+    try:
+        assert Upstream("test-h2-listed").http2
+        assert not Upstream("test-h2-unlisted").http2
+    finally:
+        settings.http2_upstreams = original
+    print("✓ HTTP/2 is opt-in per upstream")
+
+def test_missing_h2_uses_http1():
+    """Test a missing h2 package falls back to an HTTP/1.1 client."""
+    original = upstream_module.h2_available
+    upstream_module.h2_available = lambda: False
+    try:
+        async def scenario():
+            upstream = Upstream("test-h2-missing", http2=True)
+            client = upstream.client
+            await client.aclose()
+            return upstream
+        assert not asyncio.run(scenario()).http2
+    finally:
+        upstream_module.h2_available = original
+    print("✓ Missing h2 falls back to HTTP/1.1")
+
+def test_concurrent_streams_capped():
+    """Test at most http2_max_concurrent_streams requests are in flight."""
+    in_flight, peak = 0, 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return http2_response(request)
+
+    async def scenario():
+        upstream = make_upstream("test-h2-streams", handler)
+        responses = await asyncio.gather(*[
+            upstream.request("GET", f"https://example.test/v1/blocks/{i}/children") for i in range(12)
+        ])
+        return upstream, responses
+
+    original = settings.http2_max_concurrent_streams
+    settings.http2_max_concurrent_streams = 3
+    try:
+        upstream, responses = asyncio.run(scenario())
+    finally:
+        settings.http2_max_concurrent_streams = original
+    assert all(response.status_code == 200 for response in responses)
+    assert peak == 3
+    assert upstream.http_version == "HTTP/2"
+    print("✓ Concurrent streams are capped")
+
+def h2c(test):
+    def run():
+        original = settings.http2_cleartext
+        settings.http2_cleartext = True
+        try:
+            test()
+        finally:
+            settings.http2_cleartext = original
+    run.__name__ = test.__name__
+    run.__doc__ = test.__doc__
+    return run
+
+def rejecting(request):
+    raise httpx.RemoteProtocolError("unexpected preface response", request=request)
+
+@h2c
+def test_rejected_preface_falls_back():
+    """Test a server rejecting h2c is retried over HTTP/1.1, but only before any response."""
+    async def scenario():
+        upstream = make_upstream("test-h2-fallback", rejecting)
+        upstream._build_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(200)))
+        response = await upstream.request("GET", "http://kratos.test/admin/identities")
+        assert response.status_code == 200
+        assert not upstream.http2 and upstream.http_version == "HTTP/1.1"
+
+        for http_version in ("HTTP/2", "HTTP/1.1"):
+            confirmed = make_upstream(f"test-h2-confirmed-{http_version}", rejecting)
+            confirmed.http_version = http_version
+            try:
+                await confirmed.request("GET", "http://kratos.test/admin/identities")
+                assert False, "protocol errors after a response should surface"
+            except httpx.RemoteProtocolError:
+                pass
+            assert confirmed.http2
+
+    asyncio.run(scenario())
+    print("✓ Rejected HTTP/2 falls back to HTTP/1.1")
+
+def test_fallback_needs_cleartext():
+    """Test protocol errors over TLS (ALPN) are not mistaken for a rejected h2c preface."""
+    async def scenario():
+        upstream = make_upstream("test-h2-alpn", rejecting)
+        try:
+            await upstream.request("GET", "https://api.notion.test/v1/users/me")
+            assert False, "protocol error should surface"
+        except httpx.RemoteProtocolError:
+            pass
+        assert upstream.http2
+
+    original = settings.http2_cleartext
+    settings.http2_cleartext = False
+    try:
+        asyncio.run(scenario())
+    finally:
+        settings.http2_cleartext = original
+    print("✓ Only h2c upstreams fall back")
+
+@h2c
+def test_fallback_does_not_resend_unsafe_requests():
+    """Test a non-idempotent POST switches to HTTP/1.1 but is not sent again."""
+    sent = []
+
+    async def scenario():
+        upstream = make_upstream("test-h2-post", rejecting)
+        upstream._build_client = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda r: sent.append(r) or httpx.Response(200))
+        )
+        try:
+            await upstream.request("POST", "http://kratos.test/admin/identities", json={})
+            assert False, "a POST without an idempotency key must not be resent"
+        except httpx.RemoteProtocolError:
+            pass
+        assert not upstream.http2 and sent == []
+
+        response = await upstream.request("POST", "http://kratos.test/admin/identities", json={})
+        assert response.status_code == 200 and len(sent) == 1
+
+    asyncio.run(scenario())
+    print("✓ Fallback doesn't resend non-idempotent requests")
+
+if __name__ == "__main__":
+    test_opt_in_by_name()
+    test_missing_h2_uses_http1()
+    test_concurrent_streams_capped()
+    test_rejected_preface_falls_back()
+    test_fallback_needs_cleartext()
+    test_fallback_does_not_resend_unsafe_requests()
+    print("\n✅ HTTP/2 tests passed!")
@@ -0,0 +1,109 @@
+import sys
+import os
+import asyncio
+import tempfile
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import src.core.http_cache as http_cache_module
+from src.api.middleware.http_cache import HTTPCacheMiddleware
+from src.core.http_cache import cache_response, etag_matches, response_cache
+from src.core.shared_cache import SharedCache
+from src.main import app
+
+http_cache_module.shared_cache = SharedCache(os.path.join(tempfile.mkdtemp(), "cache.db"))
+
+calls = {"count": 0}
+cache_app = FastAPI()
+cache_app.add_middleware(HTTPCacheMiddleware)
+
+@cache_app.get("/items/{item_id}")
+@cache_response(ttl=60.0, tags=("item:{item_id}",))
+async def get_item(item_id: str):
+    calls["count"] += 1
+    return {"id": item_id, "version": calls["count"]}
+
+@cache_app.get("/lookup")
+@cache_response(ttl=60.0, tags=("item:{item_id}",))
+async def lookup(item_id: str = None):
+    calls["count"] += 1
+    return {"id": item_id, "version": calls["count"]}
+
+@cache_app.get("/validated")
+@cache_response(cache_control="no-cache")
+async def validated():
+    calls["count"] += 1
+    return {"static": True}
+
+@cache_app.get("/plain")
+async def plain():
+    return {"plain": True}
+
+client = TestClient(cache_app)
+
+def test_etag_and_304():
+    """Test strong ETags are set and If-None-Match yields 304."""
+    first = client.get("/validated")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and etag.startswith('"')
+    assert first.headers["cache-control"] == "no-cache"
+
+    second = client.get("/validated", headers={"If-None-Match": etag})
+    assert second.status_code == 304 and second.content == b""
+    assert client.get("/validated", headers={"If-None-Match": '"other"'}).status_code == 200
+    assert "etag" not in client.get("/plain").headers
+    print("✓ ETags and 304s work")
+
+def test_server_side_cache_and_invalidation():
+    """Test cached responses are reused until their tag is invalidated."""
+    calls["count"] = 0
+    first = client.get("/items/a")
+    second = client.get("/items/a")
+    assert first.json() == second.json() and calls["count"] == 1
+    assert (first.headers["x-cache"], second.headers["x-cache"]) == ("MISS", "HIT")
+    client.get("/items/b")
+
+    asyncio.run(response_cache.invalidate("item:a"))
+    third = client.get("/items/a")
+    assert third.json()["version"] == 3 and third.headers["x-cache"] == "MISS"
+    assert client.get("/items/b").headers["x-cache"] == "HIT"
+    print("✓ Server-side cache honors tag invalidation")
+
+def test_query_param_tags():
+    """Test tags fill from query params, and responses missing one aren't cached."""
+    calls["count"] = 0
+    assert client.get("/lookup?item_id=c").headers["x-cache"] == "MISS"
+    assert client.get("/lookup?item_id=c").headers["x-cache"] == "HIT"
+    asyncio.run(response_cache.invalidate("item:c"))
+    assert client.get("/lookup?item_id=c").headers["x-cache"] == "MISS"
+
+    untagged = [client.get("/lookup") for _ in range(2)]
+    assert all("x-cache" not in response.headers for response in untagged)
+    assert untagged[1].json()["version"] == 4
+    print("✓ Query params fill tags; untaggable responses aren't cached")
+
+def test_etag_matching():
+    """Test If-None-Match list and weak forms."""
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"x"')
+    assert not etag_matches(None, '"x"')
+    print("✓ If-None-Match matching")
+
+def test_app_routes_are_cached():
+    """Test the application's health route carries validators."""
+    app_client = TestClient(app)
+    response = app_client.get("/health/")
+    assert response.status_code == 200 and "etag" in response.headers
+    assert app_client.get("/health/", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    print("✓ Application routes carry ETags")
+
+if __name__ == "__main__":
+    test_etag_and_304()
+    test_server_side_cache_and_invalidation()
+    test_query_param_tags()
+    test_etag_matching()
+    test_app_routes_are_cached()
+    print("\n✅ HTTP cache tests passed!")
@@ -0,0 +1,147 @@
+import sys
+import os
+import asyncio
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from src.config import settings
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.shared_cache import shared_cache
+from src.services.hydra_service import HydraService
+
+CLIENTS = [{"client_id": f"client-{i}", "client_name": f"App {i}", "client_secret": f"secret-{i}"} for i in range(5)]
+
+def hydra_handler(calls):
+    clients = [dict(client) for client in CLIENTS]
+
+    def handler(request):
+        calls.append((request.method, request.url.path, dict(request.url.params)))
+        path = request.url.path
+        if request.method == "GET" and path == "/admin/clients":
+            size = int(request.url.params["page_size"])
+            start = int(request.url.params.get("page_token") or 0)
+            headers = {}
+            if start + size < len(clients):
+                headers["Link"] = (
+                    f'</admin/clients?page_size={size}&page_token={start + size}>; rel="next", '
+                    f'</admin/clients?page_size={size}&page_token=0>; rel="first"'
+                )
+            return httpx.Response(200, json=clients[start:start + size], headers=headers)
+        if request.method == "POST" and path == "/admin/clients":
+            clients.append({"client_id": "new-client", "client_name": "New", "client_secret": "shh"})
+            return httpx.Response(201, json=clients[-1])
+        if request.method == "GET" and path.startswith("/admin/clients/"):
+            client_id = path.rsplit("/", 1)[1]
+            for client in clients:
+                if client["client_id"] == client_id:
+                    return httpx.Response(200, json=client)
+            return httpx.Response(404, json={"error": "Unable to locate the resource"})
+        if request.method == "DELETE":
+            client_id = path.rsplit("/", 1)[1]
+            clients[:] = [client for client in clients if client["client_id"] != client_id]
+            return httpx.Response(204)
+        return httpx.Response(500)
+    return handler
+
+async def clear_registry():
+    await shared_cache.delete_prefix("oauth_client")
+    await shared_cache.delete_prefix("oauth_clients")
+
+async def make_service(calls):
+    await clear_registry()
+    service = HydraService()
+    # Independent of the shared "hydra" breaker other tests may have tripped
+    service.http.breaker = CircuitBreaker("hydra-clients-test")
+    service.http._client = httpx.AsyncClient(transport=httpx.MockTransport(hydra_handler(calls)))
+    service.http._client_loop = asyncio.get_running_loop()
+    return service
+
+def test_list_follows_link_pagination():
+    """Test listing follows Link headers and strips secrets."""
+    async def scenario():
+        calls = []
+        service = await make_service(calls)
+        result = await service.list_oauth_clients()
+        assert result["success"] and result["count"] == 5
+        assert all("client_secret" not in client for client in result["clients"])
+
+        # Default page size fetches everything in one request
+        assert len(calls) == 1
+
+        await clear_registry()
+        original = settings.hydra_page_size
+        settings.hydra_page_size = 2
+        try:
+            calls.clear()
+            result = await service.list_oauth_clients()
+            assert [c["client_id"] for c in result["clients"]] == [c["client_id"] for c in CLIENTS]
+            assert [params.get("page_token") for _, _, params in calls] == [None, "2", "4"]
+        finally:
+            settings.hydra_page_size = original
+
+        page = await service.list_oauth_clients(page_size=2, page_token="2")
+        assert page["count"] == 2 and page["next_page_token"] == "4"
+        await service.http._client.aclose()
+
+    asyncio.run(scenario())
+    print("✓ Client listing follows Link pagination")
+
+def test_registry_cache():
+    """Test clients are served from the registry until deleted."""
+    async def scenario():
+        calls = []
+        service = await make_service(calls)
+        await service.list_oauth_clients()
+        calls.clear()
+
+        # Listing and lookups come from the registry
+        assert (await service.list_oauth_clients())["cached"]
+        result = await service.get_oauth_client("client-3")
+        assert result["client"]["client_name"] == "App 3" and "client_secret" not in result["client"]
+        assert calls == []
+
+        # The secret is returned on create but never cached
+        created = await service.create_oauth_client("New", ["http://localhost/cb"])
+        assert created["client"]["client_secret"] == "shh"
+        assert "client_secret" not in (await service.get_oauth_client("new-client"))["client"]
+        assert len((await service.list_oauth_clients())["clients"]) == 6
+
+        calls.clear()
+        assert (await service.delete_oauth_client("client-3"))["success"]
+        assert "client-3" not in [c["client_id"] for c in (await service.list_oauth_clients())["clients"]]
+        assert not (await service.get_oauth_client("client-3"))["success"]
+        assert [(method, path) for method, path, _ in calls] == [
+            ("DELETE", "/admin/clients/client-3"), ("GET", "/admin/clients"), ("GET", "/admin/clients/client-3")
+        ]
+        await service.http._client.aclose()
+
+    asyncio.run(scenario())
+    print("✓ Client registry caches lookups without secrets")
+
+def test_registry_shared_between_workers():
+    """Test a delete through one service instance is seen by another's registry."""
+    async def scenario():
+        calls = []
+        first = await make_service(calls)
+        second = HydraService()
+        second.http = first.http
+        assert (await first.get_oauth_client("client-1"))["success"]
+        assert (await first.list_oauth_clients())["count"] == 5
+
+        assert (await second.delete_oauth_client("client-1"))["success"]
+        calls.clear()
+        assert not (await first.get_oauth_client("client-1"))["success"]
+        assert (await first.list_oauth_clients())["count"] == 4
+        assert [method for method, _, _ in calls] == ["GET", "GET"]
+        await first.http._client.aclose()
+
+    asyncio.run(scenario())
+    print("✓ Client registry is shared between workers")
+
+if __name__ == "__main__":
+    test_list_follows_link_pagination()
+    test_registry_cache()
+    test_registry_shared_between_workers()
+    print("\n✅ Hydra client tests passed!")
@@ -0,0 +1,125 @@
+import sys
+import os
+import asyncio
+import uuid
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from src.core.batch_loader import BatchLoader
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.serialization import dumps
+from src.core.shared_cache import shared_cache
+from src.services.kratos_service import KratosService
+
+def identity(identity_id):
+    return {"id": identity_id, "traits": {"email": f"{identity_id}@example.com"}, "metadata_admin": {}}
+
+def kratos_with(known, ignore_ids=False):
+    """A KratosService against a fake admin API; returns (service, request log)."""
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        path = request.url.path
+        if path == "/admin/identities":
+            ids = request.url.params.get_list("ids")
+            listed = known if ignore_ids or not ids else [i for i in ids if i in known]
+            return httpx.Response(200, content=dumps([identity(i) for i in listed]))
+        identity_id = path.rsplit("/", 1)[-1]
+        if identity_id in known:
+            return httpx.Response(200, content=dumps(identity(identity_id)))
+        return httpx.Response(404, text="not found")
+
+    service = KratosService()
+    service.http.breaker = CircuitBreaker(f"kratos-test-{uuid.uuid4().hex}")
+    service.http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return service, requests
+
+def run(service, make):
+    async def scenario():
+        service.http._client_loop = asyncio.get_running_loop()
+        return await make()
+    return asyncio.run(scenario())
+
+def test_concurrent_lookups_share_one_call():
+    """Test concurrent cache misses (including repeats) become one list call."""
+    ids = [uuid.uuid4().hex for _ in range(20)]
+    service, requests = kratos_with(ids)
+    results = run(service, lambda: asyncio.gather(*(service.get_identity(i) for i in ids + ids[:5])))
+
+    assert all(result["success"] for result in results)
+    assert [result["identity"]["id"] for result in results] == ids + ids[:5]
+    assert len(requests) == 1 and requests[0].url.path == "/admin/identities"
+    assert sorted(requests[0].url.params.get_list("ids")) == sorted(ids)
+    print("✓ Concurrent lookups are coalesced and deduplicated")
+
+def test_works_with_cache():
+    """Test batched results fill the cache and cached IDs skip the loader."""
+    ids = [uuid.uuid4().hex for _ in range(3)]
+    service, requests = kratos_with(ids)
+    run(service, lambda: asyncio.gather(*(service.get_identity(i) for i in ids)))
+    run(service, lambda: asyncio.gather(*(service.get_identity(i) for i in ids)))
+    assert len(requests) == 1
+
+    result = run(service, lambda: service.get_identity(ids[0], use_cache=False))
+    assert result["success"] and len(requests) == 2 and requests[1].url.path.endswith(ids[0])
+
+    for identity_id in ids:
+        run(service, lambda: shared_cache.delete("identity", identity_id))
+    print("✓ Loader fills and respects the identity cache")
+
+def test_missing_ids_fall_back_to_single_lookups():
+    """Test IDs the list call doesn't return get their own result."""
+    found, missing = uuid.uuid4().hex, uuid.uuid4().hex
+    service, requests = kratos_with([found])
+    results = run(service, lambda: asyncio.gather(service.get_identity(found), service.get_identity(missing)))
+    assert results[0]["success"]
+    assert not results[1]["success"] and results[1]["status_code"] == 404
+    assert [request.url.path for request in requests] == ["/admin/identities", f"/admin/identities/{missing}"]
+
+    # A Kratos that ignores ?ids= returns a page of other identities
+    wanted = [uuid.uuid4().hex, uuid.uuid4().hex]
+    service, requests = kratos_with(wanted + [uuid.uuid4().hex], ignore_ids=True)
+    results = run(service, lambda: asyncio.gather(*(service.get_identity(i) for i in wanted)))
+    assert [result["identity"]["id"] for result in results] == wanted
+    assert len(requests) == 1
+
+    for identity_id in [found] + wanted:
+        run(service, lambda: shared_cache.delete("identity", identity_id))
+    print("✓ Unlisted IDs fall back to single lookups")
+
+def test_batch_size_and_cancellation():
+    """Test full batches go out at once and a cancelled caller doesn't cancel the batch."""
+    calls = []
+
+    async def fetch(keys):
+        calls.append(keys)
+        await asyncio.sleep(0.01)
+        return {key: key * 2 for key in keys}
+
+    async def scenario():
+        loader = BatchLoader(fetch, max_batch=3, window=10.0)
+        values = await asyncio.wait_for(asyncio.gather(*(loader.load(i) for i in range(6))), 1.0)
+        assert values == [0, 2, 4, 6, 8, 10]
+
+        loader = BatchLoader(fetch, max_batch=10)
+        impatient = asyncio.ensure_future(loader.load(7))
+        patient = asyncio.ensure_future(loader.load(7))
+        await asyncio.sleep(0.001)
+        impatient.cancel()
+        assert await patient == 14
+        return loader.snapshot()
+
+    snapshot = asyncio.run(scenario())
+    assert calls == [[0, 1, 2], [3, 4, 5], [7]]
+    assert snapshot["batches"] == 1 and snapshot["pending"] == 0
+    print("✓ Batches split at max_batch and survive cancelled callers")
+
+if __name__ == "__main__":
+    test_concurrent_lookups_share_one_call()
+    test_works_with_cache()
+    test_missing_ids_fall_back_to_single_lookups()
+    test_batch_size_and_cancellation()
+    print("\n✅ Identity loader tests passed!")
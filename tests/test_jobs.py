@@ -0,0 +1,127 @@
+import sys
+import os
+import asyncio
+import tempfile
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import settings
+from src.models.job import JobStatus
+from src.services.job_service import JobService, JobStore
+
+settings.jobs_poll_interval = 0.05
+
+def make_service(path):
+    service = JobService()
+    service.store = JobStore(path)
+    return service
+
+async def wait_for_status(service, job_id, statuses, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        job = (await service.get_job(job_id))["job"]
+        if job.status in statuses or asyncio.get_running_loop().time() > deadline:
+            return job
+        await asyncio.sleep(0.02)
+
+async def counting_job(ctx):
+    start = (ctx.checkpoint or {"next": 0})["next"]
+    for i in range(start, ctx.params["steps"]):
+        await asyncio.sleep(ctx.params.get("delay", 0))
+        await ctx.save_checkpoint({"next": i + 1}, done=i + 1, total=ctx.params["steps"])
+    return {"resumed_from": start, "steps": ctx.params["steps"]}
+
+def test_submit_and_result():
+    """Test a job runs to completion and exposes its result."""
+    async def scenario(path):
+        service = make_service(path)
+        service.register("count", counting_job)
+        await service.start()
+        try:
+            submitted = await service.submit("user-1", "count", {"steps": 3})
+            assert submitted["success"]
+            job = await wait_for_status(service, submitted["job"].id, {JobStatus.SUCCEEDED})
+            assert job.status == JobStatus.SUCCEEDED
+            assert job.progress_done == 3 and job.progress_total == 3
+            result = await service.get_result(job.id)
+            assert result["result"]["steps"] == 3
+        finally:
+            await service.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(os.path.join(tmp, "jobs.db")))
+    print("✓ Submit and result works")
+
+def test_unknown_job_type():
+    """Test unknown job types are rejected."""
+    async def scenario(path):
+        service = make_service(path)
+        result = await service.submit("user-1", "does_not_exist")
+        assert not result["success"]
+        assert result["status_code"] == 400
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(os.path.join(tmp, "jobs.db")))
+    print("✓ Unknown job types are rejected")
+
+def test_cancel_running_job():
+    """Test a running job can be cancelled."""
+    async def scenario(path):
+        service = make_service(path)
+        service.register("count", counting_job)
+        await service.start()
+        try:
+            submitted = await service.submit("user-1", "count", {"steps": 100, "delay": 0.05})
+            job_id = submitted["job"].id
+            await wait_for_status(service, job_id, {JobStatus.RUNNING})
+            assert (await service.cancel_job(job_id))["success"]
+            job = await wait_for_status(service, job_id, {JobStatus.CANCELLED})
+            assert job.status == JobStatus.CANCELLED
+            assert (await service.get_result(job_id))["status_code"] == 409
+        finally:
+            await service.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(os.path.join(tmp, "jobs.db")))
+    print("✓ Cancelling a running job works")
+
+def test_resume_after_restart():
+    """Test a job interrupted by shutdown resumes from its checkpoint."""
+    async def first_run(path):
+        service = make_service(path)
+        service.register("count", counting_job)
+        await service.start()
+        submitted = await service.submit("user-1", "count", {"steps": 40, "delay": 0.02})
+        job_id = submitted["job"].id
+        while (await service.get_job(job_id))["job"].progress_done < 5:
+            await asyncio.sleep(0.02)
+        await service.stop()
+        job = (await make_service(path).get_job(job_id))["job"]
+        assert job.status == JobStatus.QUEUED
+        return job_id, job.progress_done
+
+    async def second_run(path, job_id):
+        service = make_service(path)
+        service.register("count", counting_job)
+        await service.start()
+        try:
+            job = await wait_for_status(service, job_id, {JobStatus.SUCCEEDED})
+            assert job.status == JobStatus.SUCCEEDED
+            return (await service.get_result(job_id))["result"]
+        finally:
+            await service.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jobs.db")
+        job_id, done = asyncio.run(first_run(path))
+        result = asyncio.run(second_run(path, job_id))
+        assert result["resumed_from"] >= done > 0
+    print("✓ Jobs resume from their checkpoint after restart")
+
+if __name__ == "__main__":
+    test_submit_and_result()
+    test_unknown_job_type()
+    test_cancel_running_job()
+    test_resume_after_restart()
+    print("\n✅ Job tests passed!")
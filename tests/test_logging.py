@@ -0,0 +1,149 @@
+import sys
+import os
+import io
+import json
+import logging
+import threading
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api.middleware.request_context import RequestContextMiddleware
+from src.core.logs import DebugSampler, LogPipeline, bind, log_context
+
+logger = logging.getLogger("tests.logging")
+
+class Expensive:
+    formatted = 0
+
+    def __str__(self):
+        Expensive.formatted += 1
+        return "expensive"
+
+def with_pipeline(test):
+    def run():
+        stream = io.StringIO()
+        pipeline = LogPipeline()
+        pipeline.configure(stream)
+        try:
+            test(pipeline, stream)
+        finally:
+            pipeline.shutdown()
+    run.__name__ = test.__name__
+    run.__doc__ = test.__doc__
+    return run
+
+def lines(pipeline, stream):
+    pipeline.listener.stop()
+    pipeline.listener.start()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+@with_pipeline
+def test_records_are_written_off_thread(pipeline, stream):
+    """Test records are formatted and written by the listener thread with correlation IDs."""
+    writers = []
+
+    class ThreadRecorder(logging.Handler):
+        def emit(self, record):
+            writers.append(threading.current_thread().name)
+
+    pipeline.listener.handlers += (ThreadRecorder(),)
+    with log_context(request_id="req-1", tool="search_notion"):
+        bind(user_id="user-7")
+        logger.warning("Slow call to %s", "notion", extra={"elapsed_ms": 812})
+    logger.warning("outside")
+
+    first, second = lines(pipeline, stream)
+    assert first["message"] == "Slow call to notion" and first["level"] == "WARNING"
+    assert first["request_id"] == "req-1" and first["tool"] == "search_notion" and first["user_id"] == "user-7"
+    assert first["elapsed_ms"] == 812
+    assert "request_id" not in second
+    assert writers and threading.main_thread().name not in writers
+    print("✓ Records are written off the calling thread with correlation IDs")
+
+@with_pipeline
+def test_disabled_levels_are_free(pipeline, stream):
+    """Test disabled levels never format their arguments."""
+    Expensive.formatted = 0
+    logging.getLogger().setLevel(logging.INFO)
+    logger.debug("value %s", Expensive())
+    assert Expensive.formatted == 0
+    assert lines(pipeline, stream) == []
+    print("✓ Disabled levels cost nothing")
+
+def test_debug_sampling():
+    """Test debug records are sampled per request and other levels always pass."""
+    sampler = DebugSampler(0.5)
+    debug = logging.LogRecord("x", logging.DEBUG, "", 0, "msg", None, None)
+    info = logging.LogRecord("x", logging.INFO, "", 0, "msg", None, None)
+
+    kept = 0
+    for index in range(400):
+        with log_context(request_id=f"request-{index}"):
+            decisions = {sampler.filter(debug) for _ in range(5)}
+            assert len(decisions) == 1
+            kept += decisions.pop()
+            assert sampler.filter(info)
+    assert 120 < kept < 280
+    assert not any(DebugSampler(0.0).filter(debug) for _ in range(50))
+    print("✓ Debug records are sampled per request")
+
+@with_pipeline
+def test_args_rendered_when_logged(pipeline, stream):
+    """Test a message shows its args as they were at the logging call."""
+    pending = ["page-1"]
+    logger.warning("Pending pages: %s", pending)
+    pending.append("page-2")
+
+    assert lines(pipeline, stream)[0]["message"] == "Pending pages: ['page-1']"
+    print("✓ Messages are rendered with the args at call time")
+
+@with_pipeline
+def test_exceptions_and_unserializable_extras(pipeline, stream):
+    """Test tracebacks are captured and odd extras don't break the writer."""
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Handler failed", extra={"payload": object()})
+
+    entry = lines(pipeline, stream)[0]
+    assert "ValueError: boom" in entry["exception"]
+    assert entry["payload"].startswith("<object")
+    print("✓ Exceptions and unserializable extras are logged")
+
+@with_pipeline
+def test_request_ids(pipeline, stream):
+    """Test requests get an ID header and their log lines carry it."""
+    logging.getLogger().setLevel(logging.INFO)
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/users/{user_id}/thing")
+    async def thing(user_id: str):
+        logger.info("handling")
+        return {"ok": True}
+
+    client = TestClient(app)
+    response = client.get("/users/u-1/thing", headers={"X-Request-Id": "from-proxy"})
+    assert response.headers["x-request-id"] == "from-proxy"
+    generated = client.get("/users/u-2/thing").headers["x-request-id"]
+    assert len(generated) == 16
+
+    entries = lines(pipeline, stream)
+    handled = [entry for entry in entries if entry["message"] == "handling"]
+    assert [(entry["request_id"], entry["user_id"]) for entry in handled] == [("from-proxy", "u-1"), (generated, "u-2")]
+    access = [entry for entry in entries if entry["logger"] == "src.api.access"]
+    assert access[0]["status"] == 200 and access[0]["route"] == "/users/{user_id}/thing"
+    assert access[0]["request_id"] == "from-proxy"
+    print("✓ Requests carry IDs through their log lines")
+
+if __name__ == "__main__":
+    test_records_are_written_off_thread()
+    test_disabled_levels_are_free()
+    test_debug_sampling()
+    test_args_rendered_when_logged()
+    test_exceptions_and_unserializable_extras()
+    test_request_ids()
+    print("\n✅ Logging tests passed!")
@@ -0,0 +1,102 @@
+import sys
+import os
+import asyncio
+import logging
+import time
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api.middleware.rate_limit import AdmissionControlMiddleware
+from src.config import settings
+from src.core.loop_monitor import LoopMonitor, loop_monitor, low_priority
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+def blocking_parse():
+    time.sleep(0.3)
+
+def test_overload_hysteresis():
+    """Test shedding starts above the threshold and stops after calm samples."""
+    monitor = LoopMonitor()
+    monitor.record(0.01)
+    assert not monitor.overloaded
+    monitor.record(settings.load_shed_lag + 0.01)
+    assert monitor.overloaded
+    for _ in range(LoopMonitor.RECOVERY_SAMPLES - 1):
+        monitor.record(0.0)
+    assert monitor.overloaded
+    monitor.record(settings.load_shed_lag * 0.75)
+    for _ in range(LoopMonitor.RECOVERY_SAMPLES):
+        monitor.record(0.0)
+    assert not monitor.overloaded
+
+    snapshot = monitor.snapshot()
+    assert snapshot["lag_ms"]["max"] >= settings.load_shed_lag * 1000
+    assert snapshot["lag_ms"]["p50"] == 0.0
+    print("✓ Overload detection has hysteresis")
+
+def test_blocking_call_detected():
+    """Test lag is measured and the blocking call's stack is logged."""
+    handler = ListHandler()
+    logger = logging.getLogger("src.core.loop_monitor")
+    logger.addHandler(handler)
+
+    async def scenario():
+        monitor = LoopMonitor()
+        monitor.start()
+        await asyncio.sleep(0.15)
+        blocking_parse()
+        await asyncio.sleep(0.15)
+        await monitor.stop()
+        return monitor
+
+    try:
+        monitor = asyncio.run(scenario())
+    finally:
+        logger.removeHandler(handler)
+
+    assert monitor.snapshot()["lag_ms"]["max"] > 200
+    assert monitor.slow_callbacks == 1
+    messages = [record.getMessage() for record in handler.records]
+    assert any("blocked" in message and "blocking_parse" in message for message in messages)
+    print("✓ Blocking calls are logged with their stack")
+
+def test_low_priority_routes_shed():
+    """Test low-priority routes get fast 503s while overloaded."""
+    shed_app = FastAPI()
+    shed_app.add_middleware(AdmissionControlMiddleware)
+
+    @shed_app.get("/export")
+    @low_priority
+    async def export():
+        return {"ok": True}
+
+    @shed_app.get("/interactive")
+    async def interactive():
+        return {"ok": True}
+
+    client = TestClient(shed_app)
+    loop_monitor.overloaded = True
+    try:
+        response = client.get("/export")
+        assert response.status_code == 503 and "retry-after" in response.headers
+        assert client.get("/interactive").status_code == 200
+    finally:
+        loop_monitor.overloaded = False
+    assert client.get("/export").status_code == 200
+    print("✓ Low-priority routes are shed under load")
+
+if __name__ == "__main__":
+    test_overload_hysteresis()
+    test_blocking_call_detected()
+    test_low_priority_routes_shed()
+    print("\n✅ Loop monitor tests passed!")
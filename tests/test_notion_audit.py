@@ -0,0 +1,194 @@
+import sys
+import os
+import asyncio
+import uuid
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import SecretStr
+from src.api.routers import admin
+from src.config import settings
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.serialization import dumps, loads
+from src.services.audit_service import notion_audit_service
+from src.services.job_service import job_service
+from src.services.kratos_service import kratos_service
+from src.services.user_notion_service import user_notion_service
+
+# Key -> status Notion answers /users/me with
+KEYS = {"secret_good": 200, "secret_revoked": 401, "secret_flaky": 503}
+
+def identity(identity_id, api_key=None, enabled=True):
+    traits = {"email": f"{identity_id}@example.com"}
+    if api_key is not None:
+        traits["notion_config"] = {"api_key": api_key, "enabled": enabled}
+    return {"id": identity_id, "schema_id": "default", "traits": traits}
+
+def fleet():
+    return [
+        identity("alice", "secret_good"),
+        identity("bob", "secret_good"),
+        identity("carol", "secret_revoked"),
+        identity("dave"),
+        identity("erin", "secret_revoked", enabled=False),
+        identity("frank", "secret_flaky"),
+        identity("grace", "secret_good"),
+    ]
+
+def install(identities, page_size=2):
+    """Point the Kratos and Notion singletons at fakes; returns the call log."""
+    calls = {"kratos": [], "notion": []}
+    by_id = {item["id"]: item for item in identities}
+
+    def kratos(request):
+        calls["kratos"].append(request)
+        path = request.url.path
+        if path == "/admin/identities":
+            start = int(request.url.params.get("page_token") or 0)
+            headers = {}
+            if start + page_size < len(identities):
+                headers["link"] = f'</admin/identities?page_size={page_size}&page_token={start + page_size}>; rel="next"'
+            return httpx.Response(200, content=dumps(identities[start:start + page_size]), headers=headers)
+        identity_id = path.rsplit("/", 1)[-1]
+        if request.method == "PUT":
+            by_id[identity_id] = {**by_id[identity_id], **loads(request.content)}
+        return httpx.Response(200, content=dumps(by_id[identity_id]))
+
+    async def notion(request):
+        calls["notion"].append(request)
+        await asyncio.sleep(0.01)
+        status = KEYS[request.headers["authorization"].split(" ", 1)[1]]
+        body = {"id": "bot", "bot": {"workspace_name": "Acme"}} if status == 200 else {"message": "nope"}
+        return httpx.Response(status, content=dumps(body))
+
+    for service, handler in ((kratos_service, kratos), (user_notion_service, notion)):
+        service.http.breaker = CircuitBreaker(f"audit-test-{uuid.uuid4().hex}")
+        service.http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return calls, by_id
+
+async def collect(**kwargs):
+    for service in (kratos_service, user_notion_service):
+        service.http._client_loop = asyncio.get_running_loop()
+    return [row async for row in notion_audit_service.audit(**kwargs)]
+
+def test_audit_checks_each_key_once():
+    """Test every identity is reported and each distinct key is checked once."""
+    calls, _ = install(fleet())
+    rows = asyncio.run(collect())
+    summary = rows[-1]["summary"]
+    statuses = {row["identity_id"]: row["status"] for row in rows[:-1]}
+
+    assert statuses == {
+        "alice": "connected", "bob": "connected", "grace": "connected",
+        "carol": "broken", "erin": "disabled", "frank": "unverified"
+    }
+    # 503s are retried by the upstream client; every other key is called exactly once
+    keys = [request.headers["authorization"] for request in calls["notion"]]
+    assert keys.count("Bearer secret_good") == 1 and keys.count("Bearer secret_revoked") == 1
+    assert summary["identities"] == 7 and summary["unconfigured"] == 1 and summary["keys"] == 3
+    assert summary["broken"] == 1 and summary["disabled_now"] == 0
+    assert all(request.method == "GET" for request in calls["kratos"])
+    assert all("secret" not in dumps(row).decode() for row in rows)
+    print("✓ Audit reports every identity and checks each key once")
+
+def test_audit_disables_broken_configs():
+    """Test disable_broken turns off only configs Notion rejected."""
+    calls, by_id = install(fleet())
+    rows = asyncio.run(collect(disable_broken=True))
+
+    puts = [request for request in calls["kratos"] if request.method == "PUT"]
+    assert [request.url.path for request in puts] == ["/admin/identities/carol"]
+    assert by_id["carol"]["traits"]["notion_config"]["enabled"] is False
+    assert by_id["frank"]["traits"]["notion_config"]["enabled"] is True
+    assert rows[-1]["summary"]["disabled_now"] == 1
+    print("✓ Broken configs are disabled, transient failures are not")
+
+def test_audit_keeps_rotated_keys():
+    """Test a key rotated after the listing is neither disabled nor overwritten."""
+    calls, by_id = install(fleet())
+
+    def rotate(request):
+        # Carol connects a working key while her old one is being checked
+        if request.headers["authorization"] == "Bearer secret_revoked":
+            by_id["carol"] = identity("carol", "secret_good")
+        return request
+
+    notion = user_notion_service.http._client._transport.handler
+    user_notion_service.http._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: notion(rotate(request)))
+    )
+    rows = asyncio.run(collect(disable_broken=True))
+
+    assert not [request for request in calls["kratos"] if request.method == "PUT"]
+    assert by_id["carol"]["traits"]["notion_config"] == {"api_key": "secret_good", "enabled": True}
+    assert rows[-1]["summary"]["disabled_now"] == 0
+    print("✓ Keys rotated during the audit are left alone")
+
+def test_audit_job_is_admin_only():
+    """Test the notion_audit job can't be submitted through the public jobs API."""
+    result = asyncio.run(job_service.submit("someone", "notion_audit", {"disable_broken": True}))
+    assert not result["success"] and result["status_code"] == 403
+    print("✓ Audit jobs are admin-only")
+
+def test_audit_route_gated_by_admin_setting():
+    """Test the audit route needs admin_enabled and the admin token, not profiling."""
+    class StubAudit:
+        async def audit(self, disable_broken=False):
+            yield {"summary": {"keys": 0}}
+
+    admin_app = FastAPI()
+    admin_app.include_router(admin.router)
+    original = (settings.admin_enabled, settings.profiling_enabled, settings.admin_token, admin.notion_audit_service)
+    settings.admin_token, admin.notion_audit_service = SecretStr("admin-secret"), StubAudit()
+    try:
+        client = TestClient(admin_app)
+        headers = {"X-Admin-Token": "admin-secret"}
+        settings.admin_enabled, settings.profiling_enabled = False, True
+        assert client.post("/admin/notion/audit", headers=headers).status_code == 404
+
+        settings.admin_enabled, settings.profiling_enabled = True, False
+        assert client.post("/admin/notion/audit").status_code == 403
+        assert client.post("/admin/notion/audit", headers={"X-Admin-Token": "wrong"}).status_code == 403
+        assert client.get("/admin/profiles", headers=headers).status_code == 404
+        response = client.post("/admin/notion/audit", headers=headers)
+        assert response.status_code == 200 and loads(response.content) == {"summary": {"keys": 0}}
+    finally:
+        settings.admin_enabled, settings.profiling_enabled, settings.admin_token, admin.notion_audit_service = original
+    print("✓ The audit route has its own admin gate")
+
+def test_background_audit_needs_job_queue():
+    """Test a background audit is refused when jobs are off and submit errors are surfaced."""
+    class StubJobs:
+        async def submit(self, user_id, job_type, params=None, admin=False):
+            return {"success": False, "error": "Job store unavailable", "status_code": 503}
+
+    admin_app = FastAPI()
+    admin_app.include_router(admin.router)
+    original = (settings.admin_enabled, settings.admin_token, settings.jobs_enabled, admin.job_service)
+    settings.admin_enabled, settings.admin_token = True, SecretStr("admin-secret")
+    try:
+        client = TestClient(admin_app)
+        headers = {"X-Admin-Token": "admin-secret"}
+        settings.jobs_enabled = False
+        response = client.post("/admin/notion/audit", params={"background": True}, headers=headers)
+        assert response.status_code == 503
+
+        settings.jobs_enabled, admin.job_service = True, StubJobs()
+        response = client.post("/admin/notion/audit", params={"background": True}, headers=headers)
+        assert response.status_code == 503 and response.json()["detail"] == "Job store unavailable"
+    finally:
+        settings.admin_enabled, settings.admin_token, settings.jobs_enabled, admin.job_service = original
+    print("✓ Background audits are refused without a job queue")
+
+if __name__ == "__main__":
+    test_audit_checks_each_key_once()
+    test_audit_disables_broken_configs()
+    test_audit_keeps_rotated_keys()
+    test_audit_job_is_admin_only()
+    test_audit_route_gated_by_admin_setting()
+    test_background_audit_needs_job_queue()
+    print("\n✅ Notion audit tests passed!")
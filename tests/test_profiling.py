@@ -0,0 +1,149 @@
+import sys
+import os
+import asyncio
+import time
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import SecretStr
+from src.api.middleware.profiling import ProfilingMiddleware
+from src.api.routers import admin
+from src.config import settings
+from src.core.profiling import profile_for, profile_store
+from src.mcp.server import MCPServer
+
+ADMIN = {"X-Admin-Token": "admin-secret"}
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+profiling_app = FastAPI()
+profiling_app.add_middleware(ProfilingMiddleware)
+profiling_app.include_router(admin.router)
+
+@profiling_app.get("/notion/busy")
+async def busy():
+    busy_loop(0.1)
+    return {"done": True}
+
+def with_diagnostics(enabled=True):
+    def decorator(test):
+        def run():
+            original = (settings.profiling_enabled, settings.admin_token)
+            settings.profiling_enabled, settings.admin_token = enabled, SecretStr("admin-secret")
+            try:
+                test()
+            finally:
+                settings.profiling_enabled, settings.admin_token = original
+        run.__name__ = test.__name__
+        run.__doc__ = test.__doc__
+        return run
+    return decorator
+
+def test_sampler_sees_busy_code():
+    """Test the sampler attributes loop time to the code running on it."""
+    async def scenario():
+        async def work():
+            await asyncio.sleep(0.01)
+            busy_loop(0.2)
+        worker = asyncio.create_task(work())
+        profiler = await profile_for(0.3, interval=0.002)
+        await worker
+        return profiler
+
+    profiler = asyncio.run(scenario())
+    assert profiler.samples > 20
+    assert "busy_loop" in profiler.collapsed()
+    assert any("busy_loop" in item["frame"] for item in profiler.summary()["top_self"][:3])
+    print("✓ Sampler captures busy code")
+
+@with_diagnostics(enabled=False)
+def test_disabled_endpoints_hidden():
+    """Test diagnostics 404 when disabled and profiling headers are ignored."""
+    client = TestClient(profiling_app)
+    assert client.get("/admin/profiles", headers=ADMIN).status_code == 404
+    response = client.get("/notion/busy", headers={"X-Profile": "1", **ADMIN})
+    assert response.status_code == 200 and "x-profile-id" not in response.headers
+    print("✓ Diagnostics are hidden when disabled")
+
+@with_diagnostics()
+def test_admin_profile_endpoints():
+    """Test admin-only loop profiles and per-request profiles."""
+    client = TestClient(profiling_app)
+    assert client.get("/admin/profiles").status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    response = client.get("/admin/profile?seconds=0.1&interval=0.005", headers=ADMIN)
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    assert client.get("/admin/profile?seconds=1000", headers=ADMIN).status_code == 400
+
+    response = client.get("/notion/busy", headers={"X-Profile": "1", **ADMIN})
+    profile_id = response.headers["x-profile-id"]
+    assert "x-profile-id" not in client.get("/notion/busy", headers={"X-Profile": "1"}).headers
+
+    collapsed = client.get(f"/admin/profiles/{profile_id}", headers=ADMIN).text
+    assert "busy_loop" in collapsed
+    line = collapsed.splitlines()[0]
+    assert line.rsplit(" ", 1)[1].isdigit() and ";" in line
+    summary = client.get(f"/admin/profiles/{profile_id}?format=json", headers=ADMIN).json()
+    assert summary["label"] == "GET /notion/busy" and summary["samples"] > 0
+    assert profile_id in [p["id"] for p in client.get("/admin/profiles", headers=ADMIN).json()["profiles"]]
+    print("✓ Profiles are admin-only and per-request profiling works")
+
+def test_mcp_profile_requires_admin():
+    """Test MCP tool calls are only profiled when enabled and with the admin token."""
+    async def call(arguments):
+        result = await MCPServer().handle_call_tool("health_check", arguments)
+        return [content.text for content in result]
+
+    @with_diagnostics()
+    def enabled():
+        latest = lambda: next(reversed(profile_store.profiles), None)
+        before = latest()
+        denied = asyncio.run(call({"_profile": True}))
+        assert len(denied) == 1 and "_admin_token" in denied[0]
+        assert "_admin_token" in asyncio.run(call({"_profile": True, "_admin_token": "wrong"}))[0]
+        assert latest() == before
+        profiled = asyncio.run(call({"_profile": True, "_admin_token": "admin-secret"}))
+        assert len(profiled) == 2 and latest() != before and latest() in profiled[1]
+
+    @with_diagnostics(enabled=False)
+    def disabled():
+        result = asyncio.run(call({"_profile": True, "_admin_token": "admin-secret"}))
+        assert len(result) == 1 and "healthy" in result[0]
+
+    enabled()
+    disabled()
+    print("✓ MCP profiling needs profiling_enabled and the admin token")
+
+@with_diagnostics()
+def test_tracemalloc_snapshots():
+    """Test tracemalloc snapshots, top sites and diffs."""
+    client = TestClient(profiling_app)
+    assert client.post("/admin/tracemalloc/snapshot", headers=ADMIN).status_code == 409
+    try:
+        assert client.post("/admin/tracemalloc/start?frames=5", headers=ADMIN).json()["tracing"]
+        base = client.post("/admin/tracemalloc/snapshot", headers=ADMIN).json()
+        assert base["total_bytes"] > 0 and base["top"]
+
+        retained = [bytearray(1000) for _ in range(2000)]
+        diff = client.get(f"/admin/tracemalloc/diff?base={base['snapshot_id']}&limit=5", headers=ADMIN).json()
+        assert diff["size_diff_bytes"] > 1_000_000
+        assert any("test_profiling.py" in site for site in diff["top"][0]["site"])
+        del retained
+    finally:
+        client.post("/admin/tracemalloc/stop", headers=ADMIN)
+    print("✓ tracemalloc snapshots and diffs work")
+
+if __name__ == "__main__":
+    test_sampler_sees_busy_code()
+    test_disabled_endpoints_hidden()
+    test_admin_profile_endpoints()
+    test_mcp_profile_requires_admin()
+    test_tracemalloc_snapshots()
+    print("\n✅ Profiling tests passed!")
@@ -0,0 +1,151 @@
+import sys
+import os
+import asyncio
+import tempfile
+import time
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from src.config import settings
+from src.api.middleware.rate_limit import client_address
+from src.core.rate_limit import MAX_WAIT_SECONDS, BucketLimit, InMemoryBucketStore, SQLiteBucketStore, admission_controller
+from src.main import app
+from src.services.kratos_service import kratos_service
+
+client = TestClient(app)
+
+def test_token_bucket():
+    """Test buckets admit up to the burst and then report a wait time."""
+    async def scenario(store):
+        limit = BucketLimit("user:test", rate=1.0, burst=2)
+        assert await store.take_all([limit]) is None
+        assert await store.take_all([limit]) is None
+        retry_after = await store.take_all([limit])
+        assert retry_after is not None and 0 < retry_after <= 1.0
+
+    asyncio.run(scenario(InMemoryBucketStore()))
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteBucketStore(os.path.join(tmp, "buckets.db"))
+        asyncio.run(scenario(store))
+    print("✓ Token buckets work for memory and sqlite backends")
+
+def test_all_or_nothing():
+    """Test a rejected call does not consume tokens from other buckets."""
+    async def scenario():
+        store = InMemoryBucketStore()
+        roomy = BucketLimit("route:a", rate=1.0, burst=5)
+        tight = BucketLimit("user:a", rate=1.0, burst=1)
+        assert await store.take_all([roomy, tight]) is None
+        assert await store.take_all([roomy, tight]) is not None
+        tokens, _, _ = store._buckets["route:a"]
+        assert 3.9 < tokens < 4.1
+
+    asyncio.run(scenario())
+    print("✓ Rejections are all-or-nothing")
+
+def test_sqlite_purges_full_buckets():
+    """Test rows for buckets that have refilled are deleted, busy ones kept."""
+    async def scenario(store):
+        store._PURGE_EVERY = 3
+        assert await store.take_all([BucketLimit("client:once", rate=1000.0, burst=1)]) is None
+        busy = BucketLimit("client:busy", rate=0.001, burst=2)
+        assert await store.take_all([busy]) is None
+        time.sleep(0.01)
+        assert await store.take_all([busy]) is None
+        keys = {row[0] for row in store._connect().execute("SELECT key FROM buckets")}
+        assert keys == {"client:busy"}
+        assert await store.take_all([busy]) is not None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(SQLiteBucketStore(os.path.join(tmp, "buckets.db"))))
+    print("✓ SQLite bucket store purges idle buckets")
+
+def test_client_address():
+    """Test X-Forwarded-For is only believed from a trusted proxy."""
+    original = settings.rate_limit_trusted_proxies
+    forwarded = [(b"x-forwarded-for", b"6.6.6.6, 1.2.3.4, 10.0.0.2")]
+    settings.rate_limit_trusted_proxies = ["10.0.0.1", "10.0.0.2"]
+    try:
+        assert client_address({"client": ("9.9.9.9", 1), "headers": forwarded}) == "9.9.9.9"
+        assert client_address({"client": ("10.0.0.1", 1), "headers": forwarded}) == "1.2.3.4"
+        assert client_address({"client": ("10.0.0.1", 1), "headers": []}) == "10.0.0.1"
+    finally:
+        settings.rate_limit_trusted_proxies = original
+    print("✓ Client address honours trusted proxies only")
+
+def test_middleware_returns_429():
+    """Test callers over their limit get a fast 429 with Retry-After."""
+    original = settings.rate_limit_client_rate
+    settings.rate_limit_client_rate = 0.5
+    try:
+        # Fresh client and user headers on every call don't buy a fresh bucket
+        statuses = [
+            client.get("/jobs", headers={"x-user-id": f"u{i}", "x-client-id": f"c{i}"}).status_code
+            for i in range(3)
+        ]
+        assert statuses[-1] == 429
+        response = client.get("/jobs", headers={"x-client-id": "someone-else"})
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+        # Health probes are never throttled
+        assert client.get("/health/live").status_code == 200
+    finally:
+        settings.rate_limit_client_rate = original
+        admission_controller.store = InMemoryBucketStore()
+    print("✓ Admission middleware returns 429 with Retry-After")
+
+def test_user_bucket_follows_session():
+    """Test a user is limited on their session identity from any address."""
+    original = (settings.rate_limit_user_rate, settings.rate_limit_trusted_proxies)
+    settings.rate_limit_user_rate = 0.5
+    settings.rate_limit_trusted_proxies = ["testclient"]
+    lookups = []
+
+    async def resolve_session(session_token=None, session_cookie=None):
+        lookups.append(session_token)
+        return {"success": True, "session": {"identity_id": "user-1"}, "identity": {"id": "user-1"}}
+
+    kratos_service.resolve_session = resolve_session
+    try:
+        statuses = [
+            client.get(
+                "/jobs",
+                headers={"x-session-token": "token", "x-forwarded-for": f"203.0.113.{i}"}
+            ).status_code
+            for i in range(3)
+        ]
+        assert statuses[-1] == 429
+        # Anonymous callers from the same proxy aren't charged to the user
+        assert client.get("/jobs", headers={"x-forwarded-for": "203.0.113.9"}).status_code == 200
+        assert len(lookups) == 3
+    finally:
+        del kratos_service.resolve_session
+        settings.rate_limit_user_rate, settings.rate_limit_trusted_proxies = original
+        admission_controller.store = InMemoryBucketStore()
+    print("✓ User buckets are keyed on the session identity")
+
+def test_closed_route_returns_429():
+    """Test a route limited to rate 0 is rejected with a finite Retry-After."""
+    original = dict(settings.rate_limit_route_limits)
+    settings.rate_limit_route_limits["GET /jobs"] = 0.0
+    try:
+        response = client.get("/jobs")
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) == MAX_WAIT_SECONDS
+        assert response.json()["retry_after"] == MAX_WAIT_SECONDS
+    finally:
+        settings.rate_limit_route_limits = original
+        admission_controller.store = InMemoryBucketStore()
+    print("✓ Closed routes return 429 with a finite Retry-After")
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_all_or_nothing()
+    test_sqlite_purges_full_buckets()
+    test_client_address()
+    test_middleware_returns_429()
+    test_user_bucket_follows_session()
+    test_closed_route_returns_429()
+    print("\n✅ Rate limit tests passed!")
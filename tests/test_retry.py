@@ -0,0 +1,149 @@
+import sys
+import os
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from src.core.retry import RetryPolicy, retry_after_seconds
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.upstream import Upstream
+from src.models.user_notion import UserNotionConfig
+from src.services.user_notion_service import UserNotionService
+
+def make_upstream(name, statuses, seen):
+    """Upstream whose mock transport replies with ``statuses`` in order."""
+    replies = iter(statuses)
+
+    def handler(request):
+        seen.append(request)
+        status = next(replies)
+        if status == "reset":
+            raise httpx.ConnectError("connection reset", request=request)
+        return httpx.Response(status)
+
+    upstream = Upstream(name)
+    upstream.retry_policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.002, deadline=5.0)
+    upstream._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    upstream._client_loop = asyncio.get_running_loop()
+    return upstream
+
+def test_idempotent_requests_retry():
+    """Test GETs are retried through transient failures."""
+    async def scenario():
+        seen = []
+        upstream = make_upstream("test-retry-get", ["reset", 503, 200], seen)
+        response = await upstream.request("GET", "https://example.test/admin/identities/1")
+        assert response.status_code == 200
+        assert response.extensions["retries"] == 2
+        assert len(seen) == 3
+
+    asyncio.run(scenario())
+    print("✓ Idempotent requests are retried")
+
+def test_post_without_key_not_retried():
+    """Test non-idempotent POSTs are not replayed."""
+    async def scenario():
+        seen = []
+        upstream = make_upstream("test-retry-post", [503, 200], seen)
+        response = await upstream.request("POST", "https://example.test/pages", json={})
+        assert response.status_code == 503
+        assert len(seen) == 1
+
+    asyncio.run(scenario())
+    print("✓ POSTs without an idempotency key are not retried")
+
+def test_post_with_key_retried():
+    """Test POSTs carrying an idempotency key are retried with the key attached."""
+    async def scenario():
+        seen = []
+        upstream = make_upstream("test-retry-key", [502, 200], seen)
+        response = await upstream.request("POST", "https://example.test/pages", json={}, idempotency_key="abc")
+        assert response.status_code == 200
+        assert [r.headers["idempotency-key"] for r in seen] == ["abc", "abc"]
+
+    asyncio.run(scenario())
+    print("✓ POSTs with an idempotency key are retried")
+
+def test_attempts_are_bounded():
+    """Test retries stop at the attempt limit and return the last response."""
+    async def scenario():
+        seen = []
+        upstream = make_upstream("test-retry-limit", [503, 503, 503, 200], seen)
+        response = await upstream.request("GET", "https://example.test/health/ready")
+        assert response.status_code == 503
+        assert len(seen) == 3
+
+    asyncio.run(scenario())
+    print("✓ Retry attempts are bounded")
+
+def test_retry_after_header():
+    """Test Retry-After parsing."""
+    assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "2"})) == 2.0
+    assert retry_after_seconds(httpx.Response(429)) == 0.0
+
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    for value in (format_datetime(retry_at, usegmt=True), format_datetime(retry_at.replace(tzinfo=None))):
+        assert 25 < retry_after_seconds(httpx.Response(503, headers={"Retry-After": value})) <= 30, value
+    print("✓ Retry-After is parsed")
+
+def test_page_create_deduplicated_locally():
+    """Test page creates are retried only when unsent and idempotency keys are answered locally."""
+    replies, seen = [], []
+
+    async def handler(request):
+        seen.append(request)
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        if reply == "slow":
+            await asyncio.sleep(0.1)
+            reply = 200
+        return httpx.Response(reply, json={"id": f"page-{len(seen)}", "url": "https://notion.so/p"})
+
+    async def scenario():
+        service = UserNotionService()
+        service.http.breaker = CircuitBreaker("test-retry-page-create")
+        service.http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        service.http._client_loop = asyncio.get_running_loop()
+        config = UserNotionConfig(notion_api_key=f"secret_{id(seen)}", notion_database_id="db-1")
+        request = httpx.Request("POST", "https://api.notion.com/v1/pages")
+
+        # A timeout after sending may have created the page, so it is not retried
+        replies[:] = [httpx.ReadTimeout("timed out", request=request), 200]
+        result = await service.create_user_page(config, idempotency_key="key-1")
+        assert not result["success"] and len(seen) == 1
+
+        # Never sent, or rate limited: retried; Notion never sees an Idempotency-Key header
+        replies[:] = [httpx.ConnectError("refused", request=request), 429, 200]
+        result = await service.create_user_page(config, idempotency_key="key-1")
+        assert result["success"] and result["page_id"] == "page-4" and len(seen) == 4
+        assert all("idempotency-key" not in r.headers for r in seen)
+
+        # A replay returns the first page without calling Notion
+        replayed = await service.create_user_page(config, idempotency_key="key-1")
+        assert replayed["replayed"] and replayed["page_id"] == "page-4" and len(seen) == 4
+
+        # A concurrent repeat is refused while the first is in flight
+        replies[:] = ["slow"]
+        first, second = await asyncio.gather(
+            service.create_user_page(config, idempotency_key="key-2"),
+            service.create_user_page(config, idempotency_key="key-2")
+        )
+        assert first["success"] and second["status_code"] == 409 and len(seen) == 5
+        await service.http._client.aclose()
+
+    asyncio.run(scenario())
+    print("✓ Page creates are never replayed to Notion")
+
+if __name__ == "__main__":
+    test_idempotent_requests_retry()
+    test_post_without_key_not_retried()
+    test_post_with_key_retried()
+    test_attempts_are_bounded()
+    test_retry_after_header()
+    test_page_create_deduplicated_locally()
+    print("\n✅ Retry tests passed!")
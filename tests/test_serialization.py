@@ -0,0 +1,44 @@
+import sys
+import os
+from datetime import datetime
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import SecretStr
+from src.core import serialization
+from src.api.responses import FastJSONResponse
+from src.models.user_notion import NotionConnectionTest, UserNotionConfig
+
+def test_round_trip():
+    """Test that dumps/loads round-trip nested service results."""
+    payload = {"results": [{"id": "a", "n": 1.5, "ok": True}], "next_cursor": None}
+    assert serialization.loads(serialization.dumps(payload)) == payload
+    assert serialization.loads(serialization.dumps_str(payload)) == payload
+    print("✓ Round trip works")
+
+def test_models_and_secrets():
+    """Test that pydantic models encode without leaking secrets."""
+    tested_at = datetime(2024, 1, 1, 12, 30)
+    config = UserNotionConfig(notion_api_key=SecretStr("secret_abc"), connected_at=tested_at)
+    data = serialization.loads(serialization.dumps({
+        "config": config,
+        "test": NotionConnectionTest(status="connected", tested_at=tested_at)
+    }))
+    assert data["config"]["notion_api_key"] == "**********"
+    assert data["config"]["connected_at"].startswith("2024-01-01T12:30")
+    assert data["test"]["status"] == "connected"
+    print("✓ Models and secrets encode correctly")
+
+def test_response_class():
+    """Test the fast response class renders JSON bytes."""
+    response = FastJSONResponse({"status": "ok"})
+    assert serialization.loads(response.body) == {"status": "ok"}
+    assert response.media_type == "application/json"
+    print("✓ FastJSONResponse works")
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_models_and_secrets()
+    test_response_class()
+    print("\n✅ Serialization tests passed!")
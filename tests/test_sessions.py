@@ -0,0 +1,140 @@
+import sys
+import os
+import asyncio
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import src.api.dependencies as dependencies
+import src.services.kratos_service as kratos_module
+from src.api.dependencies import SessionDep
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.shared_cache import SharedCache
+from src.services.kratos_service import KratosService, session_ttl
+
+IDENTITY = {"id": "user-1", "traits": {"email": "u@example.com"}}
+
+def whoami_body(expires_in=3600.0):
+    expires_at = datetime.fromtimestamp(time.time() + expires_in, tz=timezone.utc)
+    return {
+        "id": "session-1",
+        "active": True,
+        "expires_at": expires_at.isoformat().replace("+00:00", "Z"),
+        "identity": IDENTITY
+    }
+
+def make_service(calls, expires_in=3600.0):
+    def handler(request):
+        calls.append((request.method, request.url.path))
+        if request.url.path == "/sessions/whoami":
+            if request.headers.get("x-session-token") != "token-1" and "ory_kratos_session=cookie-1" not in request.headers.get("cookie", ""):
+                return httpx.Response(401, json={"error": {"code": 401}})
+            return httpx.Response(200, json=whoami_body(expires_in))
+        if request.url.path == "/self-service/logout/api":
+            return httpx.Response(204)
+        if request.url.path == "/self-service/login/flows":
+            return httpx.Response(200, json={"id": request.url.params["id"], "type": "api"})
+        return httpx.Response(200, json=IDENTITY)
+
+    kratos_module.shared_cache = SharedCache(os.path.join(tempfile.mkdtemp(), "cache.db"))
+    service = KratosService()
+    service.http.breaker = CircuitBreaker("kratos-sessions-test")
+    service.http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    service.http._client_loop = asyncio.get_running_loop()
+    return service
+
+def test_session_ttl():
+    """Test expires_at parsing, including nanosecond precision."""
+    assert 3500 < session_ttl(whoami_body()["expires_at"]) <= 3600
+    assert session_ttl("2099-01-01T00:00:00.123456789Z") > 0
+    assert session_ttl("2020-01-01T00:00:00Z") == 0
+    assert session_ttl(None) == 0 and session_ttl("not a date") == 0
+    print("✓ Session expiry is parsed")
+
+def test_whoami_cached_until_logout():
+    """Test whoami runs once per session and logout invalidates it."""
+    async def scenario():
+        original = kratos_module.shared_cache
+        calls = []
+        try:
+            service = make_service(calls)
+            for _ in range(3):
+                result = await service.resolve_session(session_token="token-1")
+                assert result["success"] and result["identity"]["id"] == "user-1"
+                assert result["session"]["session_id"] == "session-1"
+            assert calls.count(("GET", "/sessions/whoami")) == 1
+
+            # Cookies are keyed separately from tokens
+            assert (await service.resolve_session(session_cookie="cookie-1"))["success"]
+            assert calls.count(("GET", "/sessions/whoami")) == 2
+            assert (await service.resolve_session(session_token="bad"))["status_code"] == 401
+            assert (await service.resolve_session())["status_code"] == 401
+
+            assert (await service.logout(session_token="token-1"))["success"]
+            await service.resolve_session(session_token="token-1")
+            assert calls.count(("GET", "/sessions/whoami")) == 4
+
+            flow = await service.get_login_flow("flow-1")
+            assert flow["success"] and flow["flow"]["id"] == "flow-1"
+            await service.http._client.aclose()
+        finally:
+            kratos_module.shared_cache = original
+
+    asyncio.run(scenario())
+    print("✓ Sessions are cached until logout")
+
+def test_session_expiry_bounds_cache():
+    """Test sessions about to expire are not cached past expires_at."""
+    async def scenario():
+        original = kratos_module.shared_cache
+        calls = []
+        try:
+            service = make_service(calls, expires_in=0.05)
+            await service.resolve_session(session_token="token-1")
+            await asyncio.sleep(0.1)
+            await service.resolve_session(session_token="token-1")
+            assert calls.count(("GET", "/sessions/whoami")) == 2
+            await service.http._client.aclose()
+        finally:
+            kratos_module.shared_cache = original
+
+    asyncio.run(scenario())
+    print("✓ Session cache is bounded by expires_at")
+
+def test_session_dependency():
+    """Test the dependency reads bearer tokens and rejects anonymous calls."""
+    session_app = FastAPI()
+
+    @session_app.get("/me")
+    async def me(session: SessionDep):
+        return {"id": session["identity"]["id"]}
+
+    class StubKratos:
+        async def resolve_session(self, session_token=None, session_cookie=None):
+            if session_token == "token-1":
+                return {"success": True, "session": {"identity_id": "user-1"}, "identity": IDENTITY}
+            return {"success": False, "error": "Session is invalid or expired", "status_code": 401}
+
+    original = dependencies.kratos_service
+    dependencies.kratos_service = StubKratos()
+    try:
+        client = TestClient(session_app)
+        assert client.get("/me", headers={"Authorization": "Bearer token-1"}).json() == {"id": "user-1"}
+        assert client.get("/me", headers={"X-Session-Token": "other"}).status_code == 401
+        assert client.get("/me").status_code == 401
+    finally:
+        dependencies.kratos_service = original
+    print("✓ Session dependency resolves callers")
+
+if __name__ == "__main__":
+    test_session_ttl()
+    test_whoami_cached_until_logout()
+    test_session_expiry_bounds_cache()
+    test_session_dependency()
+    print("\n✅ Session tests passed!")
@@ -0,0 +1,142 @@
+import sys
+import os
+import asyncio
+import tempfile
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from src.config import settings
+from src.core.shared_cache import SharedCache
+from src.main import resolve_workers
+from src.services.kratos_service import KratosService
+
+def make_workers(count=2):
+    """Caches over one file, standing in for separate worker processes."""
+    path = os.path.join(tempfile.mkdtemp(), "shared_cache.db")
+    return [SharedCache(path) for _ in range(count)]
+
+def test_entries_shared_across_workers():
+    """Test a value written by one worker is read by another."""
+    async def scenario():
+        first, second = make_workers()
+        await first.set("identity", "abc", {"traits": {"email": "a@example.com"}}, 60)
+        value = await second.get("identity", "abc")
+        assert value == {"traits": {"email": "a@example.com"}}
+        value["traits"]["email"] = "changed"
+        assert (await second.get("identity", "abc"))["traits"]["email"] == "a@example.com"
+        assert await second.get("identity", "missing") is None
+
+    asyncio.run(scenario())
+    print("✓ Entries are shared across workers")
+
+def test_invalidation_broadcast():
+    """Test a delete in one worker evicts the other worker's local copy."""
+    async def scenario():
+        first, second = make_workers()
+        await first.set("identity", "abc", {"v": 1}, 60)
+        await first.set("notion_schema", "database:db1:k1", {"v": 1}, 60)
+        await first.set("notion_schema", "database:db2:k1", {"v": 2}, 60)
+        assert await second.get("identity", "abc") == {"v": 1}
+        assert await second.get("notion_schema", "database:db1:k1") == {"v": 1}
+
+        await first.delete("identity", "abc")
+        await first.delete_prefix("notion_schema", "database:db1:")
+        second._synced_at = 0.0
+        assert await second.get("identity", "abc") is None
+        assert await second.get("notion_schema", "database:db1:k1") is None
+        assert await second.get("notion_schema", "database:db2:k1") == {"v": 2}
+
+    asyncio.run(scenario())
+    print("✓ Invalidations reach other workers")
+
+def test_overwrite_broadcast():
+    """Test overwriting a key in one worker replaces the other worker's local copy."""
+    async def scenario():
+        first, second = make_workers()
+        await first.set("identity", "abc", {"enabled": True}, 60)
+        assert await second.get("identity", "abc") == {"enabled": True}
+
+        await first.set("identity", "abc", {"enabled": False}, 60)
+        second._synced_at = 0.0
+        assert await second.get("identity", "abc") == {"enabled": False}
+        first._synced_at = 0.0
+        assert await first.get("identity", "abc") == {"enabled": False}
+
+    asyncio.run(scenario())
+    print("✓ Overwrites reach other workers")
+
+def test_add_is_atomic():
+    """Test only one of several workers adding the same key succeeds."""
+    async def scenario():
+        workers = make_workers(4)
+        added = await asyncio.gather(*(cache.add("claims", "job-1", {"worker": i}, 60) for i, cache in enumerate(workers)))
+        assert sorted(added) == [False, False, False, True]
+        winner = added.index(True)
+        assert await workers[0].get("claims", "job-1") == {"worker": winner}
+
+        assert await workers[0].add("claims", "short", 1, 0.05)
+        await asyncio.sleep(0.06)
+        assert await workers[1].add("claims", "short", 2, 60)
+
+    asyncio.run(scenario())
+    print("✓ Adds are atomic across workers")
+
+def test_entries_expire():
+    """Test entries are not served after their TTL."""
+    async def scenario():
+        (cache,) = make_workers(1)
+        await cache.set("health", "kratos", {"status": "healthy"}, 0.05)
+        assert await cache.get("health", "kratos") == {"status": "healthy"}
+        await asyncio.sleep(0.06)
+        assert await cache.get("health", "kratos") is None
+
+    asyncio.run(scenario())
+    print("✓ Entries expire")
+
+def test_identity_lookups_cached():
+    """Test repeated identity lookups hit Kratos once."""
+    async def scenario():
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, json={"id": "user-1", "traits": {"email": "u@example.com"}})
+
+        import src.services.kratos_service as kratos_module
+        original = kratos_module.shared_cache
+        kratos_module.shared_cache = make_workers(1)[0]
+        try:
+            service = KratosService()
+            service.http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            service.http._client_loop = asyncio.get_running_loop()
+            for _ in range(3):
+                result = await service.get_identity("user-1")
+                assert result["success"] and result["identity"]["id"] == "user-1"
+            assert len(calls) == 1
+            await service.get_identity("user-1", use_cache=False)
+            assert len(calls) == 2
+            await service.http._client.aclose()
+        finally:
+            kratos_module.shared_cache = original
+
+    asyncio.run(scenario())
+    print("✓ Identity lookups are cached")
+
+def test_worker_count():
+    """Test worker count resolution."""
+    assert resolve_workers(3) == 3
+    assert resolve_workers(0) == (os.cpu_count() or 1)
+    assert resolve_workers() == resolve_workers(settings.web_workers)
+    print("✓ Worker count resolves from CPU count")
+
+if __name__ == "__main__":
+    test_entries_shared_across_workers()
+    test_invalidation_broadcast()
+    test_overwrite_broadcast()
+    test_add_is_atomic()
+    test_entries_expire()
+    test_identity_lookups_cached()
+    test_worker_count()
+    print("\n✅ Shared cache tests passed!")
@@ -0,0 +1,35 @@
+import sys
+import os
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def loaded_after_import(module):
+    """Import ``module`` in a fresh interpreter and return the loaded module names."""
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys, {module}; print(' '.join(sys.modules))"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return set(result.stdout.split())
+
+def test_rest_app_skips_mcp_sdk():
+    """Test the REST app does not import the MCP SDK."""
+    modules = loaded_after_import("src.api.main")
+    assert "mcp" not in modules
+    assert "src.mcp.server" not in modules
+    print("✓ REST app starts without the MCP SDK")
+
+def test_mcp_server_defers_services():
+    """Test spawning the MCP server does not load services or httpx."""
+    modules = loaded_after_import("src.mcp.server")
+    for name in ("src.services.kratos_service", "src.services.job_service", "httpx"):
+        assert name not in modules, name
+    print("✓ MCP server defers service imports")
+
+if __name__ == "__main__":
+    test_rest_app_skips_mcp_sdk()
+    test_mcp_server_defers_services()
+    print("\n✅ Startup tests passed!")
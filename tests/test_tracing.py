@@ -0,0 +1,152 @@
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import threading
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api.middleware.tracing import TracingMiddleware
+from src.config import settings
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.tracing import NOOP_SPAN, parse_traceparent, trace_methods, tracer
+from src.core.upstream import Upstream
+
+seen_headers = []
+
+def handler(request):
+    seen_headers.append(request.headers.get("traceparent"))
+    status = 404 if request.url.path.endswith("missing") else 200
+    return httpx.Response(status, json={"ok": status == 200})
+
+@trace_methods("widgets")
+class WidgetService:
+    def __init__(self):
+        self.http = Upstream("widgets-test")
+        self.http.breaker = CircuitBreaker("widgets-test")
+
+    async def get_widget(self, widget_id):
+        # Each TestClient runs its own event loop
+        self.http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        self.http._client_loop = asyncio.get_running_loop()
+        response = await self.http.request("GET", f"http://widgets.local/widgets/{widget_id}")
+        if response.status_code != 200:
+            return {"success": False, "error": "Widget not found", "status_code": response.status_code}
+        return {"success": True}
+
+widgets = WidgetService()
+tracing_app = FastAPI()
+tracing_app.add_middleware(TracingMiddleware)
+
+@tracing_app.get("/widgets/{widget_id}")
+async def get_widget(widget_id: str):
+    return await widgets.get_widget(widget_id)
+
+def read_spans(path):
+    spans = []
+    with open(path) as f:
+        for line in f:
+            batch = json.loads(line)["resourceSpans"][0]
+            spans.extend(batch["scopeSpans"][0]["spans"])
+    return {span["name"]: span for span in spans}
+
+def attributes(span):
+    return {item["key"]: list(item["value"].values())[0] for item in span["attributes"]}
+
+def with_file_exporter(test):
+    def run():
+        path = os.path.join(tempfile.mkdtemp(), "traces.jsonl")
+        original = (settings.tracing_exporter, settings.tracing_file)
+        settings.tracing_exporter, settings.tracing_file = "file", path
+        try:
+            test(path)
+        finally:
+            tracer.shutdown()
+            settings.tracing_exporter, settings.tracing_file = original
+    run.__name__ = test.__name__
+    run.__doc__ = test.__doc__
+    return run
+
+@with_file_exporter
+def test_spans_nest_across_layers(path):
+    """Test route, service and upstream spans form one trace."""
+    seen_headers.clear()
+    response = TestClient(tracing_app).get("/widgets/a")
+    assert response.status_code == 200
+    tracer.shutdown()
+
+    spans = read_spans(path)
+    server, service, client = spans["GET /widgets/{widget_id}"], spans["widgets.get_widget"], spans["GET widgets-test"]
+    assert response.headers["x-trace-id"] == server["traceId"] == service["traceId"] == client["traceId"]
+    assert "parentSpanId" not in server
+    assert service["parentSpanId"] == server["spanId"] and client["parentSpanId"] == service["spanId"]
+    assert server["kind"] == "SPAN_KIND_SERVER" and client["kind"] == "SPAN_KIND_CLIENT"
+    assert attributes(server)["http.response.status_code"] == "200"
+    assert attributes(client)["upstream"] == "widgets-test"
+    assert attributes(client)["http.request.resend_count"] == "0"
+
+    # The outgoing request carries the client span's context
+    assert parse_traceparent(seen_headers[0])[:2] == (client["traceId"], client["spanId"])
+    print("✓ Spans nest from route to upstream")
+
+@with_file_exporter
+def test_incoming_traceparent_and_errors(path):
+    """Test incoming trace context is continued and failed results are marked."""
+    parent = "00-" + "ab" * 16 + "-" + "cd" * 8 + "-01"
+    response = TestClient(tracing_app).get("/widgets/missing", headers={"traceparent": parent})
+    assert response.headers["x-trace-id"] == "ab" * 16
+    tracer.shutdown()
+
+    spans = read_spans(path)
+    assert spans["GET /widgets/{widget_id}"]["parentSpanId"] == "cd" * 8
+    service = spans["widgets.get_widget"]
+    assert service["status"]["code"] == "STATUS_CODE_ERROR"
+    assert attributes(service)["result.status_code"] == "404"
+    print("✓ Incoming context continued and errors marked")
+
+@with_file_exporter
+def test_spans_written_off_the_loop(path):
+    """Test spans are written by the writer thread and flushed on shutdown."""
+    writers = []
+    open_stream = tracer._open_stream
+
+    def recording_open():
+        writers.append(threading.current_thread())
+        return open_stream()
+
+    tracer._open_stream = recording_open
+    try:
+        for i in range(50):
+            with tracer.span(f"span-{i}"):
+                pass
+        tracer.shutdown()
+    finally:
+        del tracer._open_stream
+    assert writers and threading.main_thread() not in writers
+    assert len(read_spans(path)) == 50
+    print("✓ Spans are written off the calling thread")
+
+def test_disabled_and_parsing():
+    """Test tracing is a no-op when disabled and malformed headers are ignored."""
+    original, settings.tracing_exporter = settings.tracing_exporter, "none"
+    try:
+        assert tracer.span("anything") is NOOP_SPAN
+        assert "x-trace-id" not in TestClient(tracing_app).get("/widgets/a").headers
+    finally:
+        settings.tracing_exporter = original
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent("00-" + "0" * 32 + "-" + "cd" * 8 + "-01") is None
+    assert parse_traceparent("00-" + "ab" * 16 + "-" + "cd" * 8 + "-00") == ("ab" * 16, "cd" * 8, False)
+    print("✓ Disabled tracing is a no-op")
+
+if __name__ == "__main__":
+    test_spans_nest_across_layers()
+    test_incoming_traceparent_and_errors()
+    test_spans_written_off_the_loop()
+    test_disabled_and_parsing()
+    print("\n✅ Tracing tests passed!")
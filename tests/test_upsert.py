@@ -0,0 +1,140 @@
+import sys
+import os
+import asyncio
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from src.main import app
+from src.models.user_notion import UserNotionConfig
+from src.services.kratos_service import kratos_service
+from src.services.upsert_service import upsert_service
+from src.services.user_notion_service import user_notion_service
+
+client = TestClient(app)
+
+CONFIG = UserNotionConfig(notion_api_key="secret", notion_database_id="db-1")
+PROPERTIES = {
+    "Name": {"type": "title"},
+    "SKU": {"type": "rich_text"},
+    "Price": {"type": "number"},
+    "Tags": {"type": "multi_select"},
+    "Updated": {"type": "last_edited_time"},
+}
+
+def make_page(page_id, sku, name, price, tags):
+    return {
+        "id": page_id,
+        "properties": {
+            "Name": {"type": "title", "title": [{"plain_text": name}]},
+            "SKU": {"type": "rich_text", "rich_text": [{"plain_text": sku}]},
+            "Price": {"type": "number", "number": price},
+            "Tags": {"type": "multi_select", "multi_select": [{"name": t} for t in tags]},
+        }
+    }
+
+class FakeNotion:
+    """In-memory database recording the writes the upsert makes."""
+
+    def __init__(self):
+        self.pages = [
+            make_page("p1", "A-1", "Widget", 10, ["x"]),
+            make_page("p2", "A-2", "Gadget", 20, []),
+        ]
+        self.created = []
+        self.updated = []
+
+    async def get_identity(self, identity_id, use_cache=True):
+        return {"success": True, "notion_config": CONFIG}
+
+    async def get_database_schema(self, config, database_id=None):
+        return {"success": True, "database_id": "db-1", "properties": PROPERTIES}
+
+    async def query_user_database(self, config, database_id=None, page_size=100, start_cursor=None):
+        return {"success": True, "results": self.pages, "has_more": False, "next_cursor": None}
+
+    async def create_user_page(self, config, database_id=None, properties=None, **kwargs):
+        self.created.append(properties)
+        return {"success": True}
+
+    async def update_page(self, config, page_id, properties):
+        self.updated.append((page_id, properties))
+        return {"success": True}
+
+def patched(fake, fn):
+    names = ("get_database_schema", "query_user_database", "create_user_page", "update_page")
+    originals = [getattr(user_notion_service, n) for n in names] + [kratos_service.get_identity]
+    for n in names:
+        setattr(user_notion_service, n, getattr(fake, n))
+    kratos_service.get_identity = fake.get_identity
+    try:
+        return fn()
+    finally:
+        for n, original in zip(names, originals):
+            setattr(user_notion_service, n, original)
+        kratos_service.get_identity = originals[-1]
+
+RECORDS = [
+    {"SKU": "A-1", "Name": "Widget", "Price": 10, "Tags": ["x"]},     # unchanged
+    {"SKU": "A-2", "Name": "Gadget", "Price": 25},                    # price changed
+    {"SKU": "A-3", "Name": "Doohickey", "Price": 5},                  # new
+    {"SKU": "A-3", "Name": "Doohickey", "Price": 6},                  # same key, last wins
+    {"Name": "No key"},                                               # invalid
+    {"SKU": "A-4", "Updated": "2024-01-01"},                          # read-only property
+]
+
+def test_upsert_writes_only_changes():
+    """Test unchanged rows are skipped and only changed properties are PATCHed."""
+    fake = FakeNotion()
+    result = patched(fake, lambda: asyncio.run(upsert_service.upsert(CONFIG, RECORDS, "SKU")))
+    assert result["success"]
+    assert (result["created"], result["updated"], result["unchanged"]) == (1, 1, 1)
+    assert result["failed"] == 2
+    assert fake.updated == [("p2", {"Price": {"number": 25.0}})]
+    assert fake.created[0]["Price"] == {"number": 6.0}
+    assert fake.created[0]["Name"]["title"][0]["text"]["content"] == "Doohickey"
+    print("✓ Upsert writes only what changed")
+
+def test_upsert_dry_run():
+    """Test dry runs plan without writing."""
+    fake = FakeNotion()
+    result = patched(fake, lambda: asyncio.run(upsert_service.upsert(CONFIG, RECORDS, "SKU", dry_run=True)))
+    assert (result["created"], result["updated"], result["patched_properties"]) == (1, 1, 1)
+    assert not fake.created and not fake.updated
+    print("✓ Dry run plans without writing")
+
+def test_upsert_rejects_bad_key():
+    """Test the key must be a text, number or select property."""
+    fake = FakeNotion()
+    result = patched(fake, lambda: asyncio.run(upsert_service.upsert(CONFIG, RECORDS, "Tags")))
+    assert not result["success"] and result["status_code"] == 400
+    print("✓ Bad key properties are rejected")
+
+def test_upsert_endpoint_ndjson():
+    """Test the upsert route accepts an NDJSON stream."""
+    fake = FakeNotion()
+    body = b'{"SKU": "A-1", "Price": 11}\n{"SKU": "A-9", "Name": "New"}\n'
+    response = patched(fake, lambda: client.post(
+        "/notion/users/user-1/databases/upsert?key=SKU",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"}
+    ))
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["updated"]) == (1, 1)
+
+    response = patched(fake, lambda: client.post(
+        "/notion/users/user-1/databases/upsert?key=SKU",
+        content=b"not json",
+        headers={"Content-Type": "application/x-ndjson"}
+    ))
+    assert response.status_code == 400
+    print("✓ Upsert endpoint accepts NDJSON")
+
+if __name__ == "__main__":
+    test_upsert_writes_only_changes()
+    test_upsert_dry_run()
+    test_upsert_rejects_bad_key()
+    test_upsert_endpoint_ndjson()
+    print("\n✅ Upsert tests passed!")
@@ -0,0 +1,152 @@
+import sys
+import os
+import asyncio
+import glob
+import tempfile
+
+# Add src to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import SecretStr
+from fastapi.testclient import TestClient
+from src.config import settings
+from src.core.http_cache import response_cache
+from src.core.shared_cache import SharedCache
+from src.main import app
+import src.services.webhook_service as webhook_module
+from src.services.webhook_service import sign, webhook_service
+
+client = TestClient(app)
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "notion_webhooks")
+SECRET = "secret_test_token"
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+def post(body, signature):
+    headers = {"Content-Type": "application/json"}
+    if signature:
+        headers["X-Notion-Signature"] = signature
+    return client.post("/webhooks/notion", content=body, headers=headers)
+
+def with_fresh_cache(fn):
+    """Run ``fn`` with the webhook secret set and an empty dedupe/schema cache."""
+    original_cache, original_secret = webhook_module.shared_cache, settings.notion_webhook_secret
+    webhook_module.shared_cache = SharedCache(os.path.join(tempfile.mkdtemp(), "cache.db"))
+    settings.notion_webhook_secret = SecretStr(SECRET)
+    try:
+        return fn(webhook_module.shared_cache)
+    finally:
+        webhook_module.shared_cache, settings.notion_webhook_secret = original_cache, original_secret
+
+def test_signature_required():
+    """Test unsigned or wrongly signed events are rejected."""
+    def scenario(cache):
+        body = load_fixture("01_page_created.json")
+        assert post(body, None).status_code == 401
+        assert post(body, sign(body, "wrong")).status_code == 401
+        assert post(body, sign(body, SECRET)).status_code == 200
+
+    with_fresh_cache(scenario)
+    print("✓ Webhook signatures are verified")
+
+def test_verification_handshake():
+    """Test the unsigned subscription verification request is accepted."""
+    response = post(b'{"verification_token": "secret_abc"}', None)
+    assert response.status_code == 200
+    assert response.json()["status"] == "verification_received"
+    print("✓ Verification handshake is accepted")
+
+def test_replay_fixtures_dedupes():
+    """Test replaying recorded fixtures processes each event once."""
+    def scenario(cache):
+        statuses = []
+        for path in sorted(glob.glob(os.path.join(FIXTURES, "*.json"))):
+            with open(path, "rb") as f:
+                body = f.read()
+            response = post(body, sign(body, SECRET))
+            assert response.status_code == 200
+            statuses.append(response.json()["status"])
+        assert statuses == ["processed", "processed", "processed", "duplicate"]
+
+    with_fresh_cache(scenario)
+    print("✓ Replayed fixtures are deduplicated")
+
+def test_schema_event_invalidates_cache():
+    """Test a schema change drops that database's cached schemas only."""
+    def scenario(cache):
+        async def seed():
+            await cache.set("notion_schema", "database:13950b26c2034f3bb97d93ec06319565:tokenA", {"v": 1}, 60)
+            await cache.set("notion_schema", "database:13950b26c2034f3bb97d93ec06319565:tokenB", {"v": 1}, 60)
+            await cache.set("notion_schema", "database:otherdatabase:tokenA", {"v": 1}, 60)
+        asyncio.run(seed())
+
+        body = load_fixture("03_database_schema_updated.json")
+        assert post(body, sign(body, SECRET)).status_code == 200
+
+        async def check():
+            assert await cache.get("notion_schema", "database:13950b26c2034f3bb97d93ec06319565:tokenA") is None
+            assert await cache.get("notion_schema", "database:13950b26c2034f3bb97d93ec06319565:tokenB") is None
+            assert await cache.get("notion_schema", "database:otherdatabase:tokenA") == {"v": 1}
+        asyncio.run(check())
+
+    with_fresh_cache(scenario)
+    print("✓ Schema events invalidate cached schemas")
+
+def test_page_event_invalidates_responses():
+    """Test page changes drop cached responses tagged with their database, in either ID form."""
+    tags = ["database:13950b26c2034f3bb97d93ec06319565", "database:13950b26-c203-4f3b-b97d-93ec06319565"]
+
+    def scenario(cache):
+        before = asyncio.run(response_cache.tag_versions(tags))
+        body = load_fixture("02_page_properties_updated.json")
+        assert post(body, sign(body, SECRET)).status_code == 200
+        after = asyncio.run(response_cache.tag_versions(tags))
+        assert all(before[tag] != after[tag] for tag in tags)
+
+    with_fresh_cache(scenario)
+    print("✓ Page events invalidate cached database responses")
+
+def test_concurrent_redeliveries_processed_once():
+    """Test simultaneous deliveries of one event are processed once."""
+    def scenario(cache):
+        body = load_fixture("01_page_created.json")
+
+        async def deliver():
+            return await asyncio.gather(*[webhook_service.receive(body, sign(body, SECRET)) for _ in range(5)])
+
+        statuses = sorted(result["status"] for result in asyncio.run(deliver()))
+        assert statuses == ["duplicate"] * 4 + ["processed"]
+
+    with_fresh_cache(scenario)
+    print("✓ Concurrent redeliveries are processed once")
+
+def test_subscribers_receive_events():
+    """Test handlers subscribed by type prefix see matching events."""
+    seen = []
+
+    async def on_page(event):
+        seen.append(event["type"])
+
+    webhook_service.subscribe("page.", on_page)
+    try:
+        def scenario(cache):
+            for name in ("01_page_created.json", "03_database_schema_updated.json"):
+                body = load_fixture(name)
+                post(body, sign(body, SECRET))
+        with_fresh_cache(scenario)
+    finally:
+        webhook_service._handlers.remove(("page.", on_page))
+    assert seen == ["page.created"]
+    print("✓ Subscribers receive matching events")
+
+if __name__ == "__main__":
+    test_signature_required()
+    test_verification_handshake()
+    test_replay_fixtures_dedupes()
+    test_schema_event_invalidates_cache()
+    test_page_event_invalidates_responses()
+    test_concurrent_redeliveries_processed_once()
+    test_subscribers_receive_events()
+    print("\n✅ Webhook tests passed!")